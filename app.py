@@ -5,18 +5,37 @@ import time
 import json
 import random
 import urllib.parse
+import functools
 import concurrent.futures
 import traceback
-import difflib
-from functools import lru_cache
-from flask import Flask, render_template, request, jsonify
+import hashlib
+from flask import Flask, Response, render_template, request, jsonify, has_request_context, g, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from dotenv import load_dotenv
+import openai
 from openai import OpenAI
 from vehicle_validation import has_vehicle_info, get_missing_info_message
 from query_processor import EnhancedQueryProcessor
 from query_templates import get_template_for_message
 from chatbot_handler import process_chat_message
 from direct_dialpad import DialpadClient  # Using our final implementation
+from cache_backends import create_cache
+from search_cache import SingleFlight
+import search_cache
+import http_client
+import serpapi_quota
+import deadline
+from upstream_engine import upstream_engine, UpstreamSaturated
+from title_matcher import compile_matcher
+import vehicle_aliases
+from listing import Listing, parse_price
+from fitment import parse_fitment, fitment_cache_stats
+import ranking
+from dedup import ListingDedupIndex, NEAR_MODE
+from facets import FacetCounter, ListingFilter
+from result_sets import ResultSetStore, decode_cursor, next_cursor
+import response_cache
+import fallback_planner
 from datetime import datetime, timedelta
 
 load_dotenv()
@@ -25,9 +44,24 @@ static_folder = os.path.abspath('static')
 app = Flask(__name__, static_folder=static_folder, static_url_path='/static')
 app.secret_key = os.getenv("FLASK_SECRET_KEY", os.urandom(24).hex())
 
+
+class AppJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes Listing records in their dict shape"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Listing):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+
+app.json = AppJSONProvider(app)
+
 api_key = os.getenv("OPENAI_API_KEY")
 serpapi_key = os.getenv("SERPAPI_KEY")
-client = OpenAI(api_key=api_key)
+# Bounded timeout so a hung OpenAI request can't hold a worker for minutes
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+client = OpenAI(api_key=api_key, timeout=OPENAI_TIMEOUT)
 
 # Validate required API keys with better error messages
 if not api_key:
@@ -194,14 +228,30 @@ def clean_query(text):
     return text
 
 # VIN decoder helper function with caching (VINs don't change, so cache indefinitely)
-@lru_cache(maxsize=500)
+VIN_CACHE = create_cache("vin", default_ttl=None, max_size=500)
+VIN_NEGATIVE_TTL = int(os.getenv("VIN_NEGATIVE_TTL", "60"))
+
 def decode_vin(vin):
     """Decode VIN with caching for better performance"""
     if not vin:
         return {}
+    
+    cached_result = VIN_CACHE.get(vin)
+    if cached_result is not None:
+        return cached_result
+    
+    result = _decode_vin_uncached(vin)
+    
+    # Successful decodes are cached indefinitely; failures are cached briefly so
+    # repeated lookups don't keep waiting on NHTSA while it is failing
+    VIN_CACHE.set(vin, result, ttl=None if result else VIN_NEGATIVE_TTL)
+    return result
+
+def _decode_vin_uncached(vin):
+    """Query the NHTSA API for a VIN"""
     try:
         url = f'https://vpic.nhtsa.dot.gov/api/vehicles/decodevinvaluesextended/{vin}?format=json'
-        response = requests.get(url, timeout=10)
+        response = http_client.get("nhtsa", url)
         response.raise_for_status()  # Raise an exception for HTTP errors
         
         data = response.json()
@@ -226,24 +276,215 @@ def decode_vin(vin):
         print(f"VIN decode unexpected error: {e}")
     return {}
 
+SERPAPI_SEARCH_URL = "https://serpapi.com/search"
+
 # Cache helper for SerpAPI results
-SERPAPI_CACHE = {}
-CACHE_EXPIRY = 300  # 5 minutes in seconds
+CACHE_EXPIRY = 300  # 5 minutes in seconds, used when no TTL policy matches
+
+# Freshness per engine and condition: used eBay inventory turns over much faster
+# than new listings, and Google Shopping prices change slowest
+SERPAPI_TTL_POLICY = {
+    ("ebay", "new"): int(os.getenv("SERPAPI_TTL_EBAY_NEW", "600")),
+    ("ebay", "used"): int(os.getenv("SERPAPI_TTL_EBAY_USED", "180")),
+    ("google_shopping", None): int(os.getenv("SERPAPI_TTL_GOOGLE_SHOPPING", "1800")),
+}
+
+# Grace window after expiry during which a stale result is served while it is
+# refreshed in the background (stale-while-revalidate). Set to 0 to disable.
+SERPAPI_STALE_GRACE = int(os.getenv("SERPAPI_STALE_GRACE", "600"))
+SERPAPI_CACHE_SIZE = int(os.getenv("SERPAPI_CACHE_SIZE", "500"))
+SERPAPI_CACHE = create_cache("serpapi", default_ttl=CACHE_EXPIRY + SERPAPI_STALE_GRACE, max_size=SERPAPI_CACHE_SIZE)
+# Failed and empty SerpAPI responses are cached this long so a failing or
+# fruitless query isn't sent upstream again on every request
+SERPAPI_NEGATIVE_TTL = int(os.getenv("SERPAPI_NEGATIVE_TTL", "30"))
+
+# Cache for LLM responses - identical prompts reuse the stored completion
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "86400"))  # 24 hours in seconds
+LLM_CACHE = create_cache("llm", default_ttl=LLM_CACHE_TTL, max_size=1000)
+
+# Ranked search-products results, kept so the client can filter, sort and page
+# them without running the search again
+RESULT_SET_TTL = int(os.getenv("RESULT_SET_TTL", "900"))
+RESULT_SET_CACHE_SIZE = int(os.getenv("RESULT_SET_CACHE_SIZE", "200"))
+RESULT_SETS = ResultSetStore(create_cache("results", default_ttl=RESULT_SET_TTL, max_size=RESULT_SET_CACHE_SIZE))
+
+# Finished ranked search-products responses, so a repeat search skips the
+# search and the ranking; each expires with the SerpAPI data it was built from
+SEARCH_RESPONSE_CACHE_SIZE = int(os.getenv("SEARCH_RESPONSE_CACHE_SIZE", "300"))
+SEARCH_RESPONSES = response_cache.SearchResponseCache(
+    create_cache("search_responses", default_ttl=None, max_size=SEARCH_RESPONSE_CACHE_SIZE),
+    ranking.RANKING_VERSION
+)
+
+# Concurrent misses for the same SerpAPI cache key share one upstream call
+SERPAPI_INFLIGHT = SingleFlight()
+
+# Search responses built from stale SerpAPI entries are flagged "stale": true
+@app.before_request
+def start_stale_tracking():
+    g.stale_reads_token = search_cache.begin_stale_tracking()
+
+@app.teardown_request
+def end_stale_tracking(exc=None):
+    token = g.pop("stale_reads_token", None)
+    if token is not None:
+        search_cache.end_stale_tracking(token)
+
+# SerpAPI quota: hourly/monthly budget shared by all requests, plus a cap on the
+# calls a single request may make. Fallback and speculative calls are dropped
+# before primary searches as the budget runs low.
+SERPAPI_QUOTA = serpapi_quota.QuotaBudget(
+    hourly_limit=int(os.getenv("SERPAPI_HOURLY_LIMIT", "1000")),
+    monthly_limit=int(os.getenv("SERPAPI_MONTHLY_LIMIT", "5000"))
+)
+SERPAPI_REQUEST_CAP = int(os.getenv("SERPAPI_REQUEST_CAP", "12"))
+
+# Seconds clients are asked to wait (Retry-After) when the upstream queue is full
+UPSTREAM_RETRY_AFTER = int(os.getenv("UPSTREAM_RETRY_AFTER", "5"))
+
+def upstream_busy_response():
+    """503 response for a request turned away because the upstream queue is full"""
+    response = jsonify({
+        "success": False,
+        "error": "The search service is busy right now. Please try again in a few seconds."
+    })
+    response.status_code = 503
+    response.headers["Retry-After"] = str(UPSTREAM_RETRY_AFTER)
+    return response
+
+# Fallback searches predicted to be needed at least this often start together
+# with the primary searches, at speculative priority (above 1 disables this)
+SPECULATIVE_FALLBACK_THRESHOLD = float(os.getenv("SPECULATIVE_FALLBACK_THRESHOLD", "0.6"))
+FALLBACK_PLANNER = fallback_planner.FallbackPlanner(threshold=SPECULATIVE_FALLBACK_THRESHOLD)
+
+# /api/search starts the product search with the local query processor's term
+# while GPT analyzes the query, instead of waiting for GPT's term. It searches
+# again with GPT's term (merging both results) only when the two terms share
+# less than this fraction of their words.
+SEARCH_API_CONCURRENT = os.getenv("SEARCH_API_CONCURRENT", "true").lower() == "true"
+SEARCH_API_TOPUP_SIMILARITY = float(os.getenv("SEARCH_API_TOPUP_SIMILARITY", "0.6"))
+
+@app.before_request
+def start_serpapi_request_budget():
+    g.serpapi_budget_token = serpapi_quota.begin_request(SERPAPI_REQUEST_CAP)
+
+@app.teardown_request
+def end_serpapi_request_budget(exc=None):
+    token = g.pop("serpapi_budget_token", None)
+    if token is not None:
+        serpapi_quota.end_request(token)
+
+# Overall time budget in seconds of each search endpoint. When it runs out the
+# endpoint stops its remaining upstream work and answers with the results it
+# has, flagged "partial": true. A request may pass its own "deadline" (seconds,
+# up to MAX_REQUEST_DEADLINE); a deadline of 0 disables it.
+SEARCH_DEADLINE = float(os.getenv("SEARCH_DEADLINE", "12"))
+REQUEST_DEADLINES = {
+    "search_products": SEARCH_DEADLINE,
+    "search_products_stream": SEARCH_DEADLINE,
+    "search_api": float(os.getenv("SEARCH_API_DEADLINE", "20")),
+    "part_number_search": float(os.getenv("PART_NUMBER_SEARCH_DEADLINE", "15")),
+    "part_number_listings": float(os.getenv("PART_NUMBER_LISTINGS_DEADLINE", "15")),
+}
+MAX_REQUEST_DEADLINE = float(os.getenv("MAX_REQUEST_DEADLINE", "60"))
+
+def request_deadline_seconds():
+    """Deadline in seconds for the current request, or None when it has none"""
+    seconds = REQUEST_DEADLINES.get(request.endpoint)
+    if seconds is None:
+        return None
+    override = request.values.get("deadline")
+    if override:
+        try:
+            seconds = min(float(override), MAX_REQUEST_DEADLINE)
+        except ValueError:
+            print(f"Ignoring invalid deadline: {override}")
+    return seconds if seconds > 0 else None
+
+@app.before_request
+def start_request_deadline():
+    seconds = request_deadline_seconds()
+    if seconds is not None:
+        g.deadline_token = deadline.begin(seconds)
+
+@app.teardown_request
+def end_request_deadline(exc=None):
+    token = g.pop("deadline_token", None)
+    if token is not None:
+        deadline.end(token)
+
+# Listing fields the result processors read; everything else SerpAPI returns
+# (ads, filters, pagination, search metadata) is dropped before caching
+SERPAPI_LISTING_FIELDS = ("title", "price", "shipping", "condition", "link", "thumbnail")
+
+def get_serpapi_ttl(engine, query_type=None):
+    """Return the freshness TTL in seconds for an engine/condition pair"""
+    if engine == "ebay":
+        query_type = "new" if query_type == "new" else "used"
+    else:
+        query_type = None
+    return SERPAPI_TTL_POLICY.get((engine, query_type), CACHE_EXPIRY)
+
+def _slim_listing(item):
+    """Reduce a SerpAPI listing to the fields the processors read"""
+    slim = {}
+    for field in SERPAPI_LISTING_FIELDS:
+        value = item.get(field)
+        # eBay nests display strings as {"raw": ..., "extracted": ...}; the
+        # processors only use "raw", which they accept as a plain string too
+        if isinstance(value, dict):
+            value = value.get("raw")
+        if value not in (None, ""):
+            slim[field] = value
+    
+    # Google Shopping spreads the product URL over several fields; resolve the
+    # first usable one here so the processors' fallback chain finds it in "link"
+    if not str(slim.get("link", "")).startswith("http"):
+        candidates = [item.get("product_link"), item.get("link_text")]
+        if isinstance(item.get("link_object"), dict):
+            candidates.append(item["link_object"].get("link"))
+        for candidate in candidates:
+            if isinstance(candidate, str) and candidate.startswith("http"):
+                slim["link"] = candidate
+                break
+        else:
+            slim.pop("link", None)
+    return slim
+
+def slim_serpapi_result(engine, result):
+    """Project a raw SerpAPI response onto the compact form stored in the cache"""
+    results_key = "organic_results" if engine == "ebay" else "shopping_results"
+    listings = result.get(results_key) or []
+    return {results_key: [_slim_listing(item) for item in listings if isinstance(item, dict)]}
 
 def get_serpapi_cached(engine, query, query_type=None, timestamp=None, **params):
     """
-    Better cache implementation for SerpAPI requests with actual TTL expiry.
+    Cached SerpAPI request with TTL expiry. The cache backend is configured
+    with CACHE_BACKEND, so all workers can share one warm cache.
     Added support for additional params.
+    
+    Concurrent misses for the same key are coalesced: the first caller fetches
+    and the others wait for its result instead of calling SerpAPI again.
+    
+    Entries past CACHE_EXPIRY but within SERPAPI_STALE_GRACE are returned
+    immediately with "stale": True and refreshed in a background thread; the
+    current request is recorded as served stale data (see search_cache).
+    
+    Failed and empty responses are cached for SERPAPI_NEGATIVE_TTL seconds.
+    Results are cached in slim form (listing fields only) and stay fresh for
+    the SERPAPI_TTL_POLICY entry matching the engine and condition.
     """
+    # Equivalent spellings (F-150/F150, Chevy/Chevrolet, extra spaces) share one
+    # canonical query, which is used for both the cache key and the upstream request
+    query = query_processor.canonicalize_query(query)
+    
     # Create cache key from parameters
     cache_key = f"{engine}:{query}:{query_type}:{sorted(params.items())}"
     
     # Check if we have a cached result that hasn't expired
-    current_time = int(time.time())
-    if cache_key in SERPAPI_CACHE:
-        cached_time, cached_result = SERPAPI_CACHE[cache_key]
-        if current_time - cached_time < CACHE_EXPIRY:
-            return cached_result
+    cached_result, is_fresh = _get_serpapi_cache_entry(cache_key)
+    if cached_result is not None and is_fresh:
+        return cached_result
     if engine == "ebay":
         api_params = {
             "engine": "ebay",
@@ -272,32 +513,125 @@ def get_serpapi_cached(engine, query, query_type=None, timestamp=None, **params)
     else:
         return {"error": "Invalid engine specified"}
     
+    ttl = get_serpapi_ttl(engine, query_type)
+    
+    # Serve a stale entry right away and refresh it in the background
+    if cached_result is not None:
+        if not SERPAPI_INFLIGHT.in_flight(cache_key):
+            try:
+                upstream_engine.spawn(
+                    functools.partial(_refresh_serpapi_in_background, engine, cache_key, api_params, ttl),
+                    upstream="serpapi"
+                )
+            except UpstreamSaturated:
+                # The stale entry is served either way; a later hit refreshes it
+                print(f"Upstream queue full, skipping background refresh of {cache_key}")
+        search_cache.record_stale_read()
+        response_cache.record_degraded_source()
+        stale_result = dict(cached_result)
+        stale_result["stale"] = True
+        return stale_result
+    
+    result = SERPAPI_INFLIGHT.do(cache_key, _fetch_serpapi, engine, cache_key, api_params, ttl)
+    
+    # A call that joined a lower-priority fetch the quota skipped (e.g. a
+    # speculative fallback search) tries again at its own priority
+    skipped_priority = result.get("quota_skipped")
+    if skipped_priority and skipped_priority != serpapi_quota.current_priority():
+        result = SERPAPI_INFLIGHT.do(cache_key, _fetch_serpapi, engine, cache_key, api_params, ttl)
+    
+    # Whatever the leader did, the result is cached (or not) like this
+    results_key = "organic_results" if engine == "ebay" else "shopping_results"
+    if result.get("stale") or result.get("quota_skipped"):
+        response_cache.record_degraded_source()
+        # The fetch falls back to a stale entry when SerpAPI fails or the quota runs out
+        if result.get("stale"):
+            search_cache.record_stale_read()
+    else:
+        response_cache.record_source(time.time() + (ttl if result.get(results_key) else SERPAPI_NEGATIVE_TTL))
+    return result
+
+def _get_serpapi_cache_entry(cache_key):
+    """
+    Look up a SerpAPI cache entry.
+    Returns (result, is_fresh); result is None when there is no usable entry.
+    """
+    entry = SERPAPI_CACHE.get(cache_key)
+    if not isinstance(entry, dict) or "fetched_at" not in entry:
+        return None, False
+    
+    age = time.time() - entry["fetched_at"]
+    ttl = entry.get("ttl", CACHE_EXPIRY)
+    if age < ttl:
+        # A search response built on this entry can't be cached past its expiry
+        response_cache.record_source(entry["fetched_at"] + ttl)
+        return entry["result"], True
+    # Negative entries are never served stale; once expired they are refetched
+    if not entry.get("negative") and age < ttl + SERPAPI_STALE_GRACE:
+        return entry["result"], False
+    return None, False
+
+def _refresh_serpapi_in_background(engine, cache_key, api_params, ttl):
+    """Refresh a stale SerpAPI entry without blocking the request that found it"""
+    try:
+        # Nobody is waiting on a refresh, so it is the first call to give up
+        # quota, and the deadline of the request that found the entry doesn't
+        # shorten it
+        with serpapi_quota.priority(serpapi_quota.SPECULATIVE), deadline.restored(None):
+            SERPAPI_INFLIGHT.do(cache_key, _fetch_serpapi, engine, cache_key, api_params, ttl)
+    except Exception as e:
+        print(f"Background refresh failed for {engine} ({cache_key}): {e}")
+
+def _fetch_serpapi(engine, cache_key, api_params, ttl):
+    """Call SerpAPI and store the slimmed result under cache_key for ttl seconds"""
+    # Another request may have refreshed the cache while we waited to lead the fetch
+    cached_result, is_fresh = _get_serpapi_cache_entry(cache_key)
+    if cached_result is not None and is_fresh:
+        return cached_result
+    
+    results_key = "organic_results" if engine == "ebay" else "shopping_results"
+    
+    # Skipped calls aren't cached: the query itself is fine, only the budget ran out
+    if not SERPAPI_QUOTA.acquire():
+        print(f"SerpAPI quota: skipping {serpapi_quota.current_priority()} {engine} call ({cache_key})")
+        if cached_result is not None:
+            stale_result = dict(cached_result)
+            stale_result["stale"] = True
+            return stale_result
+        return {results_key: [], "quota_skipped": serpapi_quota.current_priority()}
+    
     try:
-        response = requests.get("https://serpapi.com/search", params=api_params, timeout=10)
+        response = http_client.get("serpapi", SERPAPI_SEARCH_URL, params=api_params)
         response.raise_for_status()
         result = response.json()
-        
-        # Store result in cache with current timestamp
-        SERPAPI_CACHE[cache_key] = (current_time, result)
-        
-        # Clean old entries if cache is too large (over 200 items)
-        if len(SERPAPI_CACHE) > 200:
-            keys_to_remove = []
-            for k, (t, _) in SERPAPI_CACHE.items():
-                if current_time - t > CACHE_EXPIRY:
-                    keys_to_remove.append(k)
-            
-            # Remove expired items
-            for k in keys_to_remove:
-                del SERPAPI_CACHE[k]
-        
-        return result
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error fetching {engine} items: {e}")
-        if engine == "ebay":
-            return {"organic_results": []}
-        else:
-            return {"shopping_results": []}
+        # A stale result beats an empty one while SerpAPI is failing
+        if cached_result is not None:
+            stale_result = dict(cached_result)
+            stale_result["stale"] = True
+            return stale_result
+        result = {results_key: []}
+        _store_serpapi_result(cache_key, result, SERPAPI_NEGATIVE_TTL, negative=True)
+        return result
+    
+    result = slim_serpapi_result(engine, result)
+    if result[results_key]:
+        _store_serpapi_result(cache_key, result, ttl)
+    else:
+        _store_serpapi_result(cache_key, result, SERPAPI_NEGATIVE_TTL, negative=True)
+    
+    return result
+
+def _store_serpapi_result(cache_key, result, ttl, negative=False):
+    """
+    Store a result with its fetch time and freshness TTL so stale entries can be
+    told apart. Good results are kept for ttl + SERPAPI_STALE_GRACE seconds.
+    """
+    entry = {"fetched_at": time.time(), "ttl": ttl, "result": result}
+    if negative:
+        entry["negative"] = True
+    SERPAPI_CACHE.set(cache_key, entry, ttl=ttl if negative else ttl + SERPAPI_STALE_GRACE)
 
 def fetch_ebay_results(query_type, query, timestamp=None, part_type=None, structured_data=None):
     """
@@ -375,33 +709,65 @@ def get_ebay_serpapi_results(query, part_type=None, structured_data=None):
     if structured_data and isinstance(structured_data, dict):
         print(f"[DEBUG] eBay search - Using Year from structured data: {structured_data.get('year')}")
     
-    # Define tasks for concurrent execution - new and used products
-    tasks = [
-        ("new", query, None, part_type, structured_data),  # timestamp parameter is now None but kept for API compatibility
-        ("used", query, None, part_type, structured_data)
-    ]
-    
+    # Run the new and used searches concurrently on the shared upstream engine
     all_items = []
-    
-    # Use ThreadPoolExecutor for concurrent requests
-    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-        # Create a mapping of futures to their tasks
-        future_to_task = {
-            executor.submit(fetch_ebay_results, *task): task[0]
-            for task in tasks
-        }
-        
-        # Process results as they complete
-        for future in concurrent.futures.as_completed(future_to_task):
-            task_type = future_to_task[future]
-            try:
-                items = future.result()
-                all_items.extend(items)
-            except Exception as e:
-                print(f"Error processing {task_type} items: {e}")
+    for items in run_upstream_calls(ebay_search_calls(query, part_type, structured_data)):
+        all_items.extend(items)
     
     return all_items
 
+def ebay_search_calls(query, part_type=None, structured_data=None):
+    """
+    Build the labeled upstream calls for an eBay search (new and used products)
+    so callers can schedule them together with other upstream calls.
+    """
+    # timestamp parameter is None but kept for API compatibility
+    return [
+        ("new", functools.partial(fetch_ebay_results, "new", query, None, part_type, structured_data)),
+        ("used", functools.partial(fetch_ebay_results, "used", query, None, part_type, structured_data))
+    ]
+
+def run_upstream_calls(labeled_calls):
+    """
+    Run (label, call) pairs of SerpAPI work concurrently on the shared upstream
+    engine. Returns one listing list per call, in order; a failed call, or one
+    still unfinished at the request's deadline, yields an empty list. Raises
+    UpstreamSaturated when the engine's queue is full.
+    """
+    results = upstream_engine.gather(
+        [call for _, call in labeled_calls], upstream="serpapi", timeout=deadline.remaining()
+    )
+    
+    listings = []
+    for (label, _), result in zip(labeled_calls, results):
+        if isinstance(result, TimeoutError):
+            deadline.cut(f"{label} search")
+            listings.append([])
+        elif isinstance(result, Exception):
+            print(f"Error processing {label} items: {result}")
+            listings.append([])
+        else:
+            listings.append(result)
+    return listings
+
+def iter_upstream_calls(labeled_calls):
+    """
+    Run (label, call) pairs of SerpAPI work concurrently on the shared upstream
+    engine and yield (index, label, listings) as each call finishes; a failed
+    call, or one still unfinished at the request's deadline, yields an empty
+    list. Raises UpstreamSaturated when the engine's queue is full.
+    """
+    calls = [call for _, call in labeled_calls]
+    for index, result in upstream_engine.as_completed(calls, upstream="serpapi", timeout=deadline.remaining()):
+        label = labeled_calls[index][0]
+        if isinstance(result, TimeoutError):
+            deadline.cut(f"{label} search")
+            result = []
+        elif isinstance(result, Exception):
+            print(f"Error processing {label} items: {result}")
+            result = []
+        yield index, label, result
+
 def extract_vehicle_info_from_query(query, structured_data=None):
     """
     Extract vehicle information from a query string using the query processor
@@ -479,7 +845,6 @@ def extract_vehicle_info_from_query(query, structured_data=None):
     }
 
 # Add this function to app.py to improve the presentation of search results
-
 def post_process_search_results(listings, vehicle_info):
     """
     Post-processes search results to improve display and highlight exact year matches.
@@ -499,39 +864,12 @@ def post_process_search_results(listings, vehicle_info):
     if not target_year:
         return listings
     
-    # Group listings into categories
-    exact_matches = []
-    compatible_matches = []
-    other_matches = []
-    
-    for item in listings:
-        title = item.get("title", "").lower()
-        
-        # Check if this is an exact year match
-        if re.search(r'\b' + re.escape(target_year) + r'\b', title):
-            # Add an "exactYearMatch" flag for frontend highlighting
-            item["exactYearMatch"] = True
-            item["specialHighlight"] = True
-            exact_matches.append(item)
-        else:
-            # Check for year ranges that include our target year
-            year_ranges = re.findall(r'\b(\d{4})[- /](\d{4})\b', title)
-            is_compatible = False
-            
-            for start_year, end_year in year_ranges:
-                if int(start_year) <= int(target_year) <= int(end_year):
-                    item["compatibleRange"] = f"{start_year}-{end_year}"
-                    item["specialHighlight"] = False
-                    compatible_matches.append(item)
-                    is_compatible = True
-                    break
-            
-            if not is_compatible:
-                item["specialHighlight"] = False
-                other_matches.append(item)
-    
-    # Return prioritized results: exact matches first, then compatible, then others
-    return exact_matches + compatible_matches + other_matches
+    # Prioritized results: exact matches first, then compatible, then others
+    return ranking.year_group_pipeline(target_year).rank(listings)
+
+# Accessory listings skipped on bumper searches unless the title says it's a full bumper
+BUMPER_ACCESSORY_TERMS = frozenset(["guard", "protector", "pad", "cover only", "bracket only"])
+BUMPER_ASSEMBLY_TERMS = frozenset(["assembly", "complete", "front end", "whole bumper"])
 
 def process_ebay_results(results, query, structured_data=None, max_items=100):
     """
@@ -583,216 +921,16 @@ def process_ebay_results(results, query, structured_data=None, max_items=100):
     # Debug output vehicle info
     print(f"eBay search - Vehicle info: Year: {year}, Make: {make}, Model: {model}, Part: {part}")
     
-    # Create a set of must-match terms for more accurate results
-    must_match = set()
-    
-    # Position term mapping for handling various ways positions are described
-    position_mapping = {
-        # Left/Right variations
-        'left': ['left', 'driver', 'driver side', 'ds', 'lh', 'l/h', 'l/side'],
-        'right': ['right', 'passenger', 'passenger side', 'ps', 'rh', 'r/h', 'r/side'],
-        # Front/Rear variations
-        'front': ['front', 'forward', 'fr', 'f/'],
-        'rear': ['rear', 'back', 'rr', 'r/'],
-        # Combined positions
-        'front left': ['fl', 'front left', 'front driver', 'driver front', 'lf', 'left front'],
-        'front right': ['fr', 'front right', 'front passenger', 'passenger front', 'rf', 'right front'],
-        'rear left': ['rl', 'rear left', 'rear driver', 'driver rear', 'lr', 'left rear'],
-        'rear right': ['rr', 'rear right', 'rear passenger', 'passenger rear', 'rr', 'right rear']
-    }
+    # Must-match terms come from the part description: known part words map to
+    # their base part and position wording to its canonical position
+    must_match, position_terms = vehicle_aliases.part_match_terms(part)
+    must_match = set(must_match)
+    if position_terms:
+        print(f"Found position terms: {list(position_terms)}")
     
-    # Part term variations for common parts
-    part_variations = {
-        'caliper': ['caliper', 'brake caliper', 'disc caliper'],
-        'strut': ['strut', 'shock strut', 'strut assembly', 'shock absorber'],
-        'rotor': ['rotor', 'brake rotor', 'disc rotor', 'brake disc'],
-        'bumper': ['bumper', 'bumper cover', 'bumper assembly', 'front end'],
-        'headlight': ['headlight', 'head light', 'headlamp', 'head lamp']
-    }
-    
-    # Process part terms with position awareness
-    position_terms = []
-    part_terms = []
-    
-    if part:
-        part_lower = part.lower()
-        
-        # Check for position terms
-        for position, variations in position_mapping.items():
-            for var in variations:
-                if var in part_lower:
-                    print(f"Found position term: {var} → {position}")
-                    position_terms.append(position)
-                    # Remove this position term from the part text to avoid duplication
-                    part_lower = part_lower.replace(var, '')
-                    break
-        
-        # Process remaining part words
-        for part_word in part_lower.split():
-            if len(part_word) > 3 and part_word not in ["with", "for", "the", "and", "of", "a", "an"]:
-                # Check if this word is a known part term and add its variations
-                added = False
-                for base_part, variations in part_variations.items():
-                    if part_word in variations or any(var in part_word for var in variations):
-                        print(f"Found part variation: {part_word} → {base_part}")
-                        must_match.add(base_part)
-                        added = True
-                        break
-                
-                # If not a known variation, add as-is
-                if not added:
-                    must_match.add(part_word)
-        
-        # Add position terms
-        for position in position_terms:
-            print(f"Adding position term to must_match: {position}")
-            must_match.add(position)
-    
-    # For makes with compound names or common variants, add alternatives
-    make_alternatives = set()
-    if make:
-        make_lower = make.lower()
-        make_alternatives.add(make_lower)
-        
-        # Common make abbreviations and variations
-        make_variants = {
-            "mercedes-benz": ["mercedes", "benz", "mb"],
-            "mercedes benz": ["mercedes", "benz", "mb"],
-            "mercedes": ["mercedes-benz", "benz"],
-            "benz": ["mercedes-benz", "mercedes"],
-            
-            "chevrolet": ["chevy"],
-            "chevy": ["chevrolet"],
-            
-            "volkswagen": ["vw"],
-            "vw": ["volkswagen"],
-            
-            "oldsmobile": ["olds", "cutlass"],
-            "olds": ["oldsmobile"],
-            "cutlass": ["oldsmobile"],
-            
-            "pontiac": ["ponti", "firebird", "trans am"],
-            "firebird": ["pontiac"],
-            "trans am": ["pontiac"],
-            
-            "mercury": ["merc"],
-            "merc": ["mercury"],
-            
-            "chrysler": ["mopar"],
-            "mopar": ["chrysler"],
-            
-            "plymouth": ["plym", "barracuda", "roadrunner"],
-            "plym": ["plymouth"],
-            
-            "cadillac": ["caddy", "deville", "eldorado"],
-            "caddy": ["cadillac"],
-            "deville": ["cadillac"],
-            "eldorado": ["cadillac"],
-            
-            "bmw": ["bavarian"],
-            
-            "toyota": ["toy"],
-            
-            "mitsubishi": ["mitsu"],
-            
-            "ford": ["fd"],
-            
-            "general motors": ["gm"],
-            "gm": ["general motors"],
-            
-            "audi": ["aud"]
-        }
-        
-        # Add all relevant variants
-        for variant_key, variant_values in make_variants.items():
-            if variant_key in make_lower or any(part in make_lower for part in variant_key.split()):
-                for variant in variant_values:
-                    make_alternatives.add(variant)
-            
-    # Add model variations - this is important as sellers use different formats
-    model_alternatives = set()
-    if model:
-        model_lower = model.lower()
-        model_alternatives.add(model_lower)
-        
-        # Handle model variations (with/without dash)
-        if "-" in model_lower:
-            model_alternatives.add(model_lower.replace("-", ""))
-            model_alternatives.add(model_lower.replace("-", " "))
-        
-        # Special handling for model numbers with/without spaces
-        # E.g., 'F 150' vs 'F-150' vs 'F150'
-        if re.search(r'[a-z][0-9]', model_lower) or re.search(r'[a-z][ -][0-9]', model_lower):
-            # Extract letter and number components
-            match = re.search(r'([a-z]+)[ -]?([0-9]+)', model_lower)
-            if match:
-                letter, number = match.groups()
-                model_alternatives.add(f"{letter}{number}")  # F150
-                model_alternatives.add(f"{letter}-{number}")  # F-150
-                model_alternatives.add(f"{letter} {number}")  # F 150
-        
-        # Common model abbreviations and variations
-        if 'series' in model_lower and not model_lower.endswith('series'):
-            series_name = model_lower.replace('series', '').strip()
-            model_alternatives.add(series_name)
-        
-        # For Mercedes models like C240, also try C Class or C-Class
-        if model_lower.startswith("c") or model_lower.startswith("e") or model_lower.startswith("s"):
-            if any(char.isdigit() for char in model_lower):
-                class_letter = model_lower[0]
-                model_alternatives.add(f"{class_letter} class")
-                model_alternatives.add(f"{class_letter}-class")
-        
-        # For BMW models like 328i, 535i, add series variations
-        bmw_series_match = re.search(r'^([0-9])([0-9]{2}[a-z]?)', model_lower)
-        if bmw_series_match:
-            series_num = bmw_series_match.group(1)
-            model_alternatives.add(f"{series_num}-series")
-            model_alternatives.add(f"{series_num} series")
-        
-        # Specific model variations by make
-        if make:
-            make_lower = make.lower()
-            
-            # Ford trucks
-            if make_lower == "ford" and any(truck in model_lower for truck in ["f150", "f-150", "f 150"]):
-                model_alternatives.add("f150")
-                model_alternatives.add("f-150")
-                model_alternatives.add("f 150")
-                model_alternatives.add("f series")
-                model_alternatives.add("f-series")
-            
-            # Chevy/GMC trucks
-            if make_lower in ["chevrolet", "chevy", "gmc"] and "silverado" in model_lower:
-                model_alternatives.add("1500")
-                model_alternatives.add("2500")
-                model_alternatives.add("3500")
-                model_alternatives.add("silverado")
-            
-            # Toyota Camry/Corolla generations
-            if make_lower == "toyota" and model_lower == "camry":
-                model_alternatives.add("camry se")
-                model_alternatives.add("camry le")
-                model_alternatives.add("camry xle")
-            
-            # Add common trim levels for popular models
-            common_trims = {
-                "accord": ["lx", "ex", "exl", "touring"],
-                "civic": ["lx", "ex", "si", "type r"],
-                "camry": ["le", "se", "xle", "xse"],
-                "corolla": ["le", "se", "xle"],
-                "f-150": ["xl", "xlt", "lariat", "king ranch", "platinum"],
-                "silverado": ["lt", "ltz", "z71"],
-                "ram": ["1500", "2500", "3500"]
-            }
-            
-            # Add trim variations if applicable
-            for base_model, trims in common_trims.items():
-                if base_model in model_lower:
-                    for trim in trims:
-                        if not trim in model_lower:  # Only add if not already in model name
-                            model_alternatives.add(base_model)  # Add base model without trim
-                            model_alternatives.add(f"{base_model} {trim}")  # Add model with trim
+    # Make and model variants sellers use in titles (precomputed per vehicle)
+    make_alternatives = vehicle_aliases.make_alternatives(make)
+    model_alternatives = vehicle_aliases.model_alternatives(make, model)
     
     # Build must-match set based on what's available
     # We'll require part term matches, but be more flexible with make/model
@@ -814,6 +952,17 @@ def process_ebay_results(results, query, structured_data=None, max_items=100):
     # Check if the query is for a bumper assembly
     is_bumper_query = any(term in query.lower() for term in ["bumper", "front end"])
     
+    # Every term the filters below look for is compiled into one matcher, so each
+    # title is scanned once and all term hits come back together as a bitmask:
+    # bit 0 make, bit 1 model, bits 2-3 bumper terms, then one bit per must-match term
+    # (which is satisfied by the term itself or any of its title variations)
+    must_match_aliases = [vehicle_aliases.title_aliases(term) for term in sorted(must_match)]
+    title_matcher = compile_matcher(
+        [make_alternatives, model_alternatives, BUMPER_ACCESSORY_TERMS, BUMPER_ASSEMBLY_TERMS] +
+        must_match_aliases
+    )
+    must_match_bits = (4, 4 + len(must_match_aliases))
+    
     # Set up scoring system for relevance
     for item in results.get("organic_results", []):
         if len(processed_items) >= max_items:
@@ -821,90 +970,34 @@ def process_ebay_results(results, query, structured_data=None, max_items=100):
             
         debug_filter_counts["total_considered"] += 1
         title = item.get("title", "").lower()
+        title_mask = title_matcher.scan(title)
         
         # Debug: show what we're processing
         if debug_filter_counts["total_considered"] < 5:  # Only show first few for brevity
             print(f"eBay processing item: {title}")
         
         # Skip items that don't match our criteria
-        if is_bumper_query and any(x in title for x in ["guard", "protector", "pad", "cover only", "bracket only"]):
+        if is_bumper_query and title_mask & 0b0100:
             # Skip bumper guards/pads when looking for full bumpers
-            if not any(x in title for x in ["assembly", "complete", "front end", "whole bumper"]):
+            if not title_mask & 0b1000:
                 debug_filter_counts["bumper_guard_filtered"] += 1
                 continue
         
         # Skip items that don't match required terms, but be more flexible
         if must_match:
-            # First check for part terms with more flexible matching
-            part_term_matches = 0
-            title_lower = title.lower()
+            # A must-match term counts once if it or any of its variations is in the title
+            part_term_matches = title_matcher.count(title_mask, *must_match_bits)
             
-            # Check each term in must_match
-            for term in must_match:
-                # Simple direct match
-                if term in title_lower:
-                    part_term_matches += 1
-                    
-                # Check for position term variations
-                elif term == "left" and any(x in title_lower for x in ["driver", "driver side", "driver's", "ds", "lh", "l/h", "l/s"]):
-                    part_term_matches += 1
-                elif term == "right" and any(x in title_lower for x in ["passenger", "passenger side", "passenger's", "ps", "rh", "r/h", "r/s"]):
-                    part_term_matches += 1
-                elif term == "front" and any(x in title_lower for x in ["forward", "fr", "f/", "front end"]):
-                    part_term_matches += 1
-                elif term == "rear" and any(x in title_lower for x in ["back", "rr", "r/", "rear end"]):
-                    part_term_matches += 1
-                    
-                # Check for combined position terms
-                elif term == "front left" and any(x in title_lower for x in ["fl", "lf", "front driver", "driver front"]):
-                    part_term_matches += 1
-                elif term == "front right" and any(x in title_lower for x in ["fr", "rf", "front passenger", "passenger front"]):
-                    part_term_matches += 1
-                elif term == "rear left" and any(x in title_lower for x in ["rl", "lr", "rear driver", "driver rear"]):
-                    part_term_matches += 1
-                elif term == "rear right" and any(x in title_lower for x in ["rr", "rear passenger", "passenger rear"]):
-                    part_term_matches += 1
-                
-                # Check for common part term variations
-                elif term == "caliper" and any(x in title_lower for x in ["brake caliper", "disc caliper", "brake system"]):
-                    part_term_matches += 1
-                elif term == "rotor" and any(x in title_lower for x in ["brake rotor", "disc rotor", "brake disc", "disc brake"]):
-                    part_term_matches += 1
-                elif term == "strut" and any(x in title_lower for x in ["shock", "shock absorber", "strut assembly", "suspension"]):
-                    part_term_matches += 1
-                elif term == "bumper" and any(x in title_lower for x in ["fascia", "front end", "bumper cover", "bumper assembly"]):
-                    part_term_matches += 1
-                elif term == "headlight" and any(x in title_lower for x in ["head lamp", "headlamp", "head light", "light assembly"]):
-                    part_term_matches += 1
-                    
             # Then check for make alternatives - we only need at least one to match
-            make_match = any(make_alt in title_lower for make_alt in make_alternatives) if make_alternatives else True
+            make_match = bool(title_mask & 0b0001) if make_alternatives else True
             
             # Also check for model alternatives - we only need at least one to match
-            model_match = any(model_alt in title_lower for model_alt in model_alternatives) if model_alternatives else True
+            model_match = bool(title_mask & 0b0010) if model_alternatives else True
             
             # For year, check if it's in the title OR in a range that includes our year
-            year_match = False
+            # (e.g., 2001-2007, 01-07, etc.)
             if year:
-                if year in title:
-                    year_match = True
-                else:
-                    # Check for year ranges (e.g., 2001-2007, 01-07, etc.)
-                    year_ranges = re.findall(r'(\d{4})\s*[-–—]\s*(\d{4})', title)
-                    for start_year, end_year in year_ranges:
-                        if int(start_year) <= int(year) <= int(end_year):
-                            year_match = True
-                            break
-                    
-                    # Also check shortened year formats (e.g., 01-07 for 2001-2007)
-                    short_ranges = re.findall(r'(\d{2})\s*[-–—]\s*(\d{2})', title)
-                    for start_yr, end_yr in short_ranges:
-                        # Convert to full year (assuming 21st or 20th century)
-                        start_full = int("20" + start_yr if int(start_yr) < 50 else "19" + start_yr)
-                        end_full = int("20" + end_yr if int(end_yr) < 50 else "19" + end_yr)
-                        if start_full <= int(year) <= end_full:
-                            year_match = True
-                            break
+                year_match = parse_fitment(title).fits(year)
             else:
                 year_match = True  # No year specified, so any match
             
@@ -961,15 +1054,15 @@ def process_ebay_results(results, query, structured_data=None, max_items=100):
         # Extract thumbnail image if available
         thumbnail = item.get("thumbnail", "")
             
-        processed_items.append({
-            "title": item.get("title"),
-            "price": price,
-            "shipping": shipping,
-            "condition": condition,
-            "link": item.get("link"),
-            "source": "eBay",
-            "image": thumbnail
-        })
+        processed_items.append(Listing(
+            title=item.get("title"),
+            price=price,
+            shipping=shipping,
+            condition=condition,
+            link=item.get("link"),
+            source="eBay",
+            image=thumbnail
+        ))
         
         debug_filter_counts["total_accepted"] += 1
     
@@ -997,8 +1090,9 @@ def get_google_shopping_results(query, part_type=None, structured_data=None):
     product_category = None
     
     # If structured_data wasn't passed directly, try to get it from the request
+    # (only possible on the request thread, not inside upstream engine workers)
     if not structured_data:
-        structured_data_json = request.form.get("structured_data", "") if hasattr(request, 'form') else None
+        structured_data_json = request.form.get("structured_data", "") if has_request_context() else None
         if structured_data_json:
             try:
                 structured_data = json.loads(structured_data_json)
@@ -1031,28 +1125,8 @@ def get_google_shopping_results(query, part_type=None, structured_data=None):
             make = vehicle_info.get("make")
             model = vehicle_info.get("model")
             
-            # Simplify make name for better search results
-            simple_make = make
-            if "mercedes" in make.lower():
-                simple_make = "Mercedes"
-            elif "chevrolet" in make.lower():
-                simple_make = "Chevy"  
-            elif "volkswagen" in make.lower():
-                simple_make = "VW"
-            
-            # Simplify model for better matches (e.g., C240 -> C)
-            simple_model = model
-            if any(char.isdigit() for char in model):
-                # For Mercedes models like C240, E350, etc.
-                if "mercedes" in make.lower() and len(model) <= 4 and (model[0].lower() in 'cels'):
-                    # Extract just the letter prefix (C, E, S, etc.)
-                    prefix = model[0]
-                    if prefix:
-                        simple_model = prefix
-                # For BMW models like 328i, 535i, etc.
-                elif "bmw" in make.lower() and model[0].isdigit():
-                    # Keep first digit (3, 5, 7, etc.)
-                    simple_model = model[0] + " series"
+            # Simplify make and model for better matches (e.g., Mercedes C240 -> Mercedes C)
+            simple_make, simple_model = vehicle_aliases.simplify_vehicle(make, model)
             
             # Check if we already have position information in the part_type (e.g. "front bumper")
             position_prefix = ""
@@ -1139,8 +1213,8 @@ def process_google_shopping_results(results, query, max_items=100):
         
         # If we have year/make/model, at least one should appear in the title (less restrictive)
         if year and make and model:
-            # Accept results if any of year, make, or model appears in the title
-            if (year not in title) and (make.lower() not in title) and (model.lower() not in title):
+            # Accept results if the title fits the year, or make or model appears in it
+            if not parse_fitment(title).fits(year) and (make.lower() not in title) and (model.lower() not in title):
                 continue
         
         # Extract and fix the link with improved error handling
@@ -1163,15 +1237,15 @@ def process_google_shopping_results(results, query, max_items=100):
             product_title = item.get("title", "").replace(" ", "+")
             link = f"https://www.google.com/search?q={product_title}&tbm=shop"
         
-        processed_items.append({
-            "title": item.get("title"),
-            "price": item.get("price", "Price not available"),
-            "shipping": item.get("shipping", "Shipping not specified"),
-            "condition": "New",  # Google Shopping typically shows new items
-            "source": "Google Shopping",
-            "link": link,  # Fixed link
-            "image": item.get("thumbnail", "")
-        })
+        processed_items.append(Listing(
+            title=item.get("title"),
+            price=item.get("price", "Price not available"),
+            shipping=item.get("shipping", "Shipping not specified"),
+            condition="New",  # Google Shopping typically shows new items
+            source="Google Shopping",
+            link=link,  # Fixed link
+            image=item.get("thumbnail", "")
+        ))
     
     return processed_items
 # Main route - original version for regular form submission
@@ -1182,6 +1256,56 @@ def index():
         return render_template("index.html")
     return render_template("index.html")
 
+def get_chat_completion_cached(model, prompt, temperature, response_format=None):
+    """
+    Return the text of a chat completion, reusing the cached response for an
+    identical model/prompt/temperature combination.
+    Raises http_client.CircuitOpenError while the OpenAI breaker is open, and
+    deadline.DeadlineExceeded when the request's deadline passes before or
+    during the completion.
+    """
+    cache_key = hashlib.sha256(
+        json.dumps([model, prompt, temperature, response_format]).encode("utf-8")
+    ).hexdigest()
+    
+    cached_content = LLM_CACHE.get(cache_key)
+    if cached_content is not None:
+        return cached_content
+    
+    request_params = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": temperature
+    }
+    if response_format:
+        request_params["response_format"] = response_format
+    
+    # While OpenAI is failing the breaker raises CircuitOpenError immediately,
+    # and callers fall back to the local query processor (as they do when the
+    # request has no time left for a completion)
+    deadline.check("the OpenAI request")
+    response = http_client.get_breaker("openai").call(_create_chat_completion, request_params)
+    content = response.choices[0].message.content.strip()
+    
+    LLM_CACHE.set(cache_key, content)
+    return content
+
+def _create_chat_completion(request_params):
+    """
+    Run a chat completion within the time the current request has left.
+    Raises deadline.DeadlineExceeded when it times out only because its
+    timeout was shortened to the deadline.
+    """
+    timeout, bounded = deadline.bounded_timeout(OPENAI_TIMEOUT)
+    if not bounded:
+        return client.chat.completions.create(**request_params)
+    try:
+        # A retry would start after the deadline, so there is only one attempt
+        return client.with_options(timeout=timeout, max_retries=0).chat.completions.create(**request_params)
+    except openai.APITimeoutError as e:
+        deadline.cut("the OpenAI request")
+        raise deadline.DeadlineExceeded("OpenAI request cut off by the request's deadline") from e
+
 # AI function to extract part information from search results
 def extract_part_info_with_ai(part_number, search_results, include_alt=False):
     """
@@ -1222,16 +1346,13 @@ IMPORTANT:
 """
 
     try:
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-4o",  # Using GPT-4o for faster responses and better capabilities
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            temperature=0.3
+        # Call OpenAI API (cached per prompt)
+        result_text = get_chat_completion_cached(
+            "gpt-4o",  # Using GPT-4o for faster responses and better capabilities
+            prompt,
+            temperature=0.3,
+            response_format={"type": "json_object"}
         )
-
-        # Extract JSON from response
-        result_text = response.choices[0].message.content.strip()
         
         # Parse JSON
         result = json.loads(result_text)
@@ -1291,9 +1412,13 @@ def get_part_number_search_results(part_number, include_oem=True, exclude_wholes
         "api_key": serpapi_key
     }
     
+    if not SERPAPI_QUOTA.acquire():
+        print(f"SerpAPI quota: skipping part number search for {part_number}")
+        return ""
+    
     try:
         # Make the API request
-        response = requests.get("https://serpapi.com/search", params=api_params, timeout=10)
+        response = http_client.get("serpapi", SERPAPI_SEARCH_URL, params=api_params)
         response.raise_for_status()
         result = response.json()
         
@@ -1341,8 +1466,11 @@ def part_number_search():
         ebay_search_url = f"https://www.ebay.com/sch/i.html?_nkw={part_number}&_sacat=6000"
         rockauto_search_url = f"https://www.rockauto.com/en/partsearch/?partnum={part_number}"
         
-        # Get real search results from Google via SerpAPI
-        search_results = get_part_number_search_results(part_number, include_oem, exclude_wholesalers)
+        # Get real search results from Google via SerpAPI (on the upstream engine,
+        # so it counts towards the SerpAPI concurrency limit)
+        search_results = run_upstream_calls([
+            ("part number search", functools.partial(get_part_number_search_results, part_number, include_oem, exclude_wholesalers))
+        ])[0] or ""
         
         # Default values in case AI processing fails
         part_type = "Automotive Part"
@@ -1407,8 +1535,12 @@ def part_number_search():
                 "amazon": amazon_search_url,
                 "ebay": ebay_search_url,
                 "rockauto": rockauto_search_url
-            }
+            },
+            "partial": deadline.cut_short()
         })
+    except UpstreamSaturated as e:
+        print(f"Part number search rejected: {e}")
+        return upstream_busy_response()
     except Exception as e:
         print(f"Error in part number search: {e}")
         return jsonify({
@@ -1428,6 +1560,9 @@ def generate_google_search_url(part_number, include_oem=True, exclude_wholesaler
     # Return the simple search URL
     return f"https://www.google.com/search?q={encoded_query}"
 
+# Titles more similar than this (difflib ratio) are treated as the same listing
+LISTING_DUPLICATE_THRESHOLD = float(os.getenv("LISTING_DUPLICATE_THRESHOLD", "0.8"))
+
 @app.route("/api/part-number-listings", methods=["POST"])
 def part_number_listings():
     """Search for product listings using part numbers"""
@@ -1463,11 +1598,20 @@ def part_number_listings():
         # Create a list of part numbers to search (primary + alternatives)
         search_part_numbers = [part_number] + alt_numbers_list
 
-        # Initialize collection for listings
-        all_listings = []
+        # Initialize collection for listings, deduplicated by title similarity
+        listing_index = ListingDedupIndex(mode=NEAR_MODE, threshold=LISTING_DUPLICATE_THRESHOLD)
+        all_listings = listing_index.listings
 
         # Get listings for each part number (primary first, then alternatives)
         for search_part in search_part_numbers:
+            # Once the deadline has passed, answer with the listings found so far
+            if deadline.expired():
+                deadline.cut(f"the searches for part {search_part}")
+                break
+            
+            # Alternative part numbers give up SerpAPI quota before the primary one
+            quota_priority = serpapi_quota.PRIMARY if search_part == part_number else serpapi_quota.FALLBACK
+            
             # Try to get listings from eBay first (faster and more reliable)
             try:
                 # Include both original part number and a clean version (without hyphens/symbols)
@@ -1477,7 +1621,8 @@ def part_number_listings():
                 else:
                     formatted_search_part = search_part
 
-                ebay_results = get_ebay_serpapi_results(formatted_search_part, part_type)
+                with serpapi_quota.priority(quota_priority):
+                    ebay_results = get_ebay_serpapi_results(formatted_search_part, part_type)
 
                 # Add source information to each listing
                 for listing in ebay_results:
@@ -1486,12 +1631,14 @@ def part_number_listings():
                     # Add a flag to indicate if this is from the primary part number
                     listing["is_primary"] = (search_part == part_number)
 
-                    # Add to our results
-                    all_listings.append(listing)
+                # Add to our results
+                listing_index.extend(ebay_results)
 
                 # If we already have enough results, stop
                 if len(all_listings) >= 20:
                     break
+            except UpstreamSaturated:
+                raise
             except Exception as ebay_err:
                 print(f"Error searching eBay for part {search_part}: {ebay_err}")
 
@@ -1505,7 +1652,10 @@ def part_number_listings():
                     else:
                         formatted_search_part = search_part
 
-                    google_results = get_google_shopping_results(formatted_search_part, part_type)
+                    with serpapi_quota.priority(quota_priority):
+                        google_results = run_upstream_calls([
+                            ("Google Shopping", functools.partial(get_google_shopping_results, formatted_search_part, part_type))
+                        ])[0]
 
                     # Add source information to each listing
                     for listing in google_results:
@@ -1515,38 +1665,30 @@ def part_number_listings():
                         listing["is_primary"] = (search_part == part_number)
 
                         # Add to our results - only if we don't already have a similar listing
-                        # Simple deduplication by checking title similarity
-                        title_lower = listing["title"].lower()
-
-                        # Check if this listing is similar to any existing one
-                        is_duplicate = False
-                        for existing in all_listings:
-                            existing_title = existing["title"].lower()
-                            # If titles are 80% similar, consider it a duplicate
-                            if similar_strings(title_lower, existing_title, 0.8):
-                                is_duplicate = True
-                                break
-
-                        if not is_duplicate:
-                            all_listings.append(listing)
+                        listing_index.add(listing)
 
                     # If we have enough results, stop
                     if len(all_listings) >= 20:
                         break
+                except UpstreamSaturated:
+                    raise
                 except Exception as google_err:
                     print(f"Error searching Google for part {search_part}: {google_err}")
 
-        # Sort listings - primary part number listings first, then by price
-        all_listings.sort(key=lambda x: (not x.get("is_primary", False), get_price_value(x.get("price", ""))))
+        # Primary part number listings first, then by price; only the top 20 are returned
+        top_listings = ranking.part_number_pipeline().rank(all_listings, limit=20)
 
-        # Limit total number of listings to return (max 20)
         return jsonify({
             "success": True,
             "part_number": part_number,
             "alt_numbers": alt_numbers_list,
-            "listings": all_listings[:20],
-            "total": len(all_listings[:20])
+            "listings": top_listings,
+            "total": len(top_listings),
+            "partial": deadline.cut_short()
         })
+    except UpstreamSaturated as e:
+        print(f"Part number listings search rejected: {e}")
+        return upstream_busy_response()
     except Exception as e:
         print(f"Error in part number listings search: {e}")
         traceback.print_exc()
@@ -1555,32 +1697,11 @@ def part_number_listings():
             "error": "An error occurred while searching for product listings. Please try again."
         })
 
-# Helper function to check string similarity for deduplication
-def similar_strings(str1, str2, threshold=0.8):
-    """Check if two strings are similar enough using difflib"""
-    if not str1 or not str2:
-        return False
-
-    # For very short strings, use simple matching
-    if len(str1) < 10 or len(str2) < 10:
-        return str1 in str2 or str2 in str1
-
-    # For longer strings, use sequence matching
-    return difflib.SequenceMatcher(None, str1, str2).ratio() > threshold
-
 # Helper function to extract numeric price value for sorting
 def get_price_value(price_str):
-    """Extract numeric price value from price string"""
-    if not price_str:
-        return float('inf')  # Unknown prices go to the end
-
-    # Remove non-numeric characters, keeping only digits and decimal point
-    price_str = re.sub(r'[^0-9.]', '', price_str)
-
-    try:
-        return float(price_str)
-    except:
-        return float('inf')  # If conversion fails, move to the end
+    """Extract numeric price value from price string (unknown prices sort last)"""
+    # Listings carry this pre-parsed as Listing.price_value
+    return parse_price(price_str)
 
 def guess_part_type(part_number):
     """Guess the part type based on part number patterns"""
@@ -1907,6 +2028,15 @@ def analyze_query():
             "validation_error": "Please enter a valid search query."
         })
     
+    return jsonify(query_analysis(query, processed_result))
+
+def query_analysis(query, processed_result=None):
+    """
+    Analyze a query with GPT-4 and return the /api/analyze response body
+    (questions and optimized search terms). Falls back to the local query
+    processor's terms when the completion fails. Needs no request context,
+    so it can run on the upstream engine alongside a product search.
+    """
     # Process with our query processor if needed
     if not processed_result:
         processed_result = query_processor.process_query(query)
@@ -1915,10 +2045,10 @@ def analyze_query():
     # Check if query has sufficient vehicle information
     if not has_vehicle_info(query):
         validation_error = get_missing_info_message(query)
-        return jsonify({
+        return {
             "success": False,
             "validation_error": validation_error
-        })
+        }
 
     # Extract model for prompt
     model_info = ""
@@ -1975,13 +2105,7 @@ Position: {processed_result["vehicle_info"].get("position", "not specified")}
 """
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4-1106-preview",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.4
-        )
-
-        questions = response.choices[0].message.content.strip()
+        questions = get_chat_completion_cached("gpt-4-1106-preview", prompt, temperature=0.4)
 
         # Use GPT-generated search term if available, else fallback to processed query
         search_lines = [line for line in questions.split("\n") if "🔎" in line]
@@ -2025,26 +2149,30 @@ Position: {processed_result["vehicle_info"].get("position", "not specified")}
                 search_term = clean_query(query)
                 fallback_term = None
 
-        return jsonify({
+        return {
             "success": True,
             "questions": questions,
             "search_terms": [search_term, fallback_term] if fallback_term else [search_term]
-        })
+        }
     except Exception as e:
         print(f"API error: {e}")
         
         # Fallback to our processor if GPT fails
-        if processed_result["search_terms"]:
-            search_terms = processed_result["search_terms"]
-            model_text = ""
-            if processed_result["vehicle_info"]["model"]:
-                model = processed_result["vehicle_info"]["model"]
-                if model.lower() in ["f-150", "f150", "f-250", "f250", "f-350", "f350"]:
-                    model_text = f" {model.upper()}"
-                else:
-                    model_text = f" {model}"
-                
-            questions = f"""
+        return local_query_analysis(processed_result)
+
+def local_query_analysis(processed_result):
+    """/api/analyze response body built from the local query processor's result alone"""
+    if processed_result["search_terms"]:
+        search_terms = processed_result["search_terms"]
+        model_text = ""
+        if processed_result["vehicle_info"]["model"]:
+            model = processed_result["vehicle_info"]["model"]
+            if model.lower() in ["f-150", "f150", "f-250", "f250", "f-350", "f350"]:
+                model_text = f" {model.upper()}"
+            else:
+                model_text = f" {model}"
+            
+        questions = f"""
 - Vehicle: {processed_result["vehicle_info"]["year"] or ""} {(processed_result["vehicle_info"]["make"] or "").capitalize()}{model_text}
 - Part: {processed_result["vehicle_info"]["part"] or ""}
 
@@ -2052,145 +2180,292 @@ Question 1: Do you need any associated hardware with this part?
 
 🔎 {search_terms[0]}
 """
-            if len(search_terms) > 1:
-                questions += f"\n🔎 {search_terms[1]}"
-                
-            return jsonify({
-                "success": True,
-                "questions": questions,
-                "search_terms": search_terms,
-                "processed_locally": True
-            })
-        else:
-            return jsonify({
-                "success": False,
-                "error": "An error occurred while processing your request. Please try again later."
-            })
+        if len(search_terms) > 1:
+            questions += f"\n🔎 {search_terms[1]}"
+            
+        return {
+            "success": True,
+            "questions": questions,
+            "search_terms": search_terms,
+            "processed_locally": True
+        }
+    else:
+        return {
+            "success": False,
+            "error": "An error occurred while processing your request. Please try again later."
+        }
 
 # AJAX endpoint for product search
-def prioritize_exact_part_matches(listings, part_query):
+def rank_product_listings(listings, query, vehicle_info, part_query=None, limit=None, facet_counter=None):
     """
-    Prioritizes listings that exactly match the user's part query.
+    Score and order search-products listings and flag the best matches.
     
     Args:
-        listings: List of product listings
-        part_query: The specific part the user searched for (e.g., "engine")
+        listings: List of Listing records
+        query: The search term
+        vehicle_info: The extracted vehicle information
+        part_query: The specific part the user searched for (e.g., "engine");
+            when given, exact part matches are ranked first
+        limit: Only return the first `limit` ranked listings
+        facet_counter: Optional FacetCounter that counts facets in the same pass
         
     Returns:
-        Sorted list with exact matches first
+        Ranked list of listings
     """
-    print(f"Prioritizing {len(listings)} listings for part: '{part_query}'")
+    if part_query:
+        print(f"Prioritizing {len(listings)} listings for part: '{part_query}'")
     
-    exact_complete_matches = []
-    exact_matches = []
-    related_matches = []
-    other_matches = []
+    extra_stages = [facet_counter] if facet_counter is not None else []
+    ranked = ranking.search_pipeline(query, vehicle_info, part_query, extra_stages).rank(listings, limit)
     
-    # Clean the part query
-    clean_part = part_query.lower().strip()
+    if part_query:
+        match_counts = {match_type: 0 for match_type in ranking.MATCH_TYPE_ORDER}
+        for item in ranked:
+            match_counts[item["matchType"]] += 1
+        print(f"Found {match_counts['exact_complete']} exact complete matches, {match_counts['exact']} exact matches, {match_counts['related']} related matches")
     
-    # Words that indicate a complete/full part
-    complete_indicators = ["complete", "assembly", "full", "entire", "oem", "motor", "assembly", "unit", "module"]
+    return ranked
+
+def product_search_payload(search, page, page_size, paginate=False, freshness=None):
+    """
+    Rank the listings of a finished ProductSearch, counting facets in the same
+    pass, and build the response body (see ranked_search_payload).
     
-    # Words that indicate parts or accessories
-    part_indicators = ["cap", "cover", "filter", "sensor", "switch", "gasket", "seal", "bolt", "nut", "harness", "wire"]
+    freshness is the response_cache.SourceFreshness of the upstream data the
+    search read; the ranked response is cached until that data expires,
+    unless the request's deadline cut the search short.
+    """
+    year = search.vehicle_info.get("year")
+    facet_counter = FacetCounter(year=year)
     
-    # Special case for engines
-    engine_indicators = []
-    if clean_part == "engine":
-        engine_indicators = ["complete engine", "engine assembly", "motor assembly", 
-                         "long block", "short block", "engine motor", "complete motor"]
+    # Score every listing, order by part match type (or relevance when there
+    # is no specific part) and flag the best matches for UI highlight
+    ranked = rank_product_listings(
+        search.listings, search.search_term, search.vehicle_info, search.part_type, facet_counter=facet_counter
+    )
+    facets = facet_counter.counts()
+    
+    ttl = freshness.ttl() if freshness is not None else None
+    result_id = None
+    if ttl and not search.partial:
+        result_id = SEARCH_RESPONSES.result_id(search.original_search_term, search.original_query, search.structured_data)
+        SEARCH_RESPONSES.set(
+            search.original_search_term, search.original_query, search.structured_data,
+            ranked, facets, ttl, year=year, result_id=result_id
+        )
     
-    for item in listings:
-        title = item.get("title", "").lower()
-        
-        # Special case for engines
-        if clean_part == "engine" and any(indicator in title for indicator in engine_indicators):
-            item["matchType"] = "exact_complete"
-            item["priorityScore"] = 150  # Higher priority for complete engines
-            item["isExactMatch"] = True
-            exact_complete_matches.append(item)
-            continue  # Skip other checks
-        
-        # Check for exact part name match with word boundaries
-        if re.search(r'\b' + re.escape(clean_part) + r'\b', title):
-            # Check if it's likely a complete part
-            if any(indicator in title for indicator in complete_indicators):
-                item["matchType"] = "exact_complete"
-                item["priorityScore"] = 100
-                item["isExactMatch"] = True
-                exact_complete_matches.append(item)
-            # Check if it's likely just a small part of the main component
-            elif any(indicator in title for indicator in part_indicators):
-                item["matchType"] = "related"
-                item["priorityScore"] = 50
-                item["isExactMatch"] = False
-                related_matches.append(item)
-            else:
-                item["matchType"] = "exact"
-                item["priorityScore"] = 80
-                item["isExactMatch"] = True
-                exact_matches.append(item)
-        # Check if part name is mentioned but not as an exact match
-        elif clean_part in title:
-            item["matchType"] = "related"
-            item["priorityScore"] = 40
-            item["isExactMatch"] = False
-            related_matches.append(item)
-        else:
-            item["matchType"] = "other"
-            item["priorityScore"] = 10
-            item["isExactMatch"] = False
-            other_matches.append(item)
+    return ranked_search_payload(
+        ranked, facets, year, page, page_size, paginate,
+        partial=search.partial, stale=search_cache.served_stale(), result_id=result_id
+    )
+
+def cached_search_payload(search_term, original_query, structured_data, page, page_size, paginate=False):
+    """Response body for a search whose ranked response is cached, or None"""
+    cached = SEARCH_RESPONSES.get(search_term, original_query, structured_data)
+    if cached is None:
+        return None
+    ranked, facets, meta = cached
+    print(f"Serving cached ranked response for: {search_term}")
+    return ranked_search_payload(ranked, facets, meta.get("year"), page, page_size, paginate,
+                                 result_id=meta.get("result_id"))
+
+def ranked_search_payload(ranked, facets, year, page, page_size, paginate=False, partial=False, stale=False,
+                          result_id=None):
+    """
+    Store ranked search-products listings for the filter and page endpoints
+    and build the response body.
+    
+    With paginate, only the requested page is returned, plus a cursor for the
+    next one; otherwise every ranked listing is returned, as clients that
+    don't ask for pages expect. partial marks results of a search the
+    request's deadline cut short, stale results built from expired cache
+    entries. A cached search passes its result_id, so repeats replace its
+    stored result set (keeping earlier cursors valid) rather than filling the
+    store with copies.
+    """
+    result_id = RESULT_SETS.save(ranked, result_id=result_id, year=year)
     
-    print(f"Found {len(exact_complete_matches)} exact complete matches, {len(exact_matches)} exact matches, {len(related_matches)} related matches")
+    if paginate:
+        offset = (page - 1) * page_size
+        page_listings = ranked[offset:offset + page_size]
+        cursor = next_cursor(result_id, offset, page_size, len(ranked))
+    else:
+        page_listings = ranked
+        cursor = None
     
-    # Return prioritized results
-    return exact_complete_matches + exact_matches + related_matches + other_matches
+    return {
+        "success": True,
+        "listings": page_listings,
+        "total": len(ranked),
+        "exactMatchCount": sum(1 for item in ranked if item.get("isExactMatch", False)),
+        "facets": facets,
+        "result_id": result_id,
+        "next_cursor": cursor,
+        "page": page,
+        "pageSize": page_size,
+        "partial": partial,
+        "stale": stale
+    }
 
-@app.route("/api/search-products", methods=["POST"])
-def search_products():
-    """Search for products using the provided search term with pagination support"""
-    search_term = sanitize_input(request.form.get("search_term", ""))
-    original_query = sanitize_input(request.form.get("original_query", ""))
-    page = int(request.form.get("page", "1"))
-    page_size = int(request.form.get("page_size", "24"))  # Default to 24 products per page
+# Labels for the sources of the first search round, as reported to streaming clients
+SOURCE_STAGE_LABELS = {
+    "new": "eBay (new)",
+    "used": "eBay (used)"
+}
+
+# Fallback stages of a product search the planner keeps history for
+GOOGLE_BACKUP_STAGE = "google_backup"
+SIMPLIFIED_STAGE = "simplified"
+CLASSIC_BUMPER_STAGE = "classic_bumper"
+
+def parse_structured_data(structured_data_json):
+    """Parse the structured_data form field of a product search (None if absent or invalid)"""
+    structured_data = None
     
-    # Debug logs for identifying field vs single field search
-    print(f"[DEBUG] search_products - search_term: {search_term}")
-    print(f"[DEBUG] search_products - original_query: {original_query}")
+    if structured_data_json:
+        try:
+            structured_data = json.loads(structured_data_json)
+            print(f"[DEBUG] search_products - Received structured data: {structured_data}")
+            
+            # Validate and ensure all fields are properly formatted
+            if structured_data and isinstance(structured_data, dict):
+                # Ensure year is a string
+                if 'year' in structured_data and structured_data['year']:
+                    structured_data['year'] = str(structured_data['year']).strip()
+                    print(f"[DEBUG] search_products - Validated year: {structured_data['year']}")
+                
+                # Ensure other fields are strings
+                for field in ['make', 'model', 'part', 'engine']:
+                    if field in structured_data and structured_data[field]:
+                        structured_data[field] = str(structured_data[field]).strip()
+            
+        except Exception as e:
+            print(f"Error parsing structured data in search-products: {e}")
+            # Continue with regular processing
     
-    if not search_term:
-        return jsonify({
-            "success": False,
-            "error": "No search term provided"
-        })
+    return structured_data
+
+class ProductSearch:
+    """
+    One product search: builds the search terms, queries the marketplaces and
+    runs the fallback searches, collecting the listings in a request-scoped
+    dedup index.
     
-    try:
-        # Parse structured data if provided
-        structured_data = None
-        structured_data_json = request.form.get("structured_data", "")
+    run() is a generator that yields (stage label, listings added by the stage)
+    as each source or fallback stage completes, so callers can either drain it
+    or stream the batches. Once it is exhausted, listings, search_term,
+    vehicle_info and part_type hold what the final ranking needs.
+    
+    Fallback stages the planner expects this search to need are started
+    together with the first round (see fallback_planner.py); whatever is
+    still pending when the search ends is cancelled.
+    
+    The search stops early when the request's deadline passes (see
+    deadline.py); partial is then True and listings hold what was collected.
+    """
+    
+    def __init__(self, search_term, original_query, structured_data=None):
+        self.original_search_term = search_term
+        self.original_query = original_query
+        self.structured_data = structured_data
+        self.listing_index = ListingDedupIndex()
+        self.search_term = search_term
+        self.vehicle_info = {}
+        self.part_type = None
+        self.fallback_stages = {}
+        self.profile = None
+        self.partial = False
+    
+    @property
+    def listings(self):
+        return self.listing_index.listings
+    
+    def run(self):
+        try:
+            yield from self._search()
+        except deadline.DeadlineExceeded as e:
+            print(f"Search stopped early: {e}")
+        finally:
+            for stage in self.fallback_stages.values():
+                stage.cancel()
+            self.partial = deadline.cut_short()
+    
+    def _plan_fallbacks(self, search_term, vehicle_info, part_type):
+        """
+        Build the fallback stages this search could run, keyed by stage name,
+        and start the ones the planner expects to be needed
+        """
+        original_query = self.original_query
+        structured_data = self.structured_data
+        stages = []
+        
+        # Google Shopping with a very simple term, for bumpers and engines
+        if part_type and ("bumper" in part_type.lower() or "engine" in part_type.lower()):
+            if vehicle_info.get("year") and vehicle_info.get("make"):
+                simple_term = f"{vehicle_info.get('year')} {vehicle_info.get('make')} {part_type}"
+                stages.append(fallback_planner.FallbackStage(GOOGLE_BACKUP_STAGE, [
+                    ("Google Shopping (simplified)", functools.partial(get_serpapi_cached, "google_shopping", simple_term))
+                ], simple_term))
         
-        if structured_data_json:
-            try:
-                structured_data = json.loads(structured_data_json)
-                print(f"[DEBUG] search_products - Received structured data: {structured_data}")
-                
-                # Validate and ensure all fields are properly formatted
-                if structured_data and isinstance(structured_data, dict):
-                    # Ensure year is a string
-                    if 'year' in structured_data and structured_data['year']:
-                        structured_data['year'] = str(structured_data['year']).strip()
-                        print(f"[DEBUG] search_products - Validated year: {structured_data['year']}")
-                    
-                    # Ensure other fields are strings
-                    for field in ['make', 'model', 'part', 'engine']:
-                        if field in structured_data and structured_data[field]:
-                            structured_data[field] = str(structured_data[field]).strip()
-                
-            except Exception as e:
-                print(f"Error parsing structured data in search-products: {e}")
-                # Continue with regular processing
+        # Year, make, (model) and part only, on every source
+        if original_query:
+            info = extract_vehicle_info_from_query(original_query)
+            if info["year"] and info["make"] and info["part"]:
+                simple_term = f"{info['year']} {info['make']} {info['part']}"
+                if info["model"]:
+                    simple_term = f"{info['year']} {info['make']} {info['model']} {info['part']}"
+                stages.append(fallback_planner.FallbackStage(SIMPLIFIED_STAGE,
+                    [("Google Shopping", functools.partial(get_google_shopping_results, simple_term, part_type, structured_data))] +
+                    ebay_search_calls(simple_term, part_type, structured_data),
+                    simple_term))
+        
+        # eBay bumper search with a year range for classic (pre-2000) vehicles
+        if part_type and "bumper" in part_type.lower():
+            info = extract_vehicle_info_from_query(original_query or search_term)
+            is_ford_f_series = info["make"] and info["make"].lower() == "ford" and info["model"] and "f-" in info["model"].lower()
+            if not is_ford_f_series and info["year"] and int(info["year"]) < 2000:
+                year_range_start = max(int(info["year"]) - 3, 1960)
+                year_range_end = min(int(info["year"]) + 3, 2000)
+                direct_term = f"{info['year']} {info['make']} {info['model']} front bumper fits {year_range_start}-{year_range_end}"
+                stages.append(fallback_planner.FallbackStage(CLASSIC_BUMPER_STAGE,
+                    ebay_search_calls(direct_term, "bumper", structured_data), direct_term))
+        
+        self.fallback_stages = {stage.name: stage for stage in stages}
+        self.profile = fallback_planner.search_profile(part_type, vehicle_info.get("year"))
+        started = FALLBACK_PLANNER.plan(stages, self.profile)
+        if started:
+            print(f"Starting likely fallback searches early: {', '.join(stage.name for stage in started)}")
+    
+    def _fallback_needed(self, name, needed):
+        """Record whether a planned stage is needed (cancelling it if not); returns the stage or None"""
+        stage = self.fallback_stages.get(name)
+        if stage is None:
+            return None
+        FALLBACK_PLANNER.record(stage, self.profile, needed)
+        if needed:
+            # No fallback stage starts once the deadline has passed
+            deadline.check(f"the {name} fallback search")
+        return stage if needed else None
+    
+    def _fallback_results(self, stage, has_results):
+        """
+        One result per call of a needed fallback stage. Results of a stage
+        started early are used when has_results accepts them; otherwise the
+        calls run now at fallback priority (speculative calls skipped by the
+        quota come back empty and aren't cached, so this costs nothing extra
+        when they were genuinely empty).
+        """
+        if stage.speculative:
+            results = stage.results()
+            if has_results(results):
+                return results
+        with serpapi_quota.priority(serpapi_quota.FALLBACK):
+            return run_upstream_calls(stage.labeled_calls)
+    
+    def _search(self):
+        search_term = self.original_search_term
+        original_query = self.original_query
+        structured_data = self.structured_data
         
         # Extract vehicle info for filtering with structured data priority
         vehicle_info = extract_vehicle_info_from_query(original_query or search_term, structured_data)
@@ -2209,28 +2484,8 @@ def search_products():
                     make = vehicle_info.get("make")
                     model = vehicle_info.get("model")
                     
-                    # Simplify make name for better search results
-                    simple_make = make
-                    if "mercedes" in make.lower():
-                        simple_make = "Mercedes"
-                    elif "chevrolet" in make.lower():
-                        simple_make = "Chevy"  
-                    elif "volkswagen" in make.lower():
-                        simple_make = "VW"
-                    
-                    # Simplify model for better matches (e.g., C240 -> C)
-                    simple_model = model
-                    if any(char.isdigit() for char in model):
-                        # For Mercedes models like C240, E350, etc.
-                        if "mercedes" in make.lower() and len(model) <= 4 and (model[0].lower() in 'cels'):
-                            # Extract just the letter prefix (C, E, S, etc.)
-                            prefix = model[0]
-                            if prefix:
-                                simple_model = prefix
-                        # For BMW models like 328i, 535i, etc.
-                        elif "bmw" in make.lower() and model[0].isdigit():
-                            # Keep first digit (3, 5, 7, etc.)
-                            simple_model = model[0] + " series"
+                    # Simplify make and model for better matches (e.g., Mercedes C240 -> Mercedes C)
+                    simple_make, simple_model = vehicle_aliases.simplify_vehicle(make, model)
                     
                     engine_term = f"{year} {simple_make} {simple_model} complete engine motor assembly"
                     print(f"Using engine-specific search term: {engine_term}")
@@ -2251,28 +2506,8 @@ def search_products():
                 make_val = vehicle_info.get("make")
                 model_val = vehicle_info.get("model")
                 
-                # Simplify make name for better search results
-                simple_make = make_val
-                if make_val and "mercedes" in make_val.lower():
-                    simple_make = "Mercedes"
-                elif make_val and "chevrolet" in make_val.lower():
-                    simple_make = "Chevy"  
-                elif make_val and "volkswagen" in make_val.lower():
-                    simple_make = "VW"
-                
-                # Simplify model for better matches (e.g., C240 -> C)
-                simple_model = model_val
-                if model_val and any(char.isdigit() for char in model_val):
-                    # For Mercedes models like C240, E350, etc.
-                    if make_val and "mercedes" in make_val.lower() and len(model_val) <= 4 and (model_val[0].lower() in 'cels'):
-                        # Extract just the letter prefix (C, E, S, etc.)
-                        prefix = model_val[0]
-                        if prefix:
-                            simple_model = prefix
-                    # For BMW models like 328i, 535i, etc.
-                    elif make_val and "bmw" in make_val.lower() and model_val[0].isdigit():
-                        # Keep first digit (3, 5, 7, etc.)
-                        simple_model = model_val[0] + " series"
+                # Simplify make and model for better matches (e.g., Mercedes C240 -> Mercedes C)
+                simple_make, simple_model = vehicle_aliases.simplify_vehicle(make_val, model_val)
                 
                 if year_val and simple_make and simple_model:
                     # If we have complete vehicle info, create an optimized bumper query
@@ -2292,28 +2527,8 @@ def search_products():
                 make_val = vehicle_info.get("make")
                 model_val = vehicle_info.get("model")
                 
-                # Simplify make name for better search results
-                simple_make = make_val
-                if make_val and "mercedes" in make_val.lower():
-                    simple_make = "Mercedes"
-                elif make_val and "chevrolet" in make_val.lower():
-                    simple_make = "Chevy"  
-                elif make_val and "volkswagen" in make_val.lower():
-                    simple_make = "VW"
-                
-                # Simplify model for better matches (e.g., C240 -> C)
-                simple_model = model_val
-                if model_val and any(char.isdigit() for char in model_val):
-                    # For Mercedes models like C240, E350, etc.
-                    if make_val and "mercedes" in make_val.lower() and len(model_val) <= 4 and (model_val[0].lower() in 'cels'):
-                        # Extract just the letter prefix (C, E, S, etc.)
-                        prefix = model_val[0]
-                        if prefix:
-                            simple_model = prefix
-                    # For BMW models like 328i, 535i, etc.
-                    elif make_val and "bmw" in make_val.lower() and model_val[0].isdigit():
-                        # Keep first digit (3, 5, 7, etc.)
-                        simple_model = model_val[0] + " series"
+                # Simplify make and model for better matches (e.g., Mercedes C240 -> Mercedes C)
+                simple_make, simple_model = vehicle_aliases.simplify_vehicle(make_val, model_val)
                 
                 if year_val and simple_make and simple_model:
                     # If we have complete vehicle info, create an optimized transmission query
@@ -2328,8 +2543,10 @@ def search_products():
                 
                 search_term = trans_term
         
-        # Try multiple search strategies (fallbacks if needed)
-        all_listings = []
+        # Try multiple search strategies (fallbacks if needed); every stage adds to
+        # one index keyed by the first words of the title plus the source
+        listing_index = self.listing_index
+        all_listings = listing_index.listings
         
         # Determine if this is a field-based search with specific fields
         is_field_search = False
@@ -2355,20 +2572,12 @@ def search_products():
                 is_field_search = True
                 # Create a simpler search term for eBay based on what we have
                 if year and model and part and make:
-                    # For Mercedes-Benz, simplify to just Mercedes
-                    if "mercedes" in make.lower():
-                        simple_make = "Mercedes"
-                    else:
-                        simple_make = make
-                        
+                    # Short make name (Mercedes-Benz -> Mercedes, Chevrolet -> Chevy)
+                    simple_make = vehicle_aliases.simplify_make(make)
+                    
                     # For model, just use the base part without numbers for better matches
                     # Examples: "C240" -> "C", "F-150" -> "F"
-                    simple_model = model
-                    if any(char.isdigit() for char in model):
-                        # Extract just the letter prefix (C, E, S, F, etc.)
-                        prefix = ''.join(c for c in model if not c.isdigit() and c != '-').strip()
-                        if prefix:
-                            simple_model = prefix
+                    simple_model = vehicle_aliases.model_letter_prefix(model)
                     
                     simple_term = f"{year} {simple_make} {simple_model} {part}".replace("  ", " ").strip()
                 elif year and part:
@@ -2380,6 +2589,10 @@ def search_products():
                 print(f"Using simpler search term for eBay: {simple_term}")
                 cleaner_search_term = simple_term
                 
+        self.search_term = search_term
+        self.vehicle_info = vehicle_info
+        self.part_type = part_type
+        
         # Strategy 1: Direct search with term
         # Debug log for field-based search
         print(f"[DEBUG] search_products - Using search terms:")
@@ -2387,308 +2600,172 @@ def search_products():
         print(f"[DEBUG]   - search_term: {search_term}")
         print(f"[DEBUG]   - structured_data: {structured_data}")
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-            # For eBay, use the cleaner search term without special characters/formatting
-            # Always pass structured_data to ensure correct year is used
-            ebay_future = executor.submit(get_ebay_serpapi_results, cleaner_search_term, part_type, structured_data)
-            google_future = executor.submit(get_google_shopping_results, search_term, part_type, structured_data)
-            
-            ebay_listings = ebay_future.result()
-            google_listings = google_future.result()
-            
-            # Prioritize Google listings by adding them first
-            all_listings.extend(google_listings)
-            all_listings.extend(ebay_listings)
+        # Start the fallback searches this search will likely need now, so they
+        # overlap with the first round instead of following it
+        self._plan_fallbacks(search_term, vehicle_info, part_type)
+        
+        # eBay new/used and Google Shopping all run together on the upstream engine.
+        # For eBay, use the cleaner search term without special characters/formatting
+        # Always pass structured_data to ensure correct year is used
+        source_calls = ebay_search_calls(cleaner_search_term, part_type, structured_data) + [
+            ("Google Shopping", functools.partial(get_google_shopping_results, search_term, part_type, structured_data))
+        ]
+        source_listings = [[] for _ in source_calls]
+        for index, label, listings in iter_upstream_calls(source_calls):
+            source_listings[index] = listings
+            yield SOURCE_STAGE_LABELS.get(label, label), listings
+        ebay_new_listings, ebay_used_listings, google_listings = source_listings
+        ebay_listings = ebay_new_listings + ebay_used_listings
+        
+        # Prioritize Google listings by adding them first
+        listing_index.extend(google_listings)
+        listing_index.extend(ebay_listings)
         
         # If we have too few Google Shopping results for certain parts, try again with a simpler term
-        if part_type and len(google_listings) < 3 and ("bumper" in part_type.lower() or "engine" in part_type.lower()):
-            # Create a very simple search term
-            if vehicle_info.get("year") and vehicle_info.get("make"):
-                simple_term = f"{vehicle_info.get('year')} {vehicle_info.get('make')} {part_type}"
-                print(f"Too few Google results, trying simplified term: {simple_term}")
-                
-                # Try a direct Google Shopping search with minimal filtering
-                backup_results = get_serpapi_cached("google_shopping", simple_term)
-                backup_items = []
-                
-                # Process with very minimal filtering
-                for item in backup_results.get("shopping_results", []):
-                    title = item.get("title", "").lower()
-                    
-                    # Only the most basic filtering
-                    if vehicle_info.get("make") and vehicle_info.get("make").lower() not in title:
-                        continue
-                        
-                    # Extract link and other details with proper validation
-                    link = None
-                    
-                    # Try different possible structures for the link with validation
-                    if item.get("link") and isinstance(item.get("link"), str) and item.get("link").startswith("http"):
-                        link = item.get("link")
-                    elif item.get("product_link") and isinstance(item.get("product_link"), str) and item.get("product_link").startswith("http"):
-                        link = item.get("product_link")
-                    elif item.get("link_text") and isinstance(item.get("link_text"), str) and item.get("link_text").startswith("http"):
-                        link = item.get("link_text")
-                    elif isinstance(item.get("link_object"), dict):
-                        potential_link = item.get("link_object", {}).get("link", "")
-                        if isinstance(potential_link, str) and potential_link.startswith("http"):
-                            link = potential_link
-                    
-                    # If still no link, create a more reliable Google search link
-                    if not link or link == "" or not isinstance(link, str) or not link.startswith("http"):
-                        product_title = item.get("title", "").replace(" ", "+")
-                        link = f"https://www.google.com/search?q={product_title}&tbm=shop"
-                    
-                    backup_items.append({
-                        "title": item.get("title"),
-                        "price": item.get("price", "Price not available"),
-                        "shipping": item.get("shipping", "Shipping not specified"),
-                        "condition": "New",  # Google Shopping typically shows new items
-                        "source": "Google Shopping",
-                        "link": link,
-                        "image": item.get("thumbnail", "")
-                    })
-                
-                # Append these items to our list
-                all_listings.extend(backup_items)
-                print(f"Added {len(backup_items)} additional Google Shopping items")
-        
-        # If we don't have enough results, try with a simplified search
-        if len(all_listings) < 8 and original_query:
-            # Extract core information
-            info = extract_vehicle_info_from_query(original_query)
-            if info["year"] and info["make"] and info["part"]:
-                # Create a simpler search term
-                simple_term = f"{info['year']} {info['make']} {info['part']}"
-                if info["model"]:
-                    simple_term = f"{info['year']} {info['make']} {info['model']} {info['part']}"
-                
-                print(f"Not enough results with original search. Trying simplified term: {simple_term}")
-                
-                # Try the simpler search term - prioritize Google Shopping
-                print(f"[DEBUG] search_products - Fallback using simpler term: {simple_term}")
-                print(f"[DEBUG] search_products - Fallback still using original structured data: {structured_data}")
-                
-                with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-                    google_future = executor.submit(get_google_shopping_results, simple_term, part_type, structured_data)
-                    ebay_future = executor.submit(get_ebay_serpapi_results, simple_term, part_type, structured_data)
-                    
-                    google_listings = google_future.result()
-                    ebay_listings = ebay_future.result()
-                    
-                    # Add only new unique listings with improved deduplication, adding Google results first
-                    existing_keys = {}  # Track existing items by both title and source
-                    for idx, item in enumerate(all_listings):
-                        # Create a composite key of title + first words of title for fuzzy matching
-                        title_lower = item["title"].lower()
-                        first_words = ' '.join(title_lower.split()[:5]) if title_lower else ""
-                        key = (first_words, item.get("source", ""))
-                        existing_keys[key] = idx
-                    
-                    # Process new items with better deduplication
-                    for item in ebay_listings + google_listings:
-                        title_lower = item["title"].lower()
-                        first_words = ' '.join(title_lower.split()[:5]) if title_lower else ""
-                        item_source = item.get("source", "")
-                        key = (first_words, item_source)
-                        
-                        # If this exact item doesn't exist yet, add it
-                        if key not in existing_keys:
-                            all_listings.append(item)
-                            existing_keys[key] = len(all_listings) - 1
-        
-        # If still not enough results and this is a bumper search, try an even more specific search
-        if len(all_listings) < 12 and part_type and "bumper" in part_type.lower():
-            # Extract vehicle info for specialized searches
-            info = extract_vehicle_info_from_query(original_query or search_term)
-            
-            # For Ford F-series trucks, try a direct bumper assembly search
-            if info["make"] and info["make"].lower() == "ford" and info["model"] and "f-" in info["model"].lower():
-                direct_term = f"{info['year']} Ford {info['model'].upper()} front bumper assembly OEM"
-            
-            # Special case for classic/older vehicles
-            elif info["year"] and int(info["year"]) < 2000:
-                # For older vehicles, try a more specific search directly on eBay
-                # eBay tends to have better inventory for classic car parts
-                year_range_start = max(int(info["year"]) - 3, 1960)
-                year_range_end = min(int(info["year"]) + 3, 2000)
-                
-                # Try with year range for better results with older vehicles
-                direct_term = f"{info['year']} {info['make']} {info['model']} front bumper fits {year_range_start}-{year_range_end}"
-                print(f"Trying specialized classic vehicle search: {direct_term}")
-                
-                # Add another specialized search for older vehicles - search directly on eBay
-                # Make sure we still pass structured data even for specialized searches
-                print(f"[DEBUG] search_products - Specialized classic vehicle search: {direct_term}")
-                print(f"[DEBUG] search_products - Still using original structured data: {structured_data}")
-                
-                with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                    ebay_future = executor.submit(get_ebay_serpapi_results, direct_term, "bumper", structured_data)
-                    ebay_listings = ebay_future.result()
-                    
-                    # Create a map of existing items
-                    existing_keys = {}
-                    for idx, item in enumerate(all_listings):
-                        title_lower = item["title"].lower()
-                        first_words = ' '.join(title_lower.split()[:5]) if title_lower else ""
-                        key = (first_words, item.get("source", ""))
-                        existing_keys[key] = idx
-                    
-                    # Add unique items
-                    for item in ebay_listings:
-                        title_lower = item["title"].lower()
-                        first_words = ' '.join(title_lower.split()[:5]) if title_lower else ""
-                        item_source = item.get("source", "")
-                        key = (first_words, item_source)
-                        
-                        if key not in existing_keys:
-                            all_listings.append(item)
-                            existing_keys[key] = len(all_listings) - 1
-                            
-                return_early = False
+        # (bumpers and engines with a year and make, see _plan_fallbacks)
+        stage = self._fallback_needed(GOOGLE_BACKUP_STAGE, len(google_listings) < 3)
+        if stage:
+            simple_term = stage.term
+            print(f"Too few Google results, trying simplified term: {simple_term}")
+            
+            # Try a direct Google Shopping search with minimal filtering
+            backup_results = self._fallback_results(
+                stage, lambda results: bool(results[0] and results[0].get("shopping_results"))
+            )[0] or {}
+            backup_items = []
+            
+            # Process with very minimal filtering
+            for item in backup_results.get("shopping_results", []):
+                title = item.get("title", "").lower()
                 
-                # Continue with original search if still needed
-                if info["make"] and info["make"].lower() == "ford" and info["model"] and "f-" in info["model"].lower():
-                    direct_term = f"{info['year']} Ford {info['model'].upper()} front bumper assembly OEM"
-                else:
-                    return_early = True
-                    
-                if return_early:
-                    # We have enough results, proceed to sorting and filtering
-                    # Skip the remaining specialized searches
-                    
-                    # Sort by relevance score
-                    all_listings = [add_relevance_score(item, search_term, vehicle_info) for item in all_listings]
-                    
-                    # If we have part information, prioritize exact matches
-                    if part_type:
-                        all_listings = prioritize_exact_part_matches(all_listings, part_type)
-                    else:
-                        # Sort by relevance score by default when we don't have a specific part
-                        all_listings.sort(key=lambda x: x.get("relevanceScore", 0), reverse=True)
-                    
-                    # Add "Best Match" flag for top matches for UI highlight
-                    for i, item in enumerate(all_listings):
-                        if i < 4 or item.get("priorityScore", 0) > 80:
-                            item["bestMatch"] = True
-                        else:
-                            item["bestMatch"] = False
+                # Only the most basic filtering
+                if vehicle_info.get("make") and vehicle_info.get("make").lower() not in title:
+                    continue
                     
-                    return jsonify({
-                        "success": True,
-                        "listings": all_listings,
-                        "total": len(all_listings),
-                        "exactMatchCount": sum(1 for item in all_listings if item.get("isExactMatch", False)),
-                        "page": page,
-                        "pageSize": page_size
-                    })
+                # Extract link and other details with proper validation
+                link = None
                 
-                print(f"Trying direct bumper search term: {direct_term}")
+                # Try different possible structures for the link with validation
+                if item.get("link") and isinstance(item.get("link"), str) and item.get("link").startswith("http"):
+                    link = item.get("link")
+                elif item.get("product_link") and isinstance(item.get("product_link"), str) and item.get("product_link").startswith("http"):
+                    link = item.get("product_link")
+                elif item.get("link_text") and isinstance(item.get("link_text"), str) and item.get("link_text").startswith("http"):
+                    link = item.get("link_text")
+                elif isinstance(item.get("link_object"), dict):
+                    potential_link = item.get("link_object", {}).get("link", "")
+                    if isinstance(potential_link, str) and potential_link.startswith("http"):
+                        link = potential_link
                 
-                # Try the direct search term
-                print(f"[DEBUG] search_products - Direct bumper search term: {direct_term}")
-                print(f"[DEBUG] search_products - Still using original structured data: {structured_data}")
+                # If still no link, create a more reliable Google search link
+                if not link or link == "" or not isinstance(link, str) or not link.startswith("http"):
+                    product_title = item.get("title", "").replace(" ", "+")
+                    link = f"https://www.google.com/search?q={product_title}&tbm=shop"
                 
-                with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-                    ebay_future = executor.submit(get_ebay_serpapi_results, direct_term, "bumper", structured_data)
-                    
-                    ebay_listings = ebay_future.result()
-                    
-                    # Add only new unique listings with improved deduplication
-                    existing_keys = {}  # Track existing items by both title and source
-                    for idx, item in enumerate(all_listings):
-                        # Create a composite key of title + first words of title for fuzzy matching
-                        title_lower = item["title"].lower()
-                        first_words = ' '.join(title_lower.split()[:5]) if title_lower else ""
-                        key = (first_words, item.get("source", ""))
-                        existing_keys[key] = idx
-                    
-                    # Process new items with better deduplication
-                    for item in ebay_listings:
-                        title_lower = item["title"].lower()
-                        first_words = ' '.join(title_lower.split()[:5]) if title_lower else ""
-                        item_source = item.get("source", "")
-                        key = (first_words, item_source)
-                        
-                        # If this exact item doesn't exist yet, add it
-                        if key not in existing_keys:
-                            all_listings.append(item)
-                            existing_keys[key] = len(all_listings) - 1
-        
-        # Function to add relevance score based on query match
-        def add_relevance_score(item, query, vehicle_info):
-            """Add a relevance score to each item based on how well it matches the query"""
-            score = 0
-            title = item.get("title", "").lower()
-            
-            # Add points for matching query terms
-            query_terms = query.lower().split()
-            for term in query_terms:
-                if term in title and len(term) > 2:
-                    score += 5
-            
-            # Check for vehicle info matches
-            if vehicle_info.get("year") and vehicle_info.get("year") in title:
-                score += 10
-            
-            if vehicle_info.get("make") and vehicle_info.get("make").lower() in title:
-                score += 10
-            
-            if vehicle_info.get("model"):
-                model = vehicle_info.get("model").lower()
-                # Check for model variations (with/without hyphens)
-                if model in title or model.replace("-", "") in title or model.replace("-", " ") in title:
-                    score += 15
-            
-            if vehicle_info.get("part") and vehicle_info.get("part").lower() in title:
-                score += 15
-            
-            # Add points for exact phrase matches
-            if vehicle_info.get("make") and vehicle_info.get("model"):
-                make_model = f"{vehicle_info.get('make')} {vehicle_info.get('model')}".lower()
-                if make_model in title:
-                    score += 20
-            
-            # Add points for source (prefer Google Shopping to show more Google results)
-            if item.get("source") == "Google Shopping":
-                score += 10  # Higher score to prioritize Google Shopping results
-            
-            # Add points for condition (prefer new parts)
-            if "new" in item.get("condition", "").lower():
-                score += 5
-            
-            # Add points for free shipping
-            if "free" in item.get("shipping", "").lower():
-                score += 3
-            
-            item["relevanceScore"] = score
-            return item
-        
-        # Add relevance score to each item
-        all_listings = [add_relevance_score(item, search_term, vehicle_info) for item in all_listings]
-        
-        # If we have part information, prioritize exact matches
-        if part_type:
-            all_listings = prioritize_exact_part_matches(all_listings, part_type)
-        else:
-            # Sort by relevance score by default when we don't have a specific part
-            all_listings.sort(key=lambda x: x.get("relevanceScore", 0), reverse=True)
-        
-        # Add "Best Match" flag for top matches for UI highlight
-        for i, item in enumerate(all_listings):
-            if i < 4 or item.get("priorityScore", 0) > 80:
-                item["bestMatch"] = True
-            else:
-                item["bestMatch"] = False
+                backup_items.append(Listing(
+                    title=item.get("title"),
+                    price=item.get("price", "Price not available"),
+                    shipping=item.get("shipping", "Shipping not specified"),
+                    condition="New",  # Google Shopping typically shows new items
+                    source="Google Shopping",
+                    link=link,
+                    image=item.get("thumbnail", "")
+                ))
+            
+            # Append these items to our list
+            listing_index.extend(backup_items)
+            print(f"Added {len(backup_items)} additional Google Shopping items")
+            yield "Google Shopping (simplified)", backup_items
         
+        # If we don't have enough results, try with a simplified search
+        # (year, make, model and part from the original query, see _plan_fallbacks)
+        stage = self._fallback_needed(SIMPLIFIED_STAGE, len(all_listings) < 8)
+        if stage:
+            simple_term = stage.term
+            print(f"Not enough results with original search. Trying simplified term: {simple_term}")
+            
+            # Try the simpler search term - prioritize Google Shopping
+            print(f"[DEBUG] search_products - Fallback using simpler term: {simple_term}")
+            print(f"[DEBUG] search_products - Fallback still using original structured data: {structured_data}")
+            
+            google_listings, ebay_new_listings, ebay_used_listings = self._fallback_results(stage, any)
+            ebay_listings = ebay_new_listings + ebay_used_listings
+            
+            # Add only new unique listings
+            yield "Simplified search", listing_index.merge(ebay_listings + google_listings)
+        
+        # If still not enough results and this is a bumper search for a classic/older
+        # vehicle, try an even more specific search directly on eBay. eBay tends to
+        # have better inventory for classic car parts, and the term carries a year
+        # range (see _plan_fallbacks). Ford F-series trucks never get this search.
+        stage = self._fallback_needed(CLASSIC_BUMPER_STAGE, len(all_listings) < 12)
+        if stage:
+            direct_term = stage.term
+            print(f"Trying specialized classic vehicle search: {direct_term}")
+            
+            # Make sure we still pass structured data even for specialized searches
+            print(f"[DEBUG] search_products - Specialized classic vehicle search: {direct_term}")
+            print(f"[DEBUG] search_products - Still using original structured data: {structured_data}")
+            
+            ebay_new_listings, ebay_used_listings = self._fallback_results(stage, any)
+            ebay_listings = ebay_new_listings + ebay_used_listings
+            
+            # Add only new unique listings
+            yield "Classic vehicle bumper search", listing_index.merge(ebay_listings)
+
+def run_product_search(search_term, original_query, structured_data=None, page=1, page_size=24, paginate=False):
+    """
+    Run a product search and return the response body (see
+    ranked_search_payload). Reads nothing from the Flask request, so other
+    routes can search in-process. Raises UpstreamSaturated when the upstream
+    queue is full.
+    """
+    # A repeat search is answered from the ranked response cache
+    payload = cached_search_payload(search_term, original_query, structured_data, page, page_size, paginate)
+    if payload is not None:
+        return payload
+    
+    search = ProductSearch(search_term, original_query, structured_data)
+    with response_cache.tracking() as freshness:
+        for _ in search.run():
+            pass
+    
+    return product_search_payload(search, page, page_size, paginate, freshness)
+
+def request_page_settings():
+    """
+    Return (page, page_size, paginate) from the request form. Only clients
+    that ask for a page size get paged results (plus a cursor); the others
+    get every ranked listing.
+    """
+    page = max(1, int(request.form.get("page", "1")))
+    page_size = max(1, min(100, int(request.form.get("page_size", "24"))))  # Default to 24 products per page
+    paginate = "page_size" in request.form
+    return page, page_size, paginate
+
+@app.route("/api/search-products", methods=["POST"])
+def search_products():
+    """Search for products using the provided search term with pagination support"""
+    search_term = sanitize_input(request.form.get("search_term", ""))
+    original_query = sanitize_input(request.form.get("original_query", ""))
+    page, page_size, paginate = request_page_settings()
+    
+    # Debug logs for identifying field vs single field search
+    print(f"[DEBUG] search_products - search_term: {search_term}")
+    print(f"[DEBUG] search_products - original_query: {original_query}")
+    
+    if not search_term:
         return jsonify({
-            "success": True,
-            "listings": all_listings,
-            "total": len(all_listings),
-            "exactMatchCount": sum(1 for item in all_listings if item.get("isExactMatch", False)),
-            "page": page,
-            "pageSize": page_size
+            "success": False,
+            "error": "No search term provided"
         })
+    
+    try:
+        structured_data = parse_structured_data(request.form.get("structured_data", ""))
+        return jsonify(run_product_search(search_term, original_query, structured_data, page, page_size, paginate))
+    except UpstreamSaturated as e:
+        print(f"Search products rejected: {e}")
+        return upstream_busy_response()
     except Exception as e:
         print(f"Search products error: {e}")
         return jsonify({
@@ -2696,6 +2773,209 @@ def search_products():
             "error": "An error occurred while searching for products. Please try again."
         })
 
+def _stream_message(event, payload, sse):
+    """Encode one streaming message as an NDJSON line or a server-sent event"""
+    data = app.json.dumps(dict(payload, type=event))
+    if sse:
+        return f"event: {event}\ndata: {data}\n\n"
+    return data + "\n"
+
+@app.route("/api/search-products/stream", methods=["POST"])
+def search_products_stream():
+    """
+    Streaming variant of /api/search-products. Sends a "batch" message with the
+    ranked new listings as each source or fallback stage completes, then a
+    "final" message with the same body /api/search-products returns.
+    
+    Responds with NDJSON, or server-sent events when the client accepts
+    text/event-stream or passes format=sse.
+    """
+    search_term = sanitize_input(request.form.get("search_term", ""))
+    original_query = sanitize_input(request.form.get("original_query", ""))
+    page, page_size, paginate = request_page_settings()
+    sse = (request.values.get("format") == "sse"
+           or request.accept_mimetypes.best_match(["application/x-ndjson", "text/event-stream"]) == "text/event-stream")
+    
+    if not search_term:
+        return jsonify({
+            "success": False,
+            "error": "No search term provided"
+        })
+    
+    structured_data = parse_structured_data(request.form.get("structured_data", ""))
+    search = ProductSearch(search_term, original_query, structured_data)
+    request_deadline = deadline.current()
+    
+    def generate():
+        # stream_with_context keeps request and g available while the body is
+        # generated, but the teardown_request handlers have already run once
+        # the view returned, ending the SerpAPI budget, deadline and stale-read
+        # tracking contextvars; all three are set up again for the search
+        budget_token = serpapi_quota.begin_request(SERPAPI_REQUEST_CAP)
+        stale_token = search_cache.begin_stale_tracking()
+        try:
+            with deadline.restored(request_deadline):
+                yield from _generate()
+        finally:
+            search_cache.end_stale_tracking(stale_token)
+            serpapi_quota.end_request(budget_token)
+    
+    def _generate():
+        try:
+            payload = cached_search_payload(search_term, original_query, structured_data, page, page_size, paginate)
+            if payload is not None:
+                yield _stream_message("final", payload, sse)
+                return
+            
+            with response_cache.tracking() as freshness:
+                for stage, added in search.run():
+                    if not added:
+                        continue
+                    # Batches are ranked on their own; the final message has the merged ranking
+                    batch = ranking.search_pipeline(search.search_term, search.vehicle_info, search.part_type).rank(added)
+                    yield _stream_message("batch", {
+                        "stage": stage,
+                        "listings": batch,
+                        "count": len(batch),
+                        "collected": len(search.listings),
+                        "stale": search_cache.served_stale()
+                    }, sse)
+            
+            yield _stream_message("final", product_search_payload(search, page, page_size, paginate, freshness), sse)
+        except UpstreamSaturated as e:
+            # Headers are already sent, so the 503 travels as the error message
+            print(f"Search products stream rejected: {e}")
+            yield _stream_message("error", {
+                "success": False,
+                "error": "The search service is busy right now. Please try again in a few seconds.",
+                "retry_after": UPSTREAM_RETRY_AFTER
+            }, sse)
+        except Exception as e:
+            print(f"Search products stream error: {e}")
+            yield _stream_message("error", {
+                "success": False,
+                "error": "An error occurred while searching for products. Please try again."
+            }, sse)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _form_list(name):
+    """Values of a repeated or comma-separated form field"""
+    values = []
+    for raw in request.form.getlist(name):
+        values.extend(value.strip() for value in raw.split(",") if value.strip())
+    return values
+
+def _form_float(name):
+    """Optional numeric form field; raises ValueError for non-numeric input"""
+    value = request.form.get(name, "").strip()
+    return float(value) if value else None
+
+@app.route("/api/search-products/filter", methods=["POST"])
+def filter_search_products():
+    """Filter, sort and page a stored search-products result set"""
+    result_id = request.form.get("result_id", "")
+    sort = request.form.get("sort", "relevance")
+    
+    if sort not in ranking.SORT_OPTIONS:
+        return jsonify({
+            "success": False,
+            "error": f"Unknown sort option. Use one of: {', '.join(ranking.SORT_OPTIONS)}"
+        })
+    
+    try:
+        page = max(1, int(request.form.get("page", "1")))
+        page_size = max(1, min(100, int(request.form.get("page_size", "24"))))
+        min_price = _form_float("min_price")
+        max_price = _form_float("max_price")
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "page, page_size, min_price and max_price must be numbers"
+        })
+    
+    stored = RESULT_SETS.load(result_id)
+    if stored is None:
+        return jsonify({
+            "success": False,
+            "expired": True,
+            "error": "These search results have expired. Please search again."
+        })
+    listings, meta = stored
+    year = meta.get("year")
+    
+    listing_filter = ListingFilter(
+        sources=_form_list("source"),
+        conditions=_form_list("condition"),
+        price_buckets=_form_list("price_bucket"),
+        min_price=min_price,
+        max_price=max_price,
+        free_shipping=request.form.get("free_shipping", "false") == "true",
+        exact_year=request.form.get("exact_year", "false") == "true",
+        year=year
+    )
+    
+    # Filter and count the facets of the matching listings in one pass
+    facet_counter = FacetCounter(year=year)
+    matched = []
+    for listing in listings:
+        if listing_filter(listing):
+            facet_counter(listing)
+            matched.append(listing)
+    
+    # Only the listings up to the end of the requested page are ordered
+    start = (page - 1) * page_size
+    ordered = ranking.sort_pipeline(sort).rank(matched, limit=start + page_size)
+    page_listings = ordered[start:]
+    
+    return jsonify({
+        "success": True,
+        "result_id": result_id,
+        "listings": page_listings,
+        "total": len(matched),
+        "facets": facet_counter.counts(),
+        "sort": sort,
+        "page": page,
+        "pageSize": page_size,
+        "hasMore": start + len(page_listings) < len(matched)
+    })
+
+@app.route("/api/search-products/page", methods=["GET", "POST"])
+def search_products_page():
+    """Serve the next page of a stored search-products result set by cursor"""
+    cursor = request.values.get("cursor", "")
+    
+    try:
+        result_id, offset, page_size = decode_cursor(cursor)
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "Invalid cursor"
+        })
+    
+    page = RESULT_SETS.load_page(result_id, offset, page_size)
+    if page is None:
+        return jsonify({
+            "success": False,
+            "expired": True,
+            "error": "These search results have expired. Please search again."
+        })
+    listings, total = page
+    
+    return jsonify({
+        "success": True,
+        "result_id": result_id,
+        "listings": listings,
+        "total": total,
+        "offset": offset,
+        "pageSize": page_size,
+        "next_cursor": next_cursor(result_id, offset, page_size, total)
+    })
+
 # Enhanced product listing function used by API endpoints
 def enhanceProductListings(listings, query, vehicleInfo):
     """
@@ -2709,27 +2989,9 @@ def enhanceProductListings(listings, query, vehicleInfo):
     if vehicleInfo and isinstance(vehicleInfo, dict):
         year = vehicleInfo.get("year")
     
-    # Add basic relevance scoring and year matching
-    for listing in listings:
-        if not isinstance(listing, dict):
-            continue
-            
-        # Initialize with default values
-        listing["relevanceScore"] = 0
-        listing["exactYearMatch"] = False
-        listing["bestMatch"] = False
-        
-        # Simple scoring for exact year matches
-        title = listing.get("title", "").lower()
-        if year and year in title:
-            listing["exactYearMatch"] = True
-            listing["relevanceScore"] = 50
-            listing["bestMatch"] = True
-    
-    # Sort by exact year match first, then by relevance score
-    return sorted(listings, 
-                 key=lambda x: (1 if x.get("exactYearMatch", False) else 0, x.get("relevanceScore", 0)), 
-                 reverse=True)
+    # Listings mentioning the year first, flagged as best matches
+    listings = [listing for listing in listings if isinstance(listing, (dict, Listing))]
+    return ranking.year_match_pipeline(year).rank(listings)
 
 # Flask app setup
 # (App is already set up in lines 15-18)
@@ -2754,47 +3016,113 @@ def search_api():
             "validation_error": validation_error
         })
 
-    # First get the analysis
-    analyze_response = analyze_query()
-    analyze_data = analyze_response.get_json()
-    
-    if not analyze_data.get("success"):
-        return analyze_response
-    
-    # Then get the product listings
-    search_term = analyze_data.get("search_terms")[0]
-    
-    # Create a mock request with
-    # Create a mock request with the search term
-    class MockForm:
-        def get(self, key, default=""):
-            if key == "search_term":
-                return search_term
-            elif key == "original_query":
-                return query
-            return default
-    
-    # Replace request.form with our mock
-    orig_form = request.form
-    request.form = MockForm()
-    search_response = search_products()
-    request.form = orig_form
+    page, page_size, paginate = request_page_settings()
+    processed_result = query_processor.process_query(query)
+    analysis = None
+    try:
+        if SEARCH_API_CONCURRENT:
+            analysis, search_data = concurrent_search(query, processed_result, page, page_size, paginate)
+        else:
+            analysis = query_analysis(query, processed_result)
+            search_data = None
+            if analysis.get("success"):
+                search_data = run_product_search(analysis["search_terms"][0], query, None, page, page_size, paginate)
+    except UpstreamSaturated as e:
+        # Pass backpressure through instead of reporting an empty result
+        print(f"Search rejected: {e}")
+        return upstream_busy_response()
+    except Exception as e:
+        print(f"Search error: {e}")
+        if analysis is None:
+            analysis = local_query_analysis(processed_result)
+        search_data = None
     
-    search_data = search_response.get_json()
+    if not analysis.get("success"):
+        return jsonify(analysis)
     
-    if not search_data.get("success"):
+    if not search_data:
         return jsonify({
             "success": True,
-            "questions": analyze_data.get("questions"),
+            "questions": analysis.get("questions"),
             "listings": []  # Return empty listings but still success
         })
     
     return jsonify({
         "success": True,
-        "questions": analyze_data.get("questions"),
-        "listings": search_data.get("listings")
+        "questions": analysis.get("questions"),
+        "listings": search_data.get("listings"),
+        "next_cursor": search_data.get("next_cursor"),
+        # Also set when the deadline dropped the GPT analysis or a top-up search
+        "partial": search_data.get("partial", False) or deadline.cut_short(),
+        "stale": search_data.get("stale", False)
     })
 
+def search_term_similarity(term, other):
+    """Share of words two search terms have in common (Jaccard similarity of their word sets)"""
+    words = set(re.findall(r"[a-z0-9]+", term.casefold()))
+    other_words = set(re.findall(r"[a-z0-9]+", other.casefold()))
+    if not words or not other_words:
+        return 0.0
+    return len(words & other_words) / len(words | other_words)
+
+def concurrent_search(query, processed_result, page=1, page_size=24, paginate=False):
+    """
+    Analyze a query and search for it at the same time: the GPT analysis runs
+    on the upstream engine while the product search runs here with the local
+    query processor's term. When GPT's term differs materially from the local
+    one (see SEARCH_API_TOPUP_SIMILARITY), a top-up search runs with GPT's
+    term and both results are ranked together against it. page, page_size
+    and paginate apply to whichever results are returned (see
+    run_product_search).
+    
+    Returns (analysis response body, search response body or None). The
+    analysis falls back to the local one when GPT hasn't answered by the
+    request's deadline or failed. Raises UpstreamSaturated when the upstream
+    queue is full before the search could run.
+    """
+    local_terms = processed_result.get("search_terms") or [clean_query(query)]
+    local_term = local_terms[0]
+    
+    analysis_future = upstream_engine.submit(functools.partial(query_analysis, query, processed_result))
+    try:
+        search_data = run_product_search(local_term, query, None, page, page_size, paginate)
+    except BaseException:
+        analysis_future.cancel()
+        raise
+    
+    try:
+        analysis = analysis_future.result(timeout=deadline.remaining())
+    except concurrent.futures.TimeoutError:
+        analysis_future.cancel()
+        deadline.cut("the GPT analysis")
+        analysis = local_query_analysis(processed_result)
+    except Exception as e:
+        # The search already has results, so they are returned with the local
+        # analysis rather than failing the request
+        print(f"GPT analysis failed, using the local analysis: {e}")
+        analysis = local_query_analysis(processed_result)
+    
+    if not analysis.get("success") or analysis.get("processed_locally"):
+        return analysis, search_data
+    
+    gpt_term = analysis["search_terms"][0]
+    similarity = search_term_similarity(local_term, gpt_term)
+    if similarity >= SEARCH_API_TOPUP_SIMILARITY:
+        print(f"Keeping results for '{local_term}' (GPT term '{gpt_term}', similarity {similarity:.2f})")
+        return analysis, search_data
+    if deadline.expired():
+        deadline.cut(f"the top-up search for '{gpt_term}'")
+        return analysis, search_data
+    
+    print(f"Topping up results for '{local_term}' with GPT term '{gpt_term}' (similarity {similarity:.2f})")
+    search = ProductSearch(gpt_term, query)
+    for _ in search.run():
+        pass
+    search.listing_index.merge(search_data["listings"])
+    # Merged results aren't what a search for either term returns, so they
+    # aren't cached
+    return analysis, product_search_payload(search, page, page_size, paginate)
+
 # AJAX endpoint for VIN decoding
 @app.route("/api/vin-decode", methods=["POST"])
 def vin_decode_api():
@@ -2930,6 +3258,62 @@ def create_payment_link():
         return jsonify({"error": str(e)}), 500
 
 
+# Cache monitoring endpoint
+@app.route("/api/cache-stats", methods=["GET"])
+def cache_stats():
+    """Return hit/miss counters for the SerpAPI, VIN, LLM, search response and fitment caches"""
+    return jsonify({
+        "success": True,
+        "serpapi": SERPAPI_CACHE.stats(),
+        "serpapi_inflight": SERPAPI_INFLIGHT.stats(),
+        "vin": VIN_CACHE.stats(),
+        "llm": LLM_CACHE.stats(),
+        "result_sets": RESULT_SETS.stats(),
+        "search_responses": SEARCH_RESPONSES.stats(),
+        "fitment": fitment_cache_stats()
+    })
+
+@app.route("/api/search-cache/invalidate", methods=["POST"])
+def invalidate_search_cache():
+    """
+    Drop cached ranked search responses: the one for the given search_term /
+    original_query / structured_data, or all of them when none is given
+    """
+    search_term = sanitize_input(request.form.get("search_term", ""))
+    original_query = sanitize_input(request.form.get("original_query", ""))
+    structured_data = parse_structured_data(request.form.get("structured_data", ""))
+    
+    if not search_term and not original_query and not structured_data:
+        SEARCH_RESPONSES.invalidate()
+        return jsonify({"success": True, "invalidated": "all"})
+    
+    SEARCH_RESPONSES.invalidate(search_term, original_query, structured_data)
+    return jsonify({"success": True, "invalidated": "search"})
+
+
+# SerpAPI quota endpoint
+@app.route("/api/serpapi-usage", methods=["GET"])
+def serpapi_usage():
+    """Return SerpAPI quota usage, the calls skipped per priority class and speculative fallback counters"""
+    return jsonify({
+        "success": True,
+        "request_cap": SERPAPI_REQUEST_CAP,
+        "usage": SERPAPI_QUOTA.stats(),
+        "fallbacks": FALLBACK_PLANNER.stats()
+    })
+
+
+# Upstream health endpoint
+@app.route("/api/upstream-status", methods=["GET"])
+def upstream_status():
+    """Return the circuit breaker state of each upstream service and the upstream engine's load"""
+    return jsonify({
+        "success": True,
+        "upstreams": http_client.breaker_stats(),
+        "engine": upstream_engine.stats()
+    })
+
+
 # Dialpad Dashboard Routes
 @app.route("/dialpad-dashboard", methods=["GET"])
 def dialpad_dashboard():
@@ -0,0 +1,413 @@
+"""
+Cache Backends Module
+
+Pluggable storage for the application's result caches (SerpAPI results,
+decoded VINs and LLM responses). Every backend exposes the same small
+interface - get / set / delete / clear / stats - and stores JSON-serializable
+values, so the caches can move from per-process memory to a store shared by
+all gunicorn workers without touching the call sites.
+
+Available backends (selected with the CACHE_BACKEND environment variable):
+- memory: in-process bounded LRU+TTL cache (default)
+- sqlite: on-disk SQLite database that survives restarts (CACHE_SQLITE_PATH)
+- redis:  any server speaking the Redis protocol (CACHE_REDIS_URL), including
+          local stand-ins such as KeyDB, Valkey or a redis-server on localhost
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+from search_cache import TTLCache
+
+KEY_PREFIX = "autoxpress"
+
+
+class CacheBackend:
+    """
+    Base class for cache backends.
+
+    Subclasses implement _get/_set/_delete/_clear/_size; this class adds the
+    shared hit/miss/error counters and keeps backend failures from breaking
+    a search - a failing cache read is treated as a miss.
+    """
+
+    name = "base"
+
+    def __init__(self, namespace, default_ttl=None):
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired"""
+        try:
+            value = self._get(key)
+        except Exception as e:
+            print(f"Cache backend error ({self.name}/{self.namespace}) on get: {e}")
+            self._count("errors")
+            value = None
+        self._count("hits" if value is not None else "misses")
+        return value if value is not None else default
+
+    def set(self, key, value, ttl=None):
+        """Store value under key; ttl of None uses the backend default"""
+        if ttl is None:
+            ttl = self.default_ttl
+        try:
+            self._set(key, value, ttl)
+        except Exception as e:
+            print(f"Cache backend error ({self.name}/{self.namespace}) on set: {e}")
+            self._count("errors")
+
+    def delete(self, key):
+        try:
+            self._delete(key)
+        except Exception as e:
+            print(f"Cache backend error ({self.name}/{self.namespace}) on delete: {e}")
+            self._count("errors")
+
+    def clear(self):
+        try:
+            self._clear()
+        except Exception as e:
+            print(f"Cache backend error ({self.name}/{self.namespace}) on clear: {e}")
+            self._count("errors")
+
+    def stats(self):
+        """Return a snapshot of the cache counters"""
+        with self._stats_lock:
+            hits, misses, errors = self.hits, self.misses, self.errors
+        lookups = hits + misses
+        try:
+            size = self._size()
+        except Exception:
+            size = None
+        return {
+            "backend": self.name,
+            "size": size,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "errors": errors
+        }
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def _delete(self, key):
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def _size(self):
+        return None
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process backend built on the bounded TTLCache"""
+
+    name = "memory"
+
+    def __init__(self, namespace, default_ttl=None, max_size=1000):
+        super().__init__(namespace, default_ttl)
+        self._cache = TTLCache(max_size=max_size, default_ttl=default_ttl)
+
+    def _get(self, key):
+        return self._cache.get(key)
+
+    def _set(self, key, value, ttl):
+        self._cache.set(key, value, ttl)
+
+    def _delete(self, key):
+        self._cache.delete(key)
+
+    def _clear(self):
+        self._cache.clear()
+
+    def _size(self):
+        return len(self._cache)
+
+    def stats(self):
+        stats = super().stats()
+        cache_stats = self._cache.stats()
+        stats["max_size"] = cache_stats["max_size"]
+        stats["evictions"] = cache_stats["evictions"]
+        stats["expirations"] = cache_stats["expirations"]
+        return stats
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    On-disk backend shared by every process that points at the same file.
+    Uses WAL mode so readers in other workers are not blocked by writers.
+    """
+
+    name = "sqlite"
+
+    # Expired rows are pruned every PRUNE_INTERVAL writes
+    PRUNE_INTERVAL = 200
+
+    def __init__(self, path, namespace, default_ttl=None, max_size=10000):
+        super().__init__(namespace, default_ttl)
+        self.path = path
+        self.max_size = max_size
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " stored_at REAL NOT NULL,"
+                " expires_at REAL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_entries_expiry"
+                " ON cache_entries (namespace, expires_at)"
+            )
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key):
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            with conn:
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                )
+            return None
+        return json.loads(value)
+
+    def _set(self, key, value, ttl):
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, stored_at, expires_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value, separators=(",", ":")), now, expires_at)
+            )
+
+        with self._writes_lock:
+            self._writes += 1
+            should_prune = self._writes % self.PRUNE_INTERVAL == 0
+        if should_prune:
+            self._prune()
+
+    def _prune(self):
+        """Remove expired rows, then the oldest rows beyond max_size"""
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+                (self.namespace, time.time())
+            )
+            conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                " SELECT key FROM cache_entries WHERE namespace = ?"
+                " ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.max_size)
+            )
+
+    def _delete(self, key):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            )
+
+    def _clear(self):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+    def _size(self):
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        return row[0]
+
+
+class RedisProtocolError(Exception):
+    """Error reply or malformed response from a Redis-protocol server"""
+    pass
+
+
+class _RespConnection:
+    """Minimal blocking RESP2 client connection (one per thread)"""
+
+    def __init__(self, host, port, timeout):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    def command(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(f"${len(data)}\r\n".encode())
+            parts.append(data)
+            parts.append(b"\r\n")
+        self.sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by cache server")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b"+":
+            return payload.decode("utf-8")
+        if prefix == b"-":
+            raise RedisProtocolError(payload.decode("utf-8"))
+        if prefix == b":":
+            return int(payload)
+        if prefix == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            count = int(payload)
+            if count == -1:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise RedisProtocolError(f"Unexpected reply prefix: {prefix!r}")
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisBackend(CacheBackend):
+    """
+    Backend for any Redis-protocol server, using a small built-in RESP client
+    so no extra dependency is required. Expiry is delegated to the server.
+    """
+
+    name = "redis"
+
+    def __init__(self, url, namespace, default_ttl=None, socket_timeout=1.0):
+        super().__init__(namespace, default_ttl)
+        parsed = urllib.parse.urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = urllib.parse.unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.socket_timeout = socket_timeout
+        self.prefix = f"{KEY_PREFIX}:{namespace}:"
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _RespConnection(self.host, self.port, self.socket_timeout)
+            if self.password:
+                conn.command("AUTH", self.password)
+            if self.db:
+                conn.command("SELECT", self.db)
+            self._local.conn = conn
+        return conn
+
+    def _command(self, *args):
+        try:
+            return self._connection().command(*args)
+        except (OSError, ConnectionError):
+            # Drop the broken connection so the next call reconnects
+            conn = getattr(self._local, "conn", None)
+            if conn is not None:
+                conn.close()
+            self._local.conn = None
+            raise
+
+    def _get(self, key):
+        data = self._command("GET", self.prefix + key)
+        return json.loads(data) if data is not None else None
+
+    def _set(self, key, value, ttl):
+        data = json.dumps(value, separators=(",", ":"))
+        if ttl is not None:
+            self._command("SET", self.prefix + key, data, "PX", max(1, int(ttl * 1000)))
+        else:
+            self._command("SET", self.prefix + key, data)
+
+    def _delete(self, key):
+        self._command("DEL", self.prefix + key)
+
+    def _clear(self):
+        cursor = "0"
+        while True:
+            cursor, keys = self._command("SCAN", cursor, "MATCH", self.prefix + "*", "COUNT", 500)
+            cursor = cursor.decode() if isinstance(cursor, bytes) else str(cursor)
+            if keys:
+                self._command("DEL", *keys)
+            if cursor == "0":
+                break
+
+    def _size(self):
+        # Counting keys needs a full SCAN, which is too expensive for a stats call
+        return None
+
+
+def create_cache(namespace, default_ttl=None, max_size=1000):
+    """
+    Create a cache for the given namespace using the backend configured in
+    the environment (CACHE_BACKEND=memory|sqlite|redis).
+    """
+    backend = os.getenv("CACHE_BACKEND", "memory").strip().lower()
+
+    if backend == "sqlite":
+        path = os.getenv("CACHE_SQLITE_PATH", "autoxpress_cache.sqlite3")
+        return SQLiteBackend(path, namespace, default_ttl=default_ttl, max_size=max_size)
+    if backend == "redis":
+        url = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+        return RedisBackend(url, namespace, default_ttl=default_ttl)
+    if backend != "memory":
+        print(f"Unknown CACHE_BACKEND '{backend}', falling back to in-memory cache")
+
+    return MemoryBackend(namespace, default_ttl=default_ttl, max_size=max_size)
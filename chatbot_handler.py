@@ -6,6 +6,7 @@ Processes chat messages and generates AI-powered responses
 import os
 from openai import OpenAI
 from flask import jsonify
+import http_client
 from query_templates import get_template_for_message
 
 def process_chat_message(data):
@@ -118,8 +119,9 @@ CRITICALLY IMPORTANT:
         is_policy_query = any(policy_type in message.lower() for policy_type in 
                              ["return policy", "call", "missed", "follow up", "callback"])
         
-        # Call OpenAI API with conversation context
-        response = client.chat.completions.create(
+        # Call OpenAI API with conversation context (fails fast while the breaker is open)
+        response = http_client.get_breaker("openai").call(
+            client.chat.completions.create,
             model="gpt-4-turbo",  # Using more advanced model for better responses
             messages=messages,
             max_tokens=1500,  # Increased to prevent cut-off responses
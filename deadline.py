@@ -0,0 +1,142 @@
+"""
+Deadline Module
+
+Overall time budget of one incoming request. Search routes start a deadline
+when the request arrives; everything the request fans out (upstream calls,
+speculative and regular fallback stages, HTTP retries) reads it from a
+contextvar, which the upstream engine copies into every call.
+
+Once the deadline passes, callers stop waiting, calls that haven't started
+are cancelled, no further fallback stages or retries are started, and the
+route answers with what it has collected, flagged as partial. Calls that
+are already running don't outlive the deadline either: their HTTP (and
+OpenAI) timeouts are shortened to the time left (see bounded_timeout). A
+call cut off by a shortened timeout raises DeadlineExceeded rather than a
+transport error, so it doesn't count against the upstream's circuit breaker
+and no empty result is cached for a healthy query.
+"""
+
+import contextlib
+import contextvars
+import time
+
+
+# Shortest timeout given to a call, so one started right at the deadline
+# fails fast instead of getting a zero (or negative) timeout
+MIN_TIMEOUT = 0.1
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request's deadline passes before or during a piece of work"""
+    pass
+
+
+class Deadline:
+    """
+    Time budget of one request.
+
+    Args:
+        seconds: Seconds from now until the deadline
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        # Set once any work was dropped because the deadline had passed
+        self.cut_short = False
+
+    def remaining(self):
+        """Seconds left until the deadline (0 once it has passed)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def cut(self, what):
+        """Record that work (described by what) was dropped because of the deadline"""
+        self.cut_short = True
+        print(f"Request deadline of {self.seconds}s reached, dropping {what}")
+
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+def begin(seconds):
+    """Start a deadline for the current request; returns a token for end()"""
+    return _deadline.set(Deadline(seconds))
+
+
+def end(token):
+    """Discard the deadline started by begin()"""
+    _deadline.reset(token)
+
+
+@contextlib.contextmanager
+def restored(request_deadline):
+    """
+    Make a request's Deadline current again, e.g. inside a streamed response:
+    its body is generated after the request's teardown_request handlers have
+    ended the deadline (stream_with_context keeps the request context, not
+    the contextvars those handlers reset). None runs the block without a
+    deadline.
+    """
+    token = _deadline.set(request_deadline)
+    try:
+        yield request_deadline
+    finally:
+        _deadline.reset(token)
+
+
+def current():
+    """Return the Deadline of the current request, or None outside one"""
+    return _deadline.get()
+
+
+def remaining():
+    """Seconds left for the current request, or None when it has no deadline"""
+    request_deadline = _deadline.get()
+    return request_deadline.remaining() if request_deadline is not None else None
+
+
+def expired():
+    """True once the current request's deadline has passed (False without one)"""
+    request_deadline = _deadline.get()
+    return request_deadline is not None and request_deadline.expired()
+
+
+def check(what):
+    """Raise DeadlineExceeded (recording the cut) if the current request's deadline has passed"""
+    request_deadline = _deadline.get()
+    if request_deadline is not None and request_deadline.expired():
+        request_deadline.cut(what)
+        raise DeadlineExceeded(f"deadline of {request_deadline.seconds}s passed before {what}")
+
+
+def bounded_timeout(timeout):
+    """
+    Return (timeout, bounded): timeout (seconds, or a requests-style
+    (connect, read) tuple; None means no timeout) shortened to the time left
+    for the current request, and whether it had to be shortened
+    """
+    request_deadline = _deadline.get()
+    if request_deadline is None:
+        return timeout, False
+    remaining = max(request_deadline.remaining(), MIN_TIMEOUT)
+    if isinstance(timeout, tuple):
+        bounded = tuple(remaining if part is None or part > remaining else part for part in timeout)
+    else:
+        bounded = remaining if timeout is None or timeout > remaining else timeout
+    return bounded, bounded != timeout
+
+
+def cut(what):
+    """Record that the current request dropped work because of its deadline"""
+    request_deadline = _deadline.get()
+    if request_deadline is not None:
+        request_deadline.cut(what)
+
+
+def cut_short():
+    """True when the current request dropped any work because of its deadline"""
+    request_deadline = _deadline.get()
+    return request_deadline is not None and request_deadline.cut_short
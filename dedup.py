@@ -0,0 +1,228 @@
+"""
+Dedup Module
+
+Near-duplicate detection for listing titles merged from several sources.
+
+Comparing every new title against every kept title with difflib is
+quadratic, and each SequenceMatcher ratio is itself expensive. The
+NearDuplicateIndex instead summarizes each title by a MinHash signature of
+its character shingles and files the signature under locality-sensitive
+hash bands. Only titles sharing at least one band with the new title are
+compared, so the cost stays roughly linear in the number of titles.
+
+Candidates are confirmed with the same rule the pairwise check used
+(substring containment for short titles, otherwise a SequenceMatcher ratio
+above the threshold), so the index never reports a pair the old check would
+have rejected. The bands are tuned so it also finds the pairs the old check
+would have found: scattered character edits can leave two titles above the
+0.8 ratio with a shingle Jaccard similarity near 0.25, so a band is a single
+signature row and two titles become candidates when any of the 32 MinHash
+values agree (missed with probability 0.75 ** 32, about 1e-4, at that
+similarity).
+"""
+
+import difflib
+import random
+import zlib
+
+# Titles shorter than this are compared by substring containment only
+SHORT_TEXT_LENGTH = 10
+
+# Shingle hash rows kept per hash family before the cache is cleared
+SHINGLE_CACHE_SIZE = 16384
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_HASH_MASK = (1 << 32) - 1
+
+# Indexes with the same hash functions share one shingle cache
+_shingle_caches = {}
+
+
+def _shared_shingle_cache(seed, num_hashes):
+    # dict.setdefault is atomic, so concurrent requests end up with the same cache
+    return _shingle_caches.setdefault((seed, num_hashes), {})
+
+
+def similar_strings(str1, str2, threshold=0.8):
+    """Check if two strings are similar enough using difflib"""
+    if not str1 or not str2:
+        return False
+
+    # For very short strings, use simple matching
+    if len(str1) < SHORT_TEXT_LENGTH or len(str2) < SHORT_TEXT_LENGTH:
+        return str1 in str2 or str2 in str1
+
+    # For longer strings, use sequence matching; the quick ratios are cheap
+    # upper bounds that rule out most dissimilar pairs
+    matcher = difflib.SequenceMatcher(None, str1, str2)
+    return (matcher.real_quick_ratio() > threshold
+            and matcher.quick_ratio() > threshold
+            and matcher.ratio() > threshold)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash LSH index over text (usually lowercased listing titles).
+
+    Args:
+        threshold: similar_strings ratio above which two texts are duplicates
+        shingle_size: Length of the character shingles that are hashed
+        bands: Number of LSH bands
+        rows: Signature rows per band; bands * rows hash functions are used.
+            Two texts become candidates when all rows of any band agree, so
+            fewer rows per band means higher recall and more comparisons
+        seed: Seed for the hash functions
+    """
+
+    def __init__(self, threshold=0.8, shingle_size=3, bands=32, rows=1, seed=1):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands = bands
+        self.rows = rows
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(bands * rows)
+        ]
+        self._shingle_cache = _shared_shingle_cache(seed, bands * rows)
+        self._texts = []
+        self._buckets = {}
+        # Short texts only match by containment, which shingles can't predict
+        self._short_ids = []
+
+    def __len__(self):
+        return len(self._texts)
+
+    def _shingle_hashes(self, shingle):
+        # One value per hash function; shingles repeat across titles, so these
+        # are cached and a signature is just a column-wise min over them
+        hashes = self._shingle_cache.get(shingle)
+        if hashes is None:
+            if len(self._shingle_cache) >= SHINGLE_CACHE_SIZE:
+                self._shingle_cache.clear()
+            # crc32 rather than hash(), which is salted per process
+            value = zlib.crc32(shingle.encode("utf-8"))
+            hashes = tuple([((a * value + b) % _MERSENNE_PRIME) & _HASH_MASK
+                            for a, b in self._permutations])
+            self._shingle_cache[shingle] = hashes
+        return hashes
+
+    def _band_keys(self, text):
+        size = self.shingle_size
+        shingles = {text[i:i + size] for i in range(len(text) - size + 1)}
+        signature = list(map(min, zip(*map(self._shingle_hashes, shingles))))
+        rows = self.rows
+        return [(band, tuple(signature[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    def _find(self, text, band_keys):
+        texts = self._texts
+        threshold = self.threshold
+
+        if len(text) < SHORT_TEXT_LENGTH:
+            # A short text can be contained in anything
+            candidates = range(len(texts))
+        else:
+            seen = set()
+            candidates = []
+            for key in band_keys:
+                for entry_id in self._buckets.get(key, ()):
+                    if entry_id not in seen:
+                        seen.add(entry_id)
+                        candidates.append(entry_id)
+            candidates.extend(entry_id for entry_id in self._short_ids if entry_id not in seen)
+            # Check in insertion order, like a scan over the kept texts would
+            candidates.sort()
+
+        for entry_id in candidates:
+            if similar_strings(text, texts[entry_id], threshold):
+                return entry_id
+        return None
+
+    def find(self, text):
+        """Return the id of an indexed near-duplicate of text, or None"""
+        if not text:
+            return None
+        return self._find(text, self._band_keys(text) if len(text) >= SHORT_TEXT_LENGTH else ())
+
+    def add(self, text):
+        """Index text unconditionally and return its id"""
+        return self._add(text, self._band_keys(text) if len(text or "") >= SHORT_TEXT_LENGTH else ())
+
+    def _add(self, text, band_keys):
+        entry_id = len(self._texts)
+        self._texts.append(text or "")
+        if text and len(text) < SHORT_TEXT_LENGTH:
+            self._short_ids.append(entry_id)
+        for key in band_keys:
+            self._buckets.setdefault(key, []).append(entry_id)
+        return entry_id
+
+    def add_if_new(self, text):
+        """Index text and return True unless it near-duplicates an indexed text"""
+        band_keys = self._band_keys(text) if len(text or "") >= SHORT_TEXT_LENGTH else ()
+        if text and self._find(text, band_keys) is not None:
+            return False
+        self._add(text, band_keys)
+        return True
+
+
+KEY_MODE = "key"
+NEAR_MODE = "near"
+
+
+def listing_key(listing):
+    """Key for exact dedup: the first five words of the title plus the source"""
+    title_lower = listing.title_lower
+    first_words = " ".join(title_lower.split()[:5]) if title_lower else ""
+    return (first_words, listing.get("source", ""))
+
+
+class ListingDedupIndex:
+    """
+    Listings collected for one request, with a dedup index every search
+    stage appends to, so each stage only pays for its new listings.
+
+    Args:
+        mode: KEY_MODE drops listings whose listing_key() was already seen;
+            NEAR_MODE drops listings whose title near-duplicates a collected
+            title (see NearDuplicateIndex), whatever the source
+        threshold: Similarity ratio for NEAR_MODE
+    """
+
+    def __init__(self, mode=KEY_MODE, threshold=0.8):
+        if mode not in (KEY_MODE, NEAR_MODE):
+            raise ValueError(f"Unknown dedup mode: {mode}")
+        self.mode = mode
+        # The collected listings, in the order they were added
+        self.listings = []
+        self._keys = set()
+        self._titles = NearDuplicateIndex(threshold) if mode == NEAR_MODE else None
+
+    def __len__(self):
+        return len(self.listings)
+
+    def extend(self, listings):
+        """Collect listings without dedup checks (they still join the index)"""
+        for listing in listings:
+            if self._titles is not None:
+                self._titles.add(listing.title_lower)
+            else:
+                self._keys.add(listing_key(listing))
+            self.listings.append(listing)
+
+    def add(self, listing):
+        """Collect listing unless it duplicates a collected one; returns True if added"""
+        if self._titles is not None:
+            if not self._titles.add_if_new(listing.title_lower):
+                return False
+        else:
+            key = listing_key(listing)
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+        self.listings.append(listing)
+        return True
+
+    def merge(self, listings):
+        """Collect the listings that aren't duplicates; returns the ones that were added"""
+        return [listing for listing in listings if self.add(listing)]
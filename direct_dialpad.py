@@ -1,5 +1,5 @@
-import requests
 import json
+import http_client
 from datetime import datetime, timedelta
 from typing import Dict, List, Any
 
@@ -62,7 +62,7 @@ class DialpadClient:
             url = f"https://dialpad.com/api/v2/call?{urlencode(params)}"
                 
             try:
-                response = requests.get(url, headers=self.headers)
+                response = http_client.get("dialpad", url, headers=self.headers)
                 print(f"Response status: {response.status_code}")
                 
                 if response.status_code == 200:
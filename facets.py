@@ -0,0 +1,124 @@
+"""
+Facets Module
+
+Facet counts and filters for a set of listings: source, condition, free
+shipping, price bucket and exact model-year match.
+
+FacetCounter is a ranking stage (see ranking.py), so the counts for a search
+are collected in the same pass that scores its listings. ListingFilter
+applies the same facet values as filters to a stored result set.
+"""
+
+# (label, lower bound inclusive, upper bound exclusive) for price facets
+PRICE_BUCKETS = (
+    ("0-50", 0, 50),
+    ("50-100", 50, 100),
+    ("100-250", 100, 250),
+    ("250-500", 250, 500),
+    ("500+", 500, float("inf")),
+)
+UNKNOWN_PRICE_BUCKET = "unknown"
+
+
+def price_bucket(price_value):
+    """Return the PRICE_BUCKETS label for a numeric price, or "unknown" """
+    for label, low, high in PRICE_BUCKETS:
+        if low <= price_value < high:
+            return label
+    return UNKNOWN_PRICE_BUCKET
+
+
+def is_exact_year(listing, year):
+    """True when the listing title mentions the model year as a whole word"""
+    return bool(year) and listing.fitment.mentions(year)
+
+
+class FacetCounter:
+    """
+    Ranking stage that counts facet values over the listings it sees.
+
+    Args:
+        year: Model year for the exact-year facet (None disables it)
+    """
+
+    def __init__(self, year=None):
+        self.year = year
+        self.total = 0
+        self.sources = {}
+        self.conditions = {}
+        self.free_shipping = 0
+        self.prices = {label: 0 for label, _, _ in PRICE_BUCKETS}
+        self.prices[UNKNOWN_PRICE_BUCKET] = 0
+        self.exact_year = 0
+
+    def __call__(self, listing):
+        self.total += 1
+        source = listing.source or "Unknown"
+        self.sources[source] = self.sources.get(source, 0) + 1
+        condition = listing.condition_key
+        self.conditions[condition] = self.conditions.get(condition, 0) + 1
+        if listing.shipping_value == 0.0:
+            self.free_shipping += 1
+        self.prices[price_bucket(listing.price_value)] += 1
+        if self.year and is_exact_year(listing, self.year):
+            self.exact_year += 1
+        # Counting doesn't affect the order
+        return 0
+
+    def counts(self):
+        """Return the facet counts in their JSON shape"""
+        return {
+            "total": self.total,
+            "source": dict(self.sources),
+            "condition": dict(self.conditions),
+            "free_shipping": self.free_shipping,
+            "price": dict(self.prices),
+            "exact_year": self.exact_year
+        }
+
+
+class ListingFilter:
+    """
+    Predicate over listings built from facet selections. Empty selections
+    don't filter.
+
+    Args:
+        sources: Accepted listing sources
+        conditions: Accepted normalized conditions (Listing.condition_key)
+        price_buckets: Accepted PRICE_BUCKETS labels (or "unknown")
+        min_price: Lowest accepted price
+        max_price: Highest accepted price
+        free_shipping: Only accept listings with free shipping
+        exact_year: Only accept listings whose title mentions year
+        year: Model year used by exact_year
+    """
+
+    def __init__(self, sources=None, conditions=None, price_buckets=None, min_price=None,
+                 max_price=None, free_shipping=False, exact_year=False, year=None):
+        self.sources = frozenset(sources or ())
+        self.conditions = frozenset(conditions or ())
+        self.price_buckets = frozenset(price_buckets or ())
+        self.min_price = min_price
+        self.max_price = max_price
+        self.free_shipping = free_shipping
+        self.exact_year = exact_year and bool(year)
+        self.year = year
+
+    def __call__(self, listing):
+        if self.sources and listing.source not in self.sources:
+            return False
+        if self.conditions and listing.condition_key not in self.conditions:
+            return False
+        if self.free_shipping and listing.shipping_value != 0.0:
+            return False
+        price = listing.price_value
+        if self.min_price is not None and not price >= self.min_price:
+            return False
+        # Unknown prices are inf, so any max_price excludes them
+        if self.max_price is not None and not price <= self.max_price:
+            return False
+        if self.price_buckets and price_bucket(price) not in self.price_buckets:
+            return False
+        if self.exact_year and not is_exact_year(listing, self.year):
+            return False
+        return True
@@ -0,0 +1,246 @@
+"""
+Fallback Planner Module
+
+Decides which fallback searches of a product search to start speculatively,
+alongside the primary eBay + Google Shopping round, instead of after it.
+
+A fallback stage (Google Shopping with a simpler term, the simplified
+eBay + Google search, the classic-vehicle bumper search) only runs when the
+searches before it came back thin. Waiting for each round before starting the
+next chains several rounds of upstream latency on exactly the searches that
+are already slow to fill, so the planner predicts which stages a search will
+need and those are started right away.
+
+The prediction is the share of past searches with the same profile (part
+category and vehicle age) that needed the stage, smoothed towards a prior
+from the profile itself: bumpers, engines and transmissions of older vehicles
+come back thin far more often than common parts for recent ones. Only stages
+at or above the planner's threshold are started early.
+
+Speculative calls run at the speculative quota priority, so they are the
+first to be skipped as the SerpAPI budget runs low. A stage that turns out
+not to be needed is cancelled: calls that haven't started never run and
+results of running ones are ignored (they still land in the SerpAPI cache).
+Nothing is started early unless the upstream engine has idle slots for it.
+
+History is kept per process, like the quota budgets.
+"""
+
+import concurrent.futures
+import threading
+from datetime import date
+
+import deadline
+import serpapi_quota
+from upstream_engine import upstream_engine, UpstreamSaturated
+
+# Part categories with fallback stages of their own, by keyword in the part type
+PART_CATEGORIES = (
+    ("bumper", ("bumper",)),
+    ("engine", ("engine", "motor")),
+    ("transmission", ("transmission", "gearbox")),
+)
+
+# Vehicle age buckets: (label, minimum age in years)
+AGE_BUCKETS = (
+    ("classic", 25),
+    ("older", 12),
+    ("recent", 0),
+)
+
+# Prior chance that a fallback stage is needed, before any history: a base
+# rate plus the adjustments for the part category and the vehicle age
+BASE_PRIOR = 0.25
+CATEGORY_PRIORS = {"bumper": 0.25, "engine": 0.2, "transmission": 0.2, "other": 0.0}
+AGE_PRIORS = {"classic": 0.3, "older": 0.15, "recent": 0.0, "unknown": 0.1}
+
+# The prior counts as this many past searches
+PRIOR_WEIGHT = 4
+
+# Once a profile has this many recorded searches for a stage, its counts are
+# halved, so the estimate follows changes in marketplace inventory
+HISTORY_WINDOW = 200
+
+
+def part_category(part_type):
+    """Map a part type to one of the PART_CATEGORIES labels, or "other" """
+    part_lower = (part_type or "").lower()
+    for category, keywords in PART_CATEGORIES:
+        if any(keyword in part_lower for keyword in keywords):
+            return category
+    return "other"
+
+
+def age_bucket(year, today=None):
+    """Map a model year to one of the AGE_BUCKETS labels, or "unknown" """
+    try:
+        age = (today or date.today()).year - int(year)
+    except (TypeError, ValueError):
+        return "unknown"
+    for bucket, min_age in AGE_BUCKETS:
+        if age >= min_age:
+            return bucket
+    return "recent"
+
+
+def search_profile(part_type, year):
+    """The (part category, vehicle age) profile the planner keeps history for"""
+    return part_category(part_type), age_bucket(year)
+
+
+def profile_prior(profile):
+    """Prior chance that a search with this profile needs a fallback stage"""
+    category, age = profile
+    return min(1.0, BASE_PRIOR + CATEGORY_PRIORS.get(category, 0.0) + AGE_PRIORS.get(age, 0.0))
+
+
+class FallbackStage:
+    """
+    The upstream calls of one fallback stage, possibly started early.
+
+    Args:
+        name: Stage name the planner keeps history under
+        labeled_calls: (label, call) pairs the stage runs
+        term: The search term the stage uses (for logging)
+    """
+
+    def __init__(self, name, labeled_calls, term=None):
+        self.name = name
+        self.labeled_calls = list(labeled_calls)
+        self.term = term
+        self._futures = None
+
+    @property
+    def speculative(self):
+        """True while the stage's calls have been started early"""
+        return self._futures is not None
+
+    def start(self):
+        """
+        Start the calls on the upstream engine at speculative priority.
+        Returns False, starting nothing, when the engine has no idle slots
+        for them, so speculation never queues ahead of requested searches.
+        """
+        if self._futures is None:
+            if upstream_engine.idle_slots() < len(self.labeled_calls):
+                return False
+            futures = []
+            try:
+                with serpapi_quota.priority(serpapi_quota.SPECULATIVE):
+                    for _, call in self.labeled_calls:
+                        futures.append(upstream_engine.submit(call, upstream="serpapi"))
+            except UpstreamSaturated:
+                # Speculation is the first work to give up under load
+                for future in futures:
+                    future.cancel()
+                return False
+            self._futures = futures
+        return True
+
+    def cancel(self):
+        """Drop the speculative calls; the ones that haven't started never run"""
+        if self._futures is not None:
+            for future in self._futures:
+                future.cancel()
+            self._futures = None
+
+    def results(self):
+        """
+        Wait for the speculative calls, at most until the request's deadline,
+        and return one result per call, in order; a failed, cancelled or
+        unfinished call yields an empty list.
+        """
+        futures = self._futures or ()
+        concurrent.futures.wait(futures, timeout=deadline.remaining())
+        results = []
+        for (label, _), future in zip(self.labeled_calls, futures):
+            if not future.done() and future.cancel():
+                deadline.cut(f"speculative {label} search")
+                results.append([])
+                continue
+            try:
+                results.append(future.result())
+            except BaseException as e:
+                print(f"Error processing speculative {label} items: {e!r}")
+                results.append([])
+        self._futures = None
+        return results
+
+
+class FallbackPlanner:
+    """
+    Predicts which fallback stages a search needs from the history of
+    searches with the same profile.
+
+    Args:
+        threshold: Predicted chance of being needed at which a stage is
+            started speculatively; above 1 disables speculation
+    """
+
+    def __init__(self, threshold=0.6):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._history = {}  # (stage, profile) -> [searches, searches that needed the stage]
+        self.started = {}   # stage -> speculative starts
+        self.used = {}      # stage -> speculative starts the search needed
+        self.wasted = {}    # stage -> speculative starts that were cancelled
+        self.missed = {}    # stage -> needed stages that weren't started early
+
+    def likelihood(self, stage, profile):
+        """Predicted chance that a search with this profile needs the stage"""
+        with self._lock:
+            seen, needed = self._history.get((stage, profile), (0, 0))
+        return (profile_prior(profile) * PRIOR_WEIGHT + needed) / (PRIOR_WEIGHT + seen)
+
+    def plan(self, stages, profile):
+        """Start the stages that are likely to be needed; returns the started ones"""
+        started = []
+        for stage in stages:
+            if self.likelihood(stage.name, profile) >= self.threshold and stage.start():
+                started.append(stage)
+                with self._lock:
+                    self.started[stage.name] = self.started.get(stage.name, 0) + 1
+        return started
+
+    def record(self, stage, profile, needed):
+        """
+        Record whether a search needed a stage. Cancels the stage's
+        speculative calls when it isn't needed.
+        """
+        speculative = stage.speculative
+        if not needed:
+            stage.cancel()
+        with self._lock:
+            counts = self._history.setdefault((stage.name, profile), [0, 0])
+            counts[0] += 1
+            counts[1] += 1 if needed else 0
+            if counts[0] >= HISTORY_WINDOW:
+                counts[0] //= 2
+                counts[1] //= 2
+
+            if speculative:
+                outcome = self.used if needed else self.wasted
+            else:
+                outcome = self.missed if needed else None
+            if outcome is not None:
+                outcome[stage.name] = outcome.get(stage.name, 0) + 1
+        return needed
+
+    def stats(self):
+        """Return the speculation counters and the per-profile predictions"""
+        with self._lock:
+            history = {
+                f"{stage}:{profile[0]}/{profile[1]}": {
+                    "searches": seen,
+                    "needed": needed,
+                }
+                for (stage, profile), (seen, needed) in self._history.items()
+            }
+            return {
+                "threshold": self.threshold,
+                "started": dict(self.started),
+                "used": dict(self.used),
+                "wasted": dict(self.wasted),
+                "missed": dict(self.missed),
+                "history": history
+            }
@@ -0,0 +1,144 @@
+"""
+Fitment Module
+
+Model-year fitment parsed from listing titles. Marketplace titles state
+fitment as single years ("2005 Honda Civic"), four-digit ranges
+("2001-2007", "1995 to 2002") or two-digit ranges ("01-07 Silverado",
+"09-14 F150").
+
+parse_fitment() scans a lowercased title once with precompiled patterns and
+caches the result by title, so every stage that asks about the same title
+reuses it. The Fitment it returns answers "does this title mention / fit
+year Y" with a set lookup.
+"""
+
+import re
+from datetime import date
+from functools import lru_cache
+
+# Parsed titles kept before the least recently used are dropped
+FITMENT_CACHE_SIZE = 8192
+
+# Ranges outside these years, or spanning more of them, are part numbers,
+# dimensions or quantities rather than model years
+MIN_MODEL_YEAR = 1900
+MAX_MODEL_YEAR = date.today().year + 2
+MAX_RANGE_SPAN = 60
+
+# Two-digit years below this are 20xx, the rest 19xx ("01" -> 2001, "95" -> 1995)
+TWO_DIGIT_YEAR_PIVOT = 50
+
+# Any four-digit word; these are the years a title mentions
+_YEAR_PATTERN = re.compile(r'\b(\d{4})\b')
+
+# "2001-2007", "2001 – 2007", "2001/2007", "2001 to 2007", "2001 thru 2007".
+# The separator is required: two years next to each other ("1995 2002") or a
+# part number ("2004 2010") are not a range. The end year is matched in a
+# lookahead, so a rejected pair ("1500-2005") doesn't swallow the start of the
+# next range
+_RANGE_PATTERN = re.compile(r'\b(\d{4})(?=(?:\s*[-–—/]\s*|\s+(?:to|thru|through)\s+)(\d{4})\b)')
+
+# "01-07", "95–02"; slashes are left out, "01/07" is more often a date
+_SHORT_RANGE_PATTERN = re.compile(r'\b(\d{2})(?=\s*[-–—]\s*(\d{2})\b)')
+
+# Titles without a digit can't state a year, so they skip the regexes
+_DIGITS = frozenset("0123456789")
+
+
+def expand_two_digit_year(value):
+    """Full year for a two-digit year string or int ("01" -> 2001, "95" -> 1995)"""
+    value = int(value)
+    return 2000 + value if value < TWO_DIGIT_YEAR_PIVOT else 1900 + value
+
+
+def _year_value(year):
+    # Years arrive as query strings ("2005") or ints; anything else fits nothing
+    try:
+        return int(year)
+    except (TypeError, ValueError):
+        return None
+
+
+class Fitment:
+    """
+    Model years stated in one title.
+
+    Attributes:
+        years: frozenset of the four-digit years the title mentions as words
+        ranges: Tuple of (start, end) year ranges in title order, with
+            two-digit ranges expanded to full years
+    """
+
+    __slots__ = ("years", "ranges", "_range_for_year", "_fits")
+
+    def __init__(self, years=(), ranges=()):
+        self.years = frozenset(years)
+        self.ranges = tuple(ranges)
+        # The first range covering each year, precomputed so lookups are O(1)
+        range_for_year = {}
+        for start, end in self.ranges:
+            for covered in range(start, end + 1):
+                range_for_year.setdefault(covered, (start, end))
+        self._range_for_year = range_for_year
+        self._fits = self.years.union(range_for_year)
+
+    def __bool__(self):
+        return bool(self.years or self.ranges)
+
+    def mentions(self, year):
+        """True when the title mentions year as a four-digit word"""
+        return _year_value(year) in self.years
+
+    def range_for(self, year):
+        """The first (start, end) range in the title covering year, or None"""
+        return self._range_for_year.get(_year_value(year))
+
+    def fits(self, year):
+        """True when the title mentions year or states a range covering it"""
+        return _year_value(year) in self._fits
+
+    def __repr__(self):
+        return f"Fitment(years={sorted(self.years)!r}, ranges={list(self.ranges)!r})"
+
+
+NO_FITMENT = Fitment()
+
+
+def _is_model_year_range(start, end):
+    return MIN_MODEL_YEAR <= start <= end <= MAX_MODEL_YEAR and end - start <= MAX_RANGE_SPAN
+
+
+@lru_cache(maxsize=FITMENT_CACHE_SIZE)
+def parse_fitment(title_lower):
+    """Return the Fitment for a lowercased title (cached by title)"""
+    if not title_lower or _DIGITS.isdisjoint(title_lower):
+        return NO_FITMENT
+
+    found = []  # (position, range) so both range forms end up in title order
+    for match in _RANGE_PATTERN.finditer(title_lower):
+        start, end = int(match.group(1)), int(match.group(2))
+        if _is_model_year_range(start, end):
+            found.append((match.start(), (start, end)))
+    for match in _SHORT_RANGE_PATTERN.finditer(title_lower):
+        start, end = expand_two_digit_year(match.group(1)), expand_two_digit_year(match.group(2))
+        if _is_model_year_range(start, end):
+            found.append((match.start(), (start, end)))
+    found.sort()
+
+    years = [int(year) for year in _YEAR_PATTERN.findall(title_lower)]
+    if not years and not found:
+        return NO_FITMENT
+    return Fitment(years, [year_range for _, year_range in found])
+
+
+def fitment_cache_stats():
+    """Hit/miss counters of the parsed-title cache"""
+    info = parse_fitment.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0
+    }
@@ -0,0 +1,331 @@
+"""
+HTTP Client Module
+
+Shared transport for every outbound call the application makes (SerpAPI,
+NHTSA VIN decoding and Dialpad). Each upstream gets its own pooled
+requests.Session, so connections and TLS sessions are kept alive between
+searches instead of being re-established for every call.
+
+Requests are retried a bounded number of times on connection errors,
+timeouts and 429/5xx responses, sleeping with jittered exponential backoff
+(or the server's Retry-After hint) between attempts. A retry that would
+start after the current request's deadline (see deadline.py) is not made,
+and each attempt's timeout is shortened to the time the request has left.
+
+Each upstream (plus the OpenAI API, which is called through its own SDK) is
+guarded by a circuit breaker. After repeated failures the breaker opens and
+calls fail immediately with CircuitOpenError instead of waiting for another
+timeout; after a cool-down a single trial call is let through (half-open)
+and its outcome decides whether the breaker closes again.
+"""
+
+import random
+import threading
+import time
+
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+
+import deadline
+
+# Response codes that are worth retrying
+RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+# Only idempotent requests are retried automatically
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+
+
+class UpstreamConfig:
+    """
+    Connection and retry policy for one upstream service.
+
+    Args:
+        name: Upstream identifier used for logging
+        timeout: (connect, read) timeout in seconds passed to requests
+        max_retries: Retries after the first attempt
+        backoff_base: Base delay in seconds for exponential backoff
+        backoff_max: Upper bound for any single backoff delay
+        pool_size: Maximum keep-alive connections kept for the upstream
+        failure_threshold: Consecutive failed requests that open the circuit breaker
+        recovery_timeout: Seconds an open breaker waits before a trial request
+    """
+
+    def __init__(self, name, timeout, max_retries=2, backoff_base=0.25, backoff_max=4.0, pool_size=10,
+                 failure_threshold=5, recovery_timeout=30):
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+
+UPSTREAMS = {
+    # SerpAPI fans out several calls per search, so it gets the largest pool
+    "serpapi": UpstreamConfig("serpapi", timeout=(3.05, 10), max_retries=2, pool_size=20),
+    "nhtsa": UpstreamConfig("nhtsa", timeout=(3.05, 10), max_retries=2, pool_size=4),
+    "dialpad": UpstreamConfig("dialpad", timeout=(3.05, 15), max_retries=3, pool_size=8),
+}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker for one upstream.
+
+    closed:    calls pass through; consecutive failures are counted
+    open:      calls fail fast until recovery_timeout has elapsed
+    half_open: one trial call is allowed; success closes the breaker,
+               failure opens it again
+
+    is_failure decides which exceptions raised through call() count as
+    failures; the others mean the upstream answered, which counts as a
+    success. By default every exception is a failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30, is_failure=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.is_failure = is_failure
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_progress = False
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and time.time() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_progress = False
+        return self._state
+
+    def allow_request(self):
+        """Return True if a call may proceed, reserving the trial slot when half-open"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_progress:
+                self._trial_in_progress = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                print(f"Circuit breaker for {self.name} closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_progress = False
+
+    def release_trial(self):
+        """Give back a half-open trial slot without an outcome (the caller gave up on the call)"""
+        with self._lock:
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    print(f"Circuit breaker for {self.name} opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = time.time()
+                self._trial_in_progress = False
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn through the breaker, raising CircuitOpenError while it is open"""
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+        try:
+            result = fn(*args, **kwargs)
+        except deadline.DeadlineExceeded:
+            # Cut off by the request's deadline, which says nothing about the upstream
+            self.release_trial()
+            raise
+        except Exception as e:
+            if self.is_failure is None or self.is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "rejected": self.rejected
+            }
+
+
+def is_openai_outage(error):
+    """
+    True for OpenAI SDK errors that mean the API is unavailable: timeouts,
+    connection errors, throttling (429) and server errors (5xx). A rejected
+    request (400, 401, 404, ...) means the API is up.
+    """
+    # APITimeoutError is an APIConnectionError
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+BREAKERS = {
+    name: CircuitBreaker(name, config.failure_threshold, config.recovery_timeout)
+    for name, config in UPSTREAMS.items()
+}
+# The OpenAI SDK manages its own HTTP connections, so it only gets a breaker
+BREAKERS["openai"] = CircuitBreaker("openai", failure_threshold=3, recovery_timeout=60,
+                                    is_failure=is_openai_outage)
+
+
+def get_breaker(upstream):
+    """Return the circuit breaker guarding an upstream"""
+    return BREAKERS[upstream]
+
+
+def breaker_stats():
+    """Return the state of every circuit breaker"""
+    return {name: breaker.stats() for name, breaker in BREAKERS.items()}
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(upstream):
+    """Return the shared keep-alive session for an upstream, creating it on first use"""
+    session = _sessions.get(upstream)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(upstream)
+        if session is None:
+            config = UPSTREAMS[upstream]
+            session = requests.Session()
+            # Retries are handled in request() so backoff can be jittered
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.pool_size, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[upstream] = session
+    return session
+
+
+def _backoff_delay(config, attempt):
+    """Full-jitter exponential backoff"""
+    ceiling = min(config.backoff_max, config.backoff_base * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def _retry_after_delay(response, config):
+    """Return the server's Retry-After hint in seconds, if it sent a usable one"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return min(config.backoff_max, max(0.0, float(value)))
+    except ValueError:
+        return None
+
+
+def _retry_fits_deadline(config, delay):
+    """False when a retry after delay seconds would start past the request's deadline"""
+    remaining = deadline.remaining()
+    if remaining is None or delay < remaining:
+        return True
+    deadline.cut(f"{config.name} retry")
+    return False
+
+
+def request(upstream, method, url, **kwargs):
+    """
+    Send a request to an upstream using its pooled session and retry policy.
+    A timeout passed in kwargs overrides the upstream default; either is
+    shortened to the time left before the current request's deadline.
+
+    Returns the final response; raises requests.exceptions.RequestException
+    if every attempt failed to get a response, CircuitOpenError without
+    sending anything while the upstream's breaker is open, or
+    deadline.DeadlineExceeded when an attempt timed out only because its
+    timeout was shortened to the deadline.
+    """
+    config = UPSTREAMS[upstream]
+    breaker = BREAKERS[upstream]
+    if not breaker.allow_request():
+        raise CircuitOpenError(f"{config.name} is unavailable (circuit open)")
+
+    timeout = kwargs.pop("timeout", config.timeout)
+    session = get_session(upstream)
+    method = method.upper()
+    max_retries = config.max_retries if method in IDEMPOTENT_METHODS else 0
+
+    attempt = 0
+    while True:
+        attempt_timeout, bounded = deadline.bounded_timeout(timeout)
+        try:
+            response = session.request(method, url, timeout=attempt_timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if bounded and isinstance(e, requests.exceptions.Timeout):
+                # The deadline, not the upstream, cut this attempt short
+                breaker.release_trial()
+                deadline.cut(f"the {config.name} request")
+                raise deadline.DeadlineExceeded(f"{config.name} request cut off by the request's deadline") from e
+            delay = _backoff_delay(config, attempt)
+            if attempt >= max_retries or not _retry_fits_deadline(config, delay):
+                breaker.record_failure()
+                raise
+            print(f"{config.name} request failed ({e}), retrying in {delay:.2f}s")
+        except Exception:
+            # Not retried, but the outcome still has to reach the breaker, or
+            # a half-open trial would hold the trial slot forever
+            breaker.record_failure()
+            raise
+        else:
+            delay = None
+            if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+                delay = _retry_after_delay(response, config)
+                if delay is None:
+                    delay = _backoff_delay(config, attempt)
+                if not _retry_fits_deadline(config, delay):
+                    delay = None
+            if delay is None:
+                # Throttling and server errors count against the breaker; anything
+                # else (including 4xx caused by the request itself) means it's up
+                if response.status_code in RETRY_STATUS_CODES:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                return response
+            print(f"{config.name} returned {response.status_code}, retrying in {delay:.2f}s")
+            response.close()
+
+        time.sleep(delay)
+        attempt += 1
+
+
+def get(upstream, url, **kwargs):
+    """GET request through the shared transport"""
+    return request(upstream, "GET", url, **kwargs)
@@ -0,0 +1,191 @@
+"""
+Listing Module
+
+Compact record for one marketplace listing as it moves through the search
+pipeline (processing, scoring, ranking, deduplication).
+
+A Listing keeps the fields the API returns (title, price, shipping,
+condition, source, link, image) in __slots__ and derives, once at creation,
+the values the pipeline keeps asking for: the lowercased title, its token
+set, numeric price and shipping, a normalized condition and a stable
+fingerprint. Scoring annotations added later (relevanceScore, matchType,
+bestMatch, ...) go into a small side dict.
+
+Listing implements the mutable mapping protocol, so existing code that reads
+item["title"] or sets item["relevanceScore"] keeps working, and to_dict()
+produces the same JSON shape the plain dicts had.
+"""
+
+import hashlib
+import re
+from collections.abc import Mapping, MutableMapping
+
+from fitment import parse_fitment
+
+# Fields returned to the client, in response order
+LISTING_FIELDS = ("title", "price", "shipping", "condition", "source", "link", "image")
+
+_PRICE_STRIP_PATTERN = re.compile(r"[^0-9.]")
+_AMOUNT_PATTERN = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def parse_price(price):
+    """
+    Numeric price for sorting; unknown or unparseable prices sort last (inf).
+    Anything but digits and dots is stripped, so "$1,299.99" -> 1299.99.
+    """
+    if not price:
+        return float("inf")
+    try:
+        return float(_PRICE_STRIP_PATTERN.sub("", str(price)))
+    except ValueError:
+        return float("inf")
+
+
+def parse_shipping(shipping):
+    """Shipping cost: 0.0 for free shipping, the first amount found, or None"""
+    if not shipping:
+        return None
+    shipping_lower = str(shipping).lower()
+    if "free" in shipping_lower:
+        return 0.0
+    match = _AMOUNT_PATTERN.search(shipping_lower)
+    if match:
+        return float(match.group(0).replace(",", ""))
+    return None
+
+
+def normalize_condition(condition):
+    """Map a marketplace condition string to new / used / refurbished / for_parts / unspecified"""
+    condition_lower = (condition or "").lower()
+    # Anything mentioning "new" (Brand New, New (Other), Like New) counts as new
+    if "new" in condition_lower:
+        return "new"
+    if "parts" in condition_lower or "not working" in condition_lower:
+        return "for_parts"
+    if "refurb" in condition_lower or "reman" in condition_lower:
+        return "refurbished"
+    if "used" in condition_lower or "pre-owned" in condition_lower or "open box" in condition_lower:
+        return "used"
+    return "unspecified"
+
+
+def listing_fingerprint(source, link, title_lower):
+    """Stable short ID for a listing, the same across processes and restarts"""
+    raw = f"{source or ''}\x1f{link or ''}\x1f{title_lower}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class Listing(MutableMapping):
+    """
+    One marketplace listing with pre-parsed fields.
+
+    Derived attributes (read-only by convention, refreshed when a listing
+    field is reassigned):
+        title_lower: Lowercased title ("" when missing)
+        tokens: frozenset of the words in title_lower
+        price_value: Numeric price, inf when unknown
+        shipping_value: Numeric shipping cost, 0.0 when free, None when unknown
+        condition_key: Normalized condition (see normalize_condition)
+        fingerprint: Stable ID derived from source, link and title
+        fitment: Model years and year ranges stated in the title
+    """
+
+    __slots__ = LISTING_FIELDS + (
+        "title_lower", "tokens", "price_value", "shipping_value",
+        "condition_key", "fingerprint", "_extra"
+    )
+
+    def __init__(self, title=None, price=None, shipping=None, condition=None,
+                 source=None, link=None, image=None, **extra):
+        self.title = title
+        self.price = price
+        self.shipping = shipping
+        self.condition = condition
+        self.source = source
+        self.link = link
+        self.image = image
+        self._extra = extra or None
+        self._derive()
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a Listing from a plain listing dict (unknown keys become annotations)"""
+        return cls(**data)
+
+    @property
+    def fitment(self):
+        """Model years stated in the title (fitment.Fitment, cached by title)"""
+        return parse_fitment(self.title_lower)
+
+    def _derive(self):
+        title_lower = self.title.lower() if isinstance(self.title, str) else ""
+        self.title_lower = title_lower
+        self.tokens = frozenset(title_lower.split())
+        self.price_value = parse_price(self.price)
+        self.shipping_value = parse_shipping(self.shipping)
+        self.condition_key = normalize_condition(self.condition)
+        self.fingerprint = listing_fingerprint(self.source, self.link, title_lower)
+
+    # Mapping protocol over the listing fields plus annotations
+
+    def __getitem__(self, key):
+        if key in LISTING_FIELDS:
+            return getattr(self, key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in LISTING_FIELDS:
+            setattr(self, key, value)
+            self._derive()
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in LISTING_FIELDS:
+            raise KeyError(f"listing field {key!r} cannot be removed")
+        if self._extra is None or key not in self._extra:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __iter__(self):
+        yield from LISTING_FIELDS
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return len(LISTING_FIELDS) + (len(self._extra) if self._extra else 0)
+
+    def __contains__(self, key):
+        return key in LISTING_FIELDS or (self._extra is not None and key in self._extra)
+
+    def get(self, key, default=None):
+        # Fast path; the inherited version goes through __getitem__ and KeyError
+        if key in LISTING_FIELDS:
+            return getattr(self, key)
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def to_dict(self):
+        """Return the listing in its JSON shape"""
+        data = {field: getattr(self, field) for field in LISTING_FIELDS}
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    def __repr__(self):
+        return f"Listing({self.source!r}, {self.title!r}, {self.price!r})"
+
+
+def as_listing(item):
+    """Return item as a Listing, converting plain dicts"""
+    if isinstance(item, Listing):
+        return item
+    if isinstance(item, Mapping):
+        return Listing.from_dict(dict(item))
+    raise TypeError(f"cannot convert {type(item).__name__} to Listing")
@@ -10,6 +10,22 @@ FILLER_WORDS_PATTERN = re.compile(r"\b(for|a|the|my|an|this|that|to|on|in|with)\
 WHITESPACE_PATTERN = re.compile(r"\s+")
 DASH_PATTERN = re.compile(r"[–—]")
 
+# Spelling families folded to one form when building canonical marketplace queries.
+# Makes fold to the short forms that already give the best marketplace matches.
+CANONICAL_MAKE_PATTERNS = [
+    (re.compile(r"\bchev(?:y|rolet)?\b"), "chevy"),
+    (re.compile(r"\bmercedes(?:[\s-]benz)?\b|\bbenz\b"), "mercedes"),
+    (re.compile(r"\bvolkswag[eo]n\b"), "vw"),
+]
+CANONICAL_MODEL_PATTERNS = [
+    (re.compile(r"\bf[\s-]?(150|250|350|450|550)\b"), r"f-\1"),          # F-150 / F150 / F 150
+    (re.compile(r"\be[\s-]?(150|250|350|450)\b"), r"e-\1"),              # E-350 van
+    (re.compile(r"\b(ram|silverado|sierra)[\s-]?(1500|2500|3500)\b"), r"\1 \2"),
+    (re.compile(r"\bcx[\s-]?(3|30|5|50|7|9|90)\b"), r"cx-\1"),
+    (re.compile(r"\b(cr|hr|br)[\s-]?v\b"), r"\1-v"),                     # CR-V / CRV
+    (re.compile(r"\brav[\s-]?4\b"), "rav4"),
+]
+
 class EnhancedQueryProcessor:
     """
     Enhanced query processor that can handle various input formats
@@ -1052,6 +1068,28 @@ class EnhancedQueryProcessor:
         
         return query
     
+    @lru_cache(maxsize=1000)
+    def canonicalize_query(self, query):
+        """
+        Canonical form of a marketplace query, used both as the cache key and as
+        the text sent upstream so equivalent spellings share one result.
+        "2015 Ford F-150 bumper", "2015 ford f150 bumper" and
+        "2015  ford f 150 bumper" all become "2015 ford f-150 bumper".
+        Only case, whitespace, dashes and make/model spellings are folded;
+        unlike normalize_query, no words are dropped, since the result is
+        what the marketplaces are asked for ("a/c", "mercedes a 220").
+        """
+        if not query:
+            return ""
+        
+        query = DASH_PATTERN.sub("-", query.lower())
+        for pattern, replacement in CANONICAL_MAKE_PATTERNS:
+            query = pattern.sub(replacement, query)
+        for pattern, replacement in CANONICAL_MODEL_PATTERNS:
+            query = pattern.sub(replacement, query)
+        
+        return WHITESPACE_PATTERN.sub(" ", query).strip()
+    
     # Precompiled patterns for year extraction
     YEAR_RANGE_PATTERN = re.compile(r'\b((?:19|20)?\d{2})[-/](?:19|20)?\d{2}\b')
     FIRST_YEAR_PATTERN = re.compile(r'\b((?:19|20)?\d{2})')
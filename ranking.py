@@ -0,0 +1,311 @@
+"""
+Ranking Module
+
+One ranking engine for product listings. A pipeline runs its scoring stages
+over every listing in a single pass, collecting the value each stage returns
+into a feature tuple, and orders the listings by a sort key computed from
+those features. When only the first k listings are wanted they are selected
+with a heap instead of sorting the whole result set. Ties keep their input
+order, exactly like a stable sort.
+
+Stages are built per query by factory functions, so per-query work
+(lowercasing the query, compiling patterns and title matchers) happens once
+instead of once per listing, and every substring check a stage makes on a
+title is answered by a single TitleMatcher scan.
+
+The search-products ranking, the part-number listing order and the legacy
+year-grouping and year-match helpers are all configurations of this engine
+(see the *_pipeline functions).
+"""
+
+import heapq
+import re
+
+from listing import as_listing
+from title_matcher import compile_matcher
+
+# Bump whenever scoring or ordering changes: it is part of the key of every
+# cached ranked response (see response_cache.py), so older rankings aren't served
+RANKING_VERSION = 1
+
+# Words that indicate a complete/full part
+COMPLETE_INDICATORS = ("complete", "assembly", "full", "entire", "oem", "motor", "unit", "module")
+
+# Words that indicate parts or accessories
+PART_INDICATORS = ("cap", "cover", "filter", "sensor", "switch", "gasket", "seal", "bolt", "nut", "harness", "wire")
+
+# Titles that describe a whole engine rather than an engine part
+ENGINE_INDICATORS = ("complete engine", "engine assembly", "motor assembly",
+                     "long block", "short block", "engine motor", "complete motor")
+
+# Part match types in ranking order
+MATCH_TYPE_ORDER = ("exact_complete", "exact", "related", "other")
+
+
+class RankingPipeline:
+    """
+    Scores and orders listings.
+
+    Args:
+        stages: Callables run on each listing in order; each may annotate the
+            listing and returns one feature value
+        sort_key: Maps a listing's feature tuple to its sort key (lower ranks
+            first); None keeps the input order
+        best_match: Optional callable (position, listing) -> bool used to set
+            the bestMatch flag on the ranked listings
+    """
+
+    def __init__(self, stages, sort_key=None, best_match=None):
+        self.stages = tuple(stages)
+        self.sort_key = sort_key
+        self.best_match = best_match
+
+    def rank(self, listings, limit=None):
+        """
+        Return the listings (converted to Listing records) in ranked order,
+        or only the first `limit` of them.
+        """
+        stages = self.stages
+        sort_key = self.sort_key
+
+        keyed = []
+        for index, listing in enumerate(listings):
+            listing = as_listing(listing)
+            features = tuple(stage(listing) for stage in stages)
+            # The index breaks ties, so equal keys keep their input order and
+            # listings themselves are never compared
+            keyed.append((sort_key(features) if sort_key else 0, index, listing))
+
+        if limit is not None and limit < len(keyed):
+            ranked = [listing for _, _, listing in heapq.nsmallest(max(limit, 0), keyed)]
+        elif sort_key:
+            ranked = [listing for _, _, listing in sorted(keyed)]
+        else:
+            ranked = [listing for _, _, listing in keyed]
+
+        if self.best_match:
+            for position, listing in enumerate(ranked):
+                listing["bestMatch"] = self.best_match(position, listing)
+        return ranked
+
+
+def relevance_stage(query, vehicle_info):
+    """
+    Score how well a listing matches the query and vehicle (relevanceScore).
+    Returns the score.
+    """
+    vehicle_info = vehicle_info or {}
+    features = []  # (title terms, points) - points are added when any term occurs
+
+    # Points for matching query terms; a term repeated in the query counts each time
+    term_counts = {}
+    for term in query.lower().split():
+        if len(term) > 2:
+            term_counts[term] = term_counts.get(term, 0) + 1
+    for term, count in term_counts.items():
+        features.append(((term,), 5 * count))
+
+    year = vehicle_info.get("year")
+    make = vehicle_info.get("make")
+    model = vehicle_info.get("model")
+    part = vehicle_info.get("part")
+    if year:
+        features.append(((str(year),), 10))
+    if make:
+        features.append(((make.lower(),), 10))
+    if model:
+        # Model variations with/without hyphens
+        model_lower = model.lower()
+        features.append(((model_lower, model_lower.replace("-", ""), model_lower.replace("-", " ")), 15))
+    if part:
+        features.append(((part.lower(),), 15))
+    if make and model:
+        features.append(((f"{make} {model}".lower(),), 20))
+
+    matcher = compile_matcher([terms for terms, _ in features])
+    points = [points for _, points in features]
+
+    def score(listing):
+        mask = matcher.scan(listing.title_lower)
+        relevance = 0
+        for bit, feature_points in enumerate(points):
+            if mask >> bit & 1:
+                relevance += feature_points
+
+        # Prefer Google Shopping to show more Google results
+        if listing.source == "Google Shopping":
+            relevance += 10
+        # Prefer new parts
+        if listing.condition_key == "new":
+            relevance += 5
+        if listing.shipping_value == 0.0:
+            relevance += 3
+
+        listing["relevanceScore"] = relevance
+        return relevance
+
+    return score
+
+
+def part_match_stage(part_query):
+    """
+    Classify how closely a listing matches the searched part (matchType,
+    priorityScore, isExactMatch). Returns the match type's rank in
+    MATCH_TYPE_ORDER.
+    """
+    clean_part = part_query.lower().strip()
+    is_engine = clean_part == "engine"
+    exact_part_pattern = re.compile(r'\b' + re.escape(clean_part) + r'\b')
+
+    # Bits: 0 whole engine, 1 complete part, 2 small part/accessory, 3 part name anywhere
+    matcher = compile_matcher([
+        ENGINE_INDICATORS if is_engine else (),
+        COMPLETE_INDICATORS,
+        PART_INDICATORS,
+        (clean_part,)
+    ])
+
+    def classify(listing):
+        title = listing.title_lower
+        mask = matcher.scan(title)
+
+        if mask & 1:
+            match_type, priority_score = "exact_complete", 150  # Higher priority for complete engines
+        elif not mask & 8:
+            match_type, priority_score = "other", 10
+        elif exact_part_pattern.search(title):
+            if mask & 2:
+                match_type, priority_score = "exact_complete", 100
+            elif mask & 4:
+                # Likely just a small part of the main component
+                match_type, priority_score = "related", 50
+            else:
+                match_type, priority_score = "exact", 80
+        else:
+            # Part name is mentioned but not as a whole word
+            match_type, priority_score = "related", 40
+
+        listing["matchType"] = match_type
+        listing["priorityScore"] = priority_score
+        listing["isExactMatch"] = match_type in ("exact_complete", "exact")
+        return MATCH_TYPE_ORDER.index(match_type)
+
+    return classify
+
+
+def year_group_stage(target_year):
+    """
+    Flag listings for the exact target year (exactYearMatch) or a year range
+    covering it (compatibleRange, see fitment.py). Returns 0 for exact,
+    1 for compatible, 2 for other listings.
+    """
+    def group(listing):
+        fitment = listing.fitment
+        if fitment.mentions(target_year):
+            listing["exactYearMatch"] = True
+            listing["specialHighlight"] = True
+            return 0
+
+        listing["specialHighlight"] = False
+        year_range = fitment.range_for(target_year)
+        if year_range:
+            listing["compatibleRange"] = f"{year_range[0]}-{year_range[1]}"
+            return 1
+        return 2
+
+    return group
+
+
+def year_match_stage(year):
+    """
+    Basic year matching: listings that fit the year (by a single year or a
+    year range in the title) get exactYearMatch, relevanceScore 50 and
+    bestMatch. Returns 0 for matches, 1 otherwise.
+    """
+    def match(listing):
+        is_match = bool(year) and listing.fitment.fits(year)
+        listing["exactYearMatch"] = is_match
+        listing["relevanceScore"] = 50 if is_match else 0
+        listing["bestMatch"] = is_match
+        return 0 if is_match else 1
+
+    return match
+
+
+def listing_field_stage(field, default=None):
+    """Return a listing field or annotation unchanged, as a sort feature"""
+    def value(listing):
+        return listing.get(field, default)
+
+    return value
+
+
+def price_stage(listing):
+    """Return the listing's numeric price (unknown prices sort last)"""
+    return listing.price_value
+
+
+def total_cost_stage(listing):
+    """Return price plus shipping; unknown shipping counts as 0, unknown prices as inf"""
+    return listing.price_value + (listing.shipping_value or 0.0)
+
+
+def _search_best_match(position, listing):
+    # The top four plus every strong part match are highlighted
+    return position < 4 or listing.get("priorityScore", 0) > 80
+
+
+def search_pipeline(query, vehicle_info, part_query=None, extra_stages=()):
+    """
+    Ranking for /api/search-products: every listing gets a relevance score;
+    with a part, listings are ordered by part match type (input order within
+    a type), otherwise by relevance score. extra_stages run in the same pass
+    without affecting the order (e.g. a facets.FacetCounter).
+    """
+    stages = [relevance_stage(query, vehicle_info)]
+    if part_query:
+        stages.append(part_match_stage(part_query))
+        sort_key = lambda features: features[1]
+    else:
+        sort_key = lambda features: -features[0]
+    return RankingPipeline(stages + list(extra_stages), sort_key, best_match=_search_best_match)
+
+
+# Orders offered for a stored result set; "relevance" keeps the ranked order
+SORT_OPTIONS = ("relevance", "price-low", "price-high", "total-low", "total-high")
+
+
+def sort_pipeline(sort):
+    """
+    Re-ordering of an already ranked result set. Listings with an unknown
+    price go last in every order; ties keep the ranked order.
+    """
+    if sort == "price-low":
+        return RankingPipeline([price_stage], sort_key=lambda features: features[0])
+    if sort == "price-high":
+        return RankingPipeline([price_stage], sort_key=lambda features: (features[0] == float("inf"), -features[0]))
+    if sort == "total-low":
+        return RankingPipeline([total_cost_stage], sort_key=lambda features: features[0])
+    if sort == "total-high":
+        return RankingPipeline([total_cost_stage], sort_key=lambda features: (features[0] == float("inf"), -features[0]))
+    if sort == "relevance":
+        return RankingPipeline([])
+    raise ValueError(f"Unknown sort: {sort}")
+
+
+def part_number_pipeline():
+    """Ranking for part-number listings: primary part number first, then by price"""
+    return RankingPipeline(
+        [listing_field_stage("is_primary", False), price_stage],
+        sort_key=lambda features: (not features[0], features[1])
+    )
+
+
+def year_group_pipeline(target_year):
+    """Exact year matches first, then compatible year ranges, then the rest"""
+    return RankingPipeline([year_group_stage(target_year)], sort_key=lambda features: features[0])
+
+
+def year_match_pipeline(year):
+    """Listings mentioning the year first"""
+    return RankingPipeline([year_match_stage(year)], sort_key=lambda features: features[0])
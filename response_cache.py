@@ -0,0 +1,206 @@
+"""
+Response Cache Module
+
+Finished, ranked product search responses, keyed on what the search was
+asked for. A repeat search (agents re-run the same search often while on a
+call) is answered from here without extracting the vehicle again, filtering,
+deciding on fallbacks, scoring or sorting.
+
+Keys are built from the search term, the original query, the structured
+form data (normalized, so field order, case and blank fields don't matter)
+and the ranking version, so responses ranked by an older ranking are never
+served. They also carry a generation token stored in the backend itself;
+invalidate() without arguments replaces the token, which orphans every
+cached response on every worker sharing the backend. Result set IDs (see
+result_sets.py) of cached searches are derived from the same key.
+
+A response lives exactly as long as the upstream data it was built from:
+while a search runs, a SourceFreshness collects when each SerpAPI cache
+entry it read expires (per the SerpAPI TTL policy), and the response expires
+with the earliest of them. Searches that read stale or quota-skipped data,
+or were cut short by their deadline, aren't cached at all.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import json
+import secrets
+import threading
+import time
+
+from listing import Listing
+
+_GENERATION_KEY = "generation"
+
+
+class SourceFreshness:
+    """Expiry of the upstream data read by one search"""
+
+    def __init__(self):
+        self.expires_at = None
+        self.sources = 0
+        # Set when the search read data that must not be cached further
+        self.degraded = False
+
+    def record(self, expires_at):
+        """Record a source that stays fresh until expires_at (a time.time() value)"""
+        self.sources += 1
+        if self.expires_at is None or expires_at < self.expires_at:
+            self.expires_at = expires_at
+
+    def degrade(self):
+        """Record a source that was stale or skipped"""
+        self.degraded = True
+
+    def ttl(self):
+        """Seconds the data read so far stays fresh, or None when it can't be cached"""
+        if self.degraded or not self.sources:
+            return None
+        remaining = int(self.expires_at - time.time())
+        return remaining if remaining > 0 else None
+
+
+_freshness = contextvars.ContextVar("source_freshness", default=None)
+
+
+@contextlib.contextmanager
+def tracking():
+    """Collect the freshness of the upstream data read inside the block"""
+    freshness = SourceFreshness()
+    token = _freshness.set(freshness)
+    try:
+        yield freshness
+    finally:
+        _freshness.reset(token)
+
+
+def record_source(expires_at):
+    """Record upstream data the current search read, fresh until expires_at"""
+    freshness = _freshness.get()
+    if freshness is not None:
+        freshness.record(expires_at)
+
+
+def record_degraded_source():
+    """Record stale or skipped upstream data the current search read"""
+    freshness = _freshness.get()
+    if freshness is not None:
+        freshness.degrade()
+
+
+def _normalize_text(value):
+    return " ".join(str(value or "").casefold().split())
+
+
+def normalize_structured_data(structured_data):
+    """Structured form data with blank fields dropped and values case-folded"""
+    if not isinstance(structured_data, dict):
+        return None
+    normalized = {
+        str(field): _normalize_text(value)
+        for field, value in structured_data.items()
+        if _normalize_text(value)
+    }
+    return normalized or None
+
+
+class SearchResponseCache:
+    """
+    Ranked search responses by request.
+
+    Args:
+        cache: Cache backend holding the responses; its default TTL should be
+            None, since it also holds the generation token
+        version: Ranking version; part of every key
+    """
+
+    def __init__(self, cache, version):
+        self._cache = cache
+        self.version = version
+        # Counted here, since the backend's own counters include the
+        # generation token lookups
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _generation(self):
+        generation = self._cache.get(_GENERATION_KEY)
+        if generation is None:
+            # A new (or evicted) token orphans whatever was cached before it
+            generation = secrets.token_hex(8)
+            self._cache.set(_GENERATION_KEY, generation, ttl=None)
+        return generation
+
+    def _key(self, search_term, original_query, structured_data, generation):
+        raw = json.dumps([
+            _normalize_text(search_term),
+            _normalize_text(original_query),
+            normalize_structured_data(structured_data),
+            self.version,
+            generation
+        ], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def result_id(self, search_term, original_query, structured_data):
+        """
+        Result set ID for a cacheable search. It is derived from the cache
+        key, so every response served for the search shares one stored
+        result set instead of adding a copy per response.
+        """
+        return self._key(search_term, original_query, structured_data, self._generation())[:24]
+
+    def get(self, search_term, original_query, structured_data):
+        """
+        Return (ranked listings, facets, meta) for a cached search, or None
+        on a miss
+        """
+        key = self._key(search_term, original_query, structured_data, self._generation())
+        entry = self._cache.get(key)
+        with self._stats_lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if entry is None:
+            return None
+        listings = [Listing.from_dict(data) for data in entry["listings"]]
+        return listings, entry["facets"], entry.get("meta", {})
+
+    def set(self, search_term, original_query, structured_data, listings, facets, ttl, **meta):
+        """Cache a ranked response for ttl seconds"""
+        key = self._key(search_term, original_query, structured_data, self._generation())
+        self._cache.set(key, {
+            "listings": [listing.to_dict() for listing in listings],
+            "facets": facets,
+            "meta": meta
+        }, ttl=ttl)
+
+    def invalidate(self, search_term=None, original_query=None, structured_data=None):
+        """
+        Drop the cached response of one search, or of every search when no
+        search is given
+        """
+        with self._stats_lock:
+            self.invalidations += 1
+        if search_term is None and original_query is None and structured_data is None:
+            self._cache.set(_GENERATION_KEY, secrets.token_hex(8), ttl=None)
+            return
+        self._cache.delete(self._key(search_term, original_query, structured_data, self._generation()))
+
+    def stats(self):
+        backend_stats = self._cache.stats()
+        with self._stats_lock:
+            hits, misses, invalidations = self.hits, self.misses, self.invalidations
+        lookups = hits + misses
+        return {
+            "backend": backend_stats["backend"],
+            "size": backend_stats["size"],
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "errors": backend_stats["errors"],
+            "invalidations": invalidations,
+            "version": self.version
+        }
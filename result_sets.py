@@ -0,0 +1,101 @@
+"""
+Result Sets Module
+
+Ranked search results kept under a short-lived result ID, so follow-up
+requests (filtering, sorting, paging) work on the stored set instead of
+re-running the upstream searches and ranking.
+
+Result sets are stored through a cache backend (see cache_backends.py) as
+plain listing dicts, so with a shared backend any worker can serve the
+follow-up requests for a search.
+
+Pages are addressed by opaque cursors that encode the result ID, the offset
+of the page and the page size. Serving a page only slices the stored list;
+nothing is searched or ranked again.
+"""
+
+import base64
+import json
+import secrets
+import time
+
+from listing import Listing
+
+
+def encode_cursor(result_id, offset, page_size):
+    """Opaque cursor for the page of a result set starting at offset"""
+    raw = json.dumps([result_id, offset, page_size], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (result_id, offset, page_size) for a cursor; raises ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        result_id, offset, page_size = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(result_id, str) or not isinstance(offset, int) or not isinstance(page_size, int):
+        raise ValueError("Invalid cursor")
+    if offset < 0 or page_size < 1:
+        raise ValueError("Invalid cursor")
+    return result_id, offset, page_size
+
+
+def next_cursor(result_id, offset, page_size, total):
+    """Cursor for the page after the one at offset, or None on the last page"""
+    if offset + page_size >= total:
+        return None
+    return encode_cursor(result_id, offset + page_size, page_size)
+
+
+class ResultSetStore:
+    """
+    Stores ranked listings by result ID.
+
+    Args:
+        cache: Cache backend holding the result sets; its default TTL is how
+            long a result set stays available
+    """
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def save(self, listings, result_id=None, **meta):
+        """
+        Store listings (in ranked order) plus metadata; returns the result ID.
+        A given result_id replaces the set stored under it (and restarts its
+        TTL) instead of adding a new one.
+        """
+        result_id = result_id or secrets.token_urlsafe(12)
+        self._cache.set(result_id, {
+            "created_at": time.time(),
+            "meta": meta,
+            "listings": [listing.to_dict() for listing in listings]
+        })
+        return result_id
+
+    def load(self, result_id):
+        """Return (listings, meta) for a result ID, or None when it is unknown or expired"""
+        if not result_id:
+            return None
+        entry = self._cache.get(result_id)
+        if entry is None:
+            return None
+        return [Listing.from_dict(data) for data in entry["listings"]], entry.get("meta", {})
+
+    def load_page(self, result_id, offset, limit):
+        """
+        Return (listing dicts, total) for one page of a result set, or None
+        when it is unknown or expired. The stored dicts are returned as-is.
+        """
+        if not result_id:
+            return None
+        entry = self._cache.get(result_id)
+        if entry is None:
+            return None
+        listings = entry["listings"]
+        return listings[offset:offset + limit], len(listings)
+
+    def stats(self):
+        return self._cache.stats()
@@ -0,0 +1,254 @@
+"""
+Search Cache Module
+
+Provides a bounded, thread-safe LRU cache with per-key TTL used to hold
+upstream marketplace results (SerpAPI) between searches.
+
+Also provides SingleFlight, which collapses concurrent cache misses for the
+same key into a single upstream call, and per-request tracking of stale
+cache entries, so a response built from them can say so.
+
+Entries are spread across a small number of independently locked shards so
+concurrent request threads rarely contend on the same lock. Each shard keeps
+its entries in access order, which makes both lookups and least-recently-used
+eviction O(1).
+"""
+
+import concurrent.futures
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with per-key expiry and hit/miss/eviction counters.
+
+    Args:
+        max_size: Maximum number of live entries across all shards
+        default_ttl: Expiry in seconds used when set() is called without a ttl
+        shards: Number of independently locked partitions
+    """
+
+    def __init__(self, max_size=1000, default_ttl=300, shards=8):
+        self.max_size = max(1, int(max_size))
+        self.default_ttl = default_ttl
+        self._shard_count = max(1, min(int(shards), self.max_size))
+        # Split the size bound between shards so the total never exceeds max_size
+        base, extra = divmod(self.max_size, self._shard_count)
+        self._shard_limits = [base + (1 if i < extra else 0) for i in range(self._shard_count)]
+        self._shards = [OrderedDict() for _ in range(self._shard_count)]
+        self._locks = [threading.Lock() for _ in range(self._shard_count)]
+
+        # Counters for monitoring cache effectiveness
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _shard_index(self, key):
+        return hash(key) % self._shard_count
+
+    def _count(self, counter, amount=1):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired"""
+        index = self._shard_index(key)
+        shard = self._shards[index]
+        now = time.time()
+
+        with self._locks[index]:
+            entry = shard.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    # Mark as most recently used
+                    shard.move_to_end(key)
+                    hit = True
+                else:
+                    del shard[key]
+                    hit = False
+                    self._count("expirations")
+            else:
+                hit = False
+
+        self._count("hits" if hit else "misses")
+        return value if hit else default
+
+    def set(self, key, value, ttl=None):
+        """
+        Store value under key. A ttl of None uses the cache default; a default
+        of None means the entry only leaves the cache through LRU eviction.
+        """
+        if ttl is None:
+            ttl = self.default_ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+
+        index = self._shard_index(key)
+        shard = self._shards[index]
+        evicted = 0
+
+        with self._locks[index]:
+            if key in shard:
+                shard.move_to_end(key)
+            shard[key] = (expires_at, value)
+
+            # Evict least recently used entries once the shard is over its bound
+            while len(shard) > self._shard_limits[index]:
+                shard.popitem(last=False)
+                evicted += 1
+
+        if evicted:
+            self._count("evictions", evicted)
+
+    def delete(self, key):
+        """Remove key from the cache if present"""
+        index = self._shard_index(key)
+        with self._locks[index]:
+            self._shards[index].pop(key, None)
+
+    def clear(self):
+        """Remove every entry (counters are preserved)"""
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                shard.clear()
+
+    def purge_expired(self):
+        """Drop all expired entries and return how many were removed"""
+        now = time.time()
+        removed = 0
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                # Collect first so we never mutate a shard while iterating it
+                expired = [k for k, (expires_at, _) in shard.items()
+                           if expires_at is not None and expires_at <= now]
+                for k in expired:
+                    del shard[k]
+                removed += len(expired)
+        if removed:
+            self._count("expirations", removed)
+        return removed
+
+    def __contains__(self, key):
+        # Membership checks don't touch LRU order or the hit/miss counters
+        index = self._shard_index(key)
+        with self._locks[index]:
+            entry = self._shards[index].get(key)
+        return entry is not None and (entry[0] is None or entry[0] > time.time())
+
+    def __len__(self):
+        total = 0
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                total += len(shard)
+        return total
+
+    def stats(self):
+        """Return a snapshot of the cache counters"""
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+            evictions, expirations = self.evictions, self.expirations
+        lookups = hits + misses
+        return {
+            "size": len(self),
+            "max_size": self.max_size,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": evictions,
+            "expirations": expirations
+        }
+
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls that share a key. The first caller runs the
+    function; callers arriving while it is in flight wait on the same future
+    and receive its result (or its exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) once per key among concurrent callers"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = concurrent.futures.Future()
+                self._calls[key] = future
+                self.executed += 1
+                is_leader = True
+            else:
+                self.coalesced += 1
+                is_leader = False
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self, key):
+        """Return True if a call for key is currently running"""
+        with self._lock:
+            return key in self._calls
+
+    def stats(self):
+        """Return counters for executed and coalesced calls"""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executed": self.executed,
+                "coalesced": self.coalesced
+            }
+
+
+class StaleReads:
+    """Whether one request was served any stale cache entry"""
+
+    def __init__(self):
+        self.stale = False
+
+
+_stale_reads = contextvars.ContextVar("stale_reads", default=None)
+
+
+def begin_stale_tracking():
+    """Start tracking stale entries served to the current request; returns a token for end_stale_tracking()"""
+    return _stale_reads.set(StaleReads())
+
+
+def end_stale_tracking(token):
+    """Stop the tracking started by begin_stale_tracking()"""
+    _stale_reads.reset(token)
+
+
+def record_stale_read():
+    """Record that the current request was served a stale entry"""
+    reads = _stale_reads.get()
+    if reads is not None:
+        reads.stale = True
+
+
+def served_stale():
+    """True when the current request was served any stale entry"""
+    reads = _stale_reads.get()
+    return reads is not None and reads.stale
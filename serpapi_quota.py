@@ -0,0 +1,185 @@
+"""
+SerpAPI Quota Module
+
+Keeps SerpAPI usage inside the account's hourly and monthly quota. Every
+upstream SerpAPI call (cache hits are free) must acquire a token first.
+
+Calls carry a priority class:
+    primary     - the searches a request actually asked for
+    fallback    - retries with simplified or specialised terms
+    speculative - work nobody is waiting on, e.g. background cache refreshes
+
+Lower priorities must leave a reserve of the hourly and monthly budgets
+untouched, so as the quota runs low speculative calls are dropped first,
+then fallbacks, and primary searches keep working the longest.
+
+Each HTTP request may additionally be capped at a fixed number of SerpAPI
+calls. The cap and the priority are held in contextvars, which the upstream
+engine copies into every call it fans out.
+
+Budgets are tracked per process; with several workers, configure the limits
+per worker.
+"""
+
+import contextlib
+import contextvars
+import threading
+import time
+
+PRIMARY = "primary"
+FALLBACK = "fallback"
+SPECULATIVE = "speculative"
+
+# Share of each budget that a priority class must leave for higher classes
+PRIORITY_RESERVES = {
+    PRIMARY: 0.0,
+    FALLBACK: 0.1,
+    SPECULATIVE: 0.25,
+}
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at refill_rate tokens per second.
+    Not thread-safe on its own; QuotaBudget serialises access.
+    """
+
+    def __init__(self, capacity, refill_rate):
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self._tokens = float(capacity)
+        self._updated_at = time.time()
+
+    def available(self):
+        """Refill for elapsed time and return the tokens currently available"""
+        now = time.time()
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_rate)
+            self._updated_at = now
+        return self._tokens
+
+    def take(self, tokens=1):
+        self._tokens -= tokens
+
+
+class RequestBudget:
+    """Counts SerpAPI calls made on behalf of one HTTP request"""
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.used = 0
+        self.denied = 0
+
+
+_request_budget = contextvars.ContextVar("serpapi_request_budget", default=None)
+_priority = contextvars.ContextVar("serpapi_priority", default=PRIMARY)
+
+
+def begin_request(cap):
+    """Start a per-request call budget; returns a token for end_request()"""
+    return _request_budget.set(RequestBudget(cap))
+
+
+def end_request(token):
+    """Discard the per-request budget started by begin_request()"""
+    _request_budget.reset(token)
+
+
+def current_request_budget():
+    """Return the RequestBudget of the current request, or None outside one"""
+    return _request_budget.get()
+
+
+@contextlib.contextmanager
+def priority(level):
+    """Run the enclosed SerpAPI calls (and anything they fan out) at a priority"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+class QuotaBudget:
+    """
+    Hourly token bucket plus a calendar-month counter, shared by all threads.
+
+    Args:
+        hourly_limit: Calls allowed per hour (bucket capacity, refilled evenly)
+        monthly_limit: Calls allowed per calendar month (UTC)
+        reserves: Share of each budget every priority class must leave unused
+    """
+
+    def __init__(self, hourly_limit, monthly_limit, reserves=None):
+        self.hourly_limit = hourly_limit
+        self.monthly_limit = monthly_limit
+        self.reserves = dict(PRIORITY_RESERVES if reserves is None else reserves)
+        self._lock = threading.Lock()
+        self._hourly = TokenBucket(hourly_limit, hourly_limit / 3600.0)
+        self._month = self._current_month()
+        self._monthly_used = 0
+        self.granted = {level: 0 for level in self.reserves}
+        self.denied = {level: 0 for level in self.reserves}
+        self.denied_by_request_cap = 0
+
+    @staticmethod
+    def _current_month():
+        return time.strftime("%Y-%m", time.gmtime())
+
+    def _roll_month(self):
+        month = self._current_month()
+        if month != self._month:
+            self._month = month
+            self._monthly_used = 0
+
+    def acquire(self, level=None):
+        """
+        Take one call from the budget. Returns False, without consuming
+        anything, when the call should be skipped.
+        level defaults to the priority set with priority().
+        """
+        level = level or current_priority()
+        reserve = self.reserves.get(level, self.reserves[SPECULATIVE])
+        request_budget = current_request_budget()
+
+        with self._lock:
+            if request_budget is not None and request_budget.used >= request_budget.cap:
+                request_budget.denied += 1
+                self.denied_by_request_cap += 1
+                return False
+
+            self._roll_month()
+            hourly_available = self._hourly.available()
+            monthly_available = self.monthly_limit - self._monthly_used
+            if (hourly_available - 1 < self.hourly_limit * reserve
+                    or monthly_available - 1 < self.monthly_limit * reserve):
+                self.denied[level] = self.denied.get(level, 0) + 1
+                return False
+
+            self._hourly.take()
+            self._monthly_used += 1
+            self.granted[level] = self.granted.get(level, 0) + 1
+            if request_budget is not None:
+                request_budget.used += 1
+            return True
+
+    def stats(self):
+        """Return current usage and remaining budget"""
+        with self._lock:
+            self._roll_month()
+            return {
+                "hourly_limit": self.hourly_limit,
+                "hourly_remaining": int(self._hourly.available()),
+                "monthly_limit": self.monthly_limit,
+                "monthly_used": self._monthly_used,
+                "monthly_remaining": self.monthly_limit - self._monthly_used,
+                "month": self._month,
+                "granted": dict(self.granted),
+                "denied": dict(self.denied),
+                "denied_by_request_cap": self.denied_by_request_cap
+            }
@@ -0,0 +1,170 @@
+import fnmatch
+import os
+import socketserver
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache_backends
+from cache_backends import MemoryBackend, RedisBackend, RedisProtocolError, SQLiteBackend
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough RESP2 for RedisBackend; expiry is left to the tests"""
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:-2])):
+                length = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(length + 2)[:-2])
+            self.server.commands.append(args)
+            command = args[0].upper()
+            if command == b"GET":
+                value = store.get(args[1])
+                self.wfile.write(b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value))
+            elif command == b"SET":
+                store[args[1]] = args[2]
+                self.wfile.write(b"+OK\r\n")
+            elif command == b"DEL":
+                deleted = sum(1 for key in args[1:] if store.pop(key, None) is not None)
+                self.wfile.write(b":%d\r\n" % deleted)
+            elif command == b"SCAN":
+                pattern = args[3].decode()
+                keys = [key for key in store if fnmatch.fnmatch(key.decode(), pattern)]
+                self.wfile.write(b"*2\r\n$1\r\n0\r\n*%d\r\n" % len(keys))
+                self.wfile.write(b"".join(b"$%d\r\n%s\r\n" % (len(key), key) for key in keys))
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+@pytest.fixture
+def resp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), RespHandler)
+    server.daemon_threads = True
+    server.store = {}
+    server.commands = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "cache.sqlite3"), "test", default_ttl=60)
+    return MemoryBackend("test", default_ttl=60)
+
+
+def test_round_trips_json_values(backend):
+    value = {"results": [{"title": "2015 Ford F-150 bumper", "price": 120.5}], "stale": False}
+    backend.set("key", value)
+
+    assert backend.get("key") == value
+    assert backend.get("missing", "default") == "default"
+    stats = backend.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+
+def test_delete_and_clear(backend):
+    backend.set("a", 1)
+    backend.set("b", 2)
+    backend.delete("a")
+    assert backend.get("a") is None and backend.get("b") == 2
+
+    backend.clear()
+    assert backend.get("b") is None
+
+
+def test_sqlite_entries_expire(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_backends.time, "time", clock)
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"), "test", default_ttl=60)
+    backend.set("default", 1)
+    backend.set("short", 2, ttl=5)
+
+    clock.now += 10
+    assert backend.get("short") is None
+    assert backend.get("default") == 1
+
+
+def test_sqlite_namespaces_share_one_file(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    serpapi = SQLiteBackend(path, "serpapi")
+    vin = SQLiteBackend(path, "vin")
+    serpapi.set("key", "listings")
+    vin.set("key", "vehicle")
+
+    # Another worker opening the same file sees the entries
+    assert SQLiteBackend(path, "serpapi").get("key") == "listings"
+    vin.clear()
+    assert serpapi.get("key") == "listings" and vin.get("key") is None
+
+
+def test_sqlite_prune_keeps_newest_entries(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_backends.time, "time", clock)
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"), "test", max_size=3)
+    for i in range(5):
+        clock.now += 1
+        backend.set(f"key-{i}", i)
+    backend._prune()
+
+    assert backend.stats()["size"] == 3
+    assert backend.get("key-0") is None and backend.get("key-4") == 4
+
+
+def test_redis_backend_speaks_resp(resp_server):
+    port = resp_server.server_address[1]
+    backend = RedisBackend(f"redis://127.0.0.1:{port}/0", "serpapi")
+    backend.set("key", {"title": "bumper"}, ttl=1.5)
+    backend.set("forever", [1, 2])
+
+    assert backend.get("key") == {"title": "bumper"}
+    assert backend.get("missing") is None
+    # Keys are namespaced and expiry is passed to the server in milliseconds
+    assert [b"SET", b"autoxpress:serpapi:key", b'{"title":"bumper"}', b"PX", b"1500"] in resp_server.commands
+    assert [b"SET", b"autoxpress:serpapi:forever", b"[1,2]"] in resp_server.commands
+
+    backend.clear()
+    assert resp_server.store == {}
+
+
+def test_redis_errors_count_as_misses(resp_server):
+    port = resp_server.server_address[1]
+    backend = RedisBackend(f"redis://127.0.0.1:{port}/0", "serpapi")
+    with pytest.raises(RedisProtocolError):
+        backend._command("NOSUCHCOMMAND")
+
+    resp_server.shutdown()
+    resp_server.server_close()
+    backend._local.conn.close()
+    # A failing server makes the cache miss instead of failing the search
+    assert backend.get("key") is None
+    assert backend.stats()["errors"] == 1
+
+
+def test_create_cache_picks_backend_from_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("CACHE_SQLITE_PATH", str(tmp_path / "cache.sqlite3"))
+    assert isinstance(cache_backends.create_cache("test"), SQLiteBackend)
+
+    monkeypatch.setenv("CACHE_BACKEND", "unknown")
+    assert isinstance(cache_backends.create_cache("test"), MemoryBackend)
@@ -0,0 +1,79 @@
+import os
+import random
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup import NearDuplicateIndex, similar_strings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = ("2015 2014-2018 ford f-150 f150 fl3z-17757-a front bumper assembly chrome oem new genuine "
+         "steel cover complete replacement for fits xlt lariat driver side passenger headlight lamp "
+         "w/ fog light kit primed black motorcraft").split()
+CHARS = "abcdefghijklmnopqrstuvwxyz0123456789 -/"
+
+
+def random_title(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 14)))
+
+
+def edited(rng, title):
+    # Scattered character edits keep the difflib ratio high while breaking
+    # many shingles, the hardest near-duplicates for the index to find
+    chars = list(title)
+    for _ in range(max(1, len(chars) // rng.randint(5, 9))):
+        i = rng.randrange(len(chars))
+        op = rng.random()
+        if op < 0.4:
+            chars[i] = rng.choice(CHARS)
+        elif op < 0.7:
+            chars.insert(i, rng.choice(CHARS))
+        elif len(chars) > 1:
+            chars.pop(i)
+    return "".join(chars)
+
+
+def pairwise_kept(titles):
+    kept = []
+    for title in titles:
+        if not any(similar_strings(title, other) for other in kept):
+            kept.append(title)
+    return kept
+
+
+def test_index_keeps_the_same_titles_as_the_pairwise_scan():
+    rng = random.Random(15)
+    originals = [random_title(rng) for _ in range(150)]
+    titles = originals + [edited(rng, rng.choice(originals)) if rng.random() < 0.6 else random_title(rng)
+                          for _ in range(250)]
+    rng.shuffle(titles)
+
+    index = NearDuplicateIndex()
+    kept = [title for title in titles if index.add_if_new(title)]
+
+    assert kept == pairwise_kept(titles)
+
+
+def test_find_returns_first_indexed_duplicate():
+    index = NearDuplicateIndex()
+    first = index.add("ford f-150 front bumper chrome")
+    index.add("honda civic radiator")
+
+    assert index.find("ford f-150 front bumper chrom") == first
+    assert index.find("toyota camry headlight") is None
+    # Short texts match by containment
+    assert index.find("civic") == 1
+
+
+def test_signatures_are_the_same_in_every_process():
+    script = ("from dedup import NearDuplicateIndex; "
+              "print(NearDuplicateIndex()._band_keys('ford f-150 front bumper chrome'))")
+    outputs = {
+        subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True,
+                       env=dict(os.environ, PYTHONHASHSEED=seed)).stdout
+        for seed in ("1", "2", "random")
+    }
+
+    assert len(outputs) == 1
@@ -0,0 +1,91 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import facets
+import ranking
+from facets import FacetCounter, ListingFilter
+from listing import Listing
+
+
+def listing(title, price="$10.00", shipping="", condition="New", source="eBay"):
+    return Listing.from_dict(dict(title=title, price=price, shipping=shipping, condition=condition,
+                                  source=source, link="", image=""))
+
+
+LISTINGS = [
+    listing("2015 Civic radiator", price="$40", shipping="Free shipping", source="eBay"),
+    listing("Civic radiator 2014-2016", price="$120", shipping="$9.99", condition="Used", source="eBay"),
+    listing("Radiator for 2015 Civic", price="$75", shipping="Free", source="Google Shopping"),
+    listing("Radiator", price="", condition="For parts or not working", source="Google Shopping"),
+]
+
+
+@pytest.mark.parametrize("price,label", [
+    (0, "0-50"), (49.99, "0-50"), (50, "50-100"), (499, "250-500"), (500, "500+"),
+    (float("inf"), "unknown"),
+])
+def test_price_bucket(price, label):
+    assert facets.price_bucket(price) == label
+
+
+def test_counter_as_ranking_stage():
+    counter = FacetCounter(year="2015")
+    ranked = ranking.search_pipeline("radiator", {}, part_query="radiator", extra_stages=(counter,)).rank(LISTINGS)
+
+    assert len(ranked) == 4
+    assert counter.counts() == {
+        "total": 4,
+        "source": {"eBay": 2, "Google Shopping": 2},
+        "condition": {"new": 2, "used": 1, "for_parts": 1},
+        "free_shipping": 2,
+        "price": {"0-50": 1, "50-100": 1, "100-250": 1, "250-500": 0, "500+": 0, "unknown": 1},
+        "exact_year": 2,
+    }
+
+
+def test_empty_filter_accepts_everything():
+    assert all(ListingFilter()(item) for item in LISTINGS)
+
+
+def test_filter_combines_selections():
+    matches = ListingFilter(sources=["eBay", "Google Shopping"], conditions=["new"], free_shipping=True)
+
+    assert [item.title for item in LISTINGS if matches(item)] == ["2015 Civic radiator", "Radiator for 2015 Civic"]
+
+
+def test_max_price_excludes_unknown_prices():
+    assert [item.title for item in LISTINGS if ListingFilter(max_price=100)(item)] == [
+        "2015 Civic radiator", "Radiator for 2015 Civic"]
+
+
+def test_exact_year_filter_needs_a_year():
+    assert [item.title for item in LISTINGS if ListingFilter(exact_year=True, year="2015")(item)] == [
+        "2015 Civic radiator", "Radiator for 2015 Civic"]
+    assert all(ListingFilter(exact_year=True)(item) for item in LISTINGS)
+
+
+@pytest.mark.parametrize("sort,expected", [
+    ("relevance", ["a", "b", "c", "d"]),
+    ("price-low", ["c", "b", "a", "d"]),
+    ("price-high", ["a", "b", "c", "d"]),
+    ("total-low", ["b", "c", "a", "d"]),
+    ("total-high", ["a", "c", "b", "d"]),
+])
+def test_sort_pipeline(sort, expected):
+    listings = [
+        listing("a", price="$30", shipping="$5"),
+        listing("b", price="$20", shipping="Free"),
+        listing("c", price="$10", shipping="$15.50"),
+        listing("d", price=""),
+    ]
+
+    assert [item.title for item in ranking.sort_pipeline(sort).rank(listings)] == expected
+
+
+def test_sort_pipeline_rejects_unknown_sort():
+    with pytest.raises(ValueError):
+        ranking.sort_pipeline("newest")
@@ -0,0 +1,70 @@
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fitment import NO_FITMENT, expand_two_digit_year, parse_fitment
+
+
+@pytest.mark.parametrize("title, ranges", [
+    ("2001-2007 honda civic front bumper", [(2001, 2007)]),
+    ("2001 – 2007 honda civic front bumper", [(2001, 2007)]),
+    ("2001/2007 honda civic front bumper", [(2001, 2007)]),
+    ("fits 1995 to 2002 chevy s10", [(1995, 2002)]),
+    ("1995 thru 2002 chevy s10", [(1995, 2002)]),
+    ("01-07 silverado headlight", [(2001, 2007)]),
+    ("95–02 camaro bumper", [(1995, 2002)]),
+    ("2009-2014 f150 / 14-16 f250 grille", [(2009, 2014), (2014, 2016)]),
+])
+def test_parses_year_ranges(title, ranges):
+    assert list(parse_fitment(title).ranges) == ranges
+
+
+@pytest.mark.parametrize("title", [
+    # Adjacent numbers without a range separator are not a range
+    "1995 2002 chevy s10 bumper",
+    "part 2004 2010 bracket",
+    # Part numbers, dimensions and dates aren't model years
+    "1500-2500 lb winch",
+    "1900-2100 mm roof rack",
+    "01/07 dated invoice",
+])
+def test_ignores_numbers_that_are_not_year_ranges(title):
+    assert parse_fitment(title).ranges == ()
+
+
+def test_fits_mentioned_years_and_covered_ranges():
+    fitment = parse_fitment("2005 honda civic bumper fits 2001-2004")
+
+    assert fitment.mentions(2005) and fitment.mentions("2001")
+    assert not fitment.mentions(2003)
+    assert fitment.fits("2003") and fitment.fits(2005)
+    assert not fitment.fits(2006) and not fitment.fits("unknown")
+    assert fitment.range_for(2002) == (2001, 2004)
+    assert fitment.range_for(2005) is None
+
+
+def test_separate_years_fit_only_themselves():
+    fitment = parse_fitment("1995 2002 chevy s10 bumper")
+    assert fitment.fits(1995) and fitment.fits(2002)
+    assert not fitment.fits(1998)
+
+
+def test_titles_without_years_have_no_fitment():
+    assert parse_fitment("front bumper cover") is NO_FITMENT
+    assert not parse_fitment("front bumper cover")
+    assert parse_fitment("") is NO_FITMENT
+
+
+def test_two_digit_years_pivot_at_fifty():
+    assert expand_two_digit_year("01") == 2001
+    assert expand_two_digit_year("49") == 2049
+    assert expand_two_digit_year(95) == 1995
+
+
+def test_future_years_beyond_the_model_year_window_are_not_ranges():
+    next_decade = date.today().year + 10
+    assert parse_fitment(f"2020-{next_decade} tonneau cover").ranges == ()
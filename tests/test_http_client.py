@@ -0,0 +1,161 @@
+import os
+import sys
+import types
+
+import openai
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deadline
+import http_client
+
+
+class RaisingSession:
+    def __init__(self, exc):
+        self.exc = exc
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        raise self.exc
+
+
+def half_open_breaker(monkeypatch, session):
+    breaker = http_client.CircuitBreaker("nhtsa", failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == http_client.CircuitBreaker.HALF_OPEN
+    monkeypatch.setitem(http_client.BREAKERS, "nhtsa", breaker)
+    monkeypatch.setattr(http_client, "get_session", lambda upstream: session)
+    return breaker
+
+
+@pytest.mark.parametrize("exc", [
+    requests.exceptions.ChunkedEncodingError("truncated"),
+    requests.exceptions.TooManyRedirects("redirect loop"),
+])
+def test_half_open_trial_raising_non_connection_error_releases_trial(monkeypatch, exc):
+    session = RaisingSession(exc)
+    breaker = half_open_breaker(monkeypatch, session)
+
+    with pytest.raises(type(exc)):
+        http_client.get("nhtsa", "https://vpic.example/decode")
+
+    # Not retried, and the failed trial re-opens the breaker...
+    assert session.calls == 1
+    assert breaker.stats()["consecutive_failures"] == 2
+    # ...which goes half-open again after the cool-down and lets the next trial through
+    assert breaker.allow_request()
+    assert breaker.stats()["rejected"] == 0
+
+
+def openai_status_error(error_class, status_code):
+    # The SDK only reads these attributes of the HTTP response
+    response = types.SimpleNamespace(status_code=status_code, headers={}, request=None)
+    return error_class(f"status {status_code}", response=response, body=None)
+
+
+def raise_error(exc):
+    raise exc
+
+
+@pytest.mark.parametrize("exc", [
+    openai.APITimeoutError(request=None),
+    openai.APIConnectionError(request=None),
+    openai_status_error(openai.RateLimitError, 429),
+    openai_status_error(openai.InternalServerError, 500),
+    openai_status_error(openai.APIStatusError, 503),
+])
+def test_openai_outages_count_against_the_breaker(exc):
+    breaker = http_client.CircuitBreaker("openai", failure_threshold=3, is_failure=http_client.is_openai_outage)
+
+    for _ in range(3):
+        with pytest.raises(type(exc)):
+            breaker.call(raise_error, exc)
+
+    assert breaker.state == http_client.CircuitBreaker.OPEN
+
+
+@pytest.mark.parametrize("exc", [
+    openai_status_error(openai.BadRequestError, 400),
+    openai_status_error(openai.AuthenticationError, 401),
+    openai_status_error(openai.NotFoundError, 404),
+])
+def test_rejected_openai_requests_dont_open_the_breaker(exc):
+    breaker = http_client.CircuitBreaker("openai", failure_threshold=1, recovery_timeout=0,
+                                         is_failure=http_client.is_openai_outage)
+
+    for _ in range(3):
+        with pytest.raises(type(exc)):
+            breaker.call(raise_error, exc)
+
+    assert breaker.state == http_client.CircuitBreaker.CLOSED
+    # A half-open trial that gets rejected proves the API is up
+    breaker.record_failure()
+    with pytest.raises(type(exc)):
+        breaker.call(raise_error, exc)
+    assert breaker.state == http_client.CircuitBreaker.CLOSED
+
+
+def test_openai_breaker_classifies_errors():
+    assert http_client.get_breaker("openai").is_failure is http_client.is_openai_outage
+
+
+class RecordingSession:
+    def __init__(self, exc=None):
+        self.exc = exc
+        self.timeouts = []
+
+    def request(self, method, url, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        if self.exc is not None:
+            raise self.exc
+        return types.SimpleNamespace(status_code=200, headers={})
+
+
+@pytest.fixture
+def request_deadline():
+    token = deadline.begin(2)
+    yield deadline.current()
+    deadline.end(token)
+
+
+def test_bounded_timeout():
+    assert deadline.bounded_timeout((3.05, 10)) == ((3.05, 10), False)
+
+    token = deadline.begin(2)
+    try:
+        (connect, read), bounded = deadline.bounded_timeout((1, 10))
+        assert bounded and connect == 1 and 1.9 < read <= 2
+        assert deadline.bounded_timeout(0.5) == (0.5, False)
+        assert deadline.bounded_timeout(None)[1]
+        deadline.current().expires_at -= 5
+        assert deadline.bounded_timeout(30) == (deadline.MIN_TIMEOUT, True)
+    finally:
+        deadline.end(token)
+
+
+def test_request_timeout_is_shortened_to_the_deadline(monkeypatch, request_deadline):
+    session = RecordingSession()
+    monkeypatch.setattr(http_client, "get_session", lambda upstream: session)
+
+    http_client.get("serpapi", "https://serpapi.example/search")
+
+    # (3.05, 10) by default
+    connect, read = session.timeouts[0]
+    assert 1.9 < connect <= 2 and 1.9 < read <= 2
+
+
+def test_timeout_cut_by_the_deadline_is_not_an_upstream_failure(monkeypatch, request_deadline):
+    session = RecordingSession(requests.exceptions.ReadTimeout("read timed out"))
+    breaker = half_open_breaker(monkeypatch, session)
+
+    with pytest.raises(deadline.DeadlineExceeded):
+        http_client.get("nhtsa", "https://vpic.example/decode")
+
+    # Not retried, not counted, and the trial slot is free for the next call
+    assert len(session.timeouts) == 1
+    assert request_deadline.cut_short
+    assert breaker.stats()["consecutive_failures"] == 1
+    assert breaker.allow_request()
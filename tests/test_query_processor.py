@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_processor import EnhancedQueryProcessor
+
+
+@pytest.mark.parametrize("query, canonical", [
+    ("2015 Ford F150 bumper", "2015 ford f-150 bumper"),
+    ("2015  FORD f 150 bumper", "2015 ford f-150 bumper"),
+    # Canonicalization never drops words from the marketplace query
+    ("12 VOLT A/C compressor", "12 volt a/c compressor"),
+    ("2018 Mercedes A 220 headlight", "2018 mercedes a 220 headlight"),
+    ("water pump with gasket", "water pump with gasket"),
+])
+def test_canonicalize_query(query, canonical):
+    assert EnhancedQueryProcessor().canonicalize_query(query) == canonical
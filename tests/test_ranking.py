@@ -0,0 +1,113 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ranking
+from ranking import RankingPipeline
+
+
+def listing(title, price="$10.00", **fields):
+    return dict(title=title, price=price, shipping="", condition="New", source="eBay", link="", image="", **fields)
+
+
+def price_pipeline():
+    return RankingPipeline([ranking.price_stage], sort_key=lambda features: features[0])
+
+
+def test_top_k_matches_prefix_of_full_ranking():
+    rng = random.Random(7)
+    listings = [listing(f"part {i}", price=f"${rng.randint(1, 20)}.00") for i in range(200)]
+
+    full = [item["title"] for item in price_pipeline().rank(listings)]
+    for limit in (0, 1, 5, 24, 199, 200, 500):
+        top = [item["title"] for item in price_pipeline().rank(listings, limit=limit)]
+        assert top == full[:limit]
+
+
+def test_ties_keep_input_order():
+    listings = [listing(f"part {i}", price="$5.00") for i in range(10)]
+
+    ranked = price_pipeline().rank(listings, limit=4)
+
+    assert [item["title"] for item in ranked] == ["part 0", "part 1", "part 2", "part 3"]
+
+
+def test_without_sort_key_keeps_input_order():
+    listings = [listing("b", price="$9"), listing("a", price="$1")]
+
+    ranked = RankingPipeline([ranking.price_stage]).rank(listings)
+
+    assert [item["title"] for item in ranked] == ["b", "a"]
+
+
+def test_search_pipeline_orders_by_part_match_type():
+    listings = [
+        listing("Headlight bulb for sedan"),
+        listing("Alternator pulley cover"),
+        listing("Alternator"),
+        listing("Complete alternator assembly"),
+    ]
+
+    ranked = ranking.search_pipeline("alternator", {}, part_query="alternator").rank(listings)
+
+    assert [item["matchType"] for item in ranked] == ["exact_complete", "exact", "related", "other"]
+    assert [item["isExactMatch"] for item in ranked] == [True, True, False, False]
+    assert ranked[0]["title"] == "Complete alternator assembly"
+
+
+def test_search_pipeline_without_part_orders_by_relevance():
+    vehicle = {"year": "2015", "make": "Honda", "model": "Civic"}
+    listings = [
+        listing("Brake pads"),
+        listing("2015 Honda Civic brake pads"),
+        listing("Honda brake pads"),
+    ]
+
+    ranked = ranking.search_pipeline("brake pads", vehicle).rank(listings)
+
+    assert [item["title"] for item in ranked] == [
+        "2015 Honda Civic brake pads", "Honda brake pads", "Brake pads"]
+    scores = [item["relevanceScore"] for item in ranked]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_search_pipeline_best_match_flags():
+    listings = [listing(f"wiper blade {i}") for i in range(6)] + [listing("Complete wiper motor assembly")]
+
+    ranked = ranking.search_pipeline("wiper", {}, part_query="wiper").rank(listings)
+
+    # The top four plus any listing with a priority score above 80
+    assert [item["bestMatch"] for item in ranked] == [True, True, True, True, False, False, False]
+    assert ranked[0]["priorityScore"] == 100
+
+
+def test_part_number_pipeline_puts_primary_first_then_price():
+    listings = [
+        listing("cheap alternate", price="$5", is_primary=False),
+        listing("primary expensive", price="$50", is_primary=True),
+        listing("no price", price=""),
+        listing("primary cheap", price="$20", is_primary=True),
+    ]
+
+    ranked = ranking.part_number_pipeline().rank(listings)
+
+    assert [item["title"] for item in ranked] == [
+        "primary cheap", "primary expensive", "cheap alternate", "no price"]
+
+
+def test_year_group_pipeline():
+    listings = [
+        listing("Radiator 1998-2002"),
+        listing("Radiator"),
+        listing("Radiator 2001 Civic"),
+        listing("Radiator 2003-2007"),
+    ]
+
+    ranked = ranking.year_group_pipeline("2001").rank(listings)
+
+    assert [item["title"] for item in ranked] == [
+        "Radiator 2001 Civic", "Radiator 1998-2002", "Radiator", "Radiator 2003-2007"]
+    assert ranked[0]["exactYearMatch"] and ranked[0]["specialHighlight"]
+    assert ranked[1]["compatibleRange"] == "1998-2002"
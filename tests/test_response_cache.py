@@ -0,0 +1,124 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import response_cache
+import search_cache
+from cache_backends import MemoryBackend, SQLiteBackend
+from listing import Listing
+from response_cache import SearchResponseCache
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(search_cache.time, "time", clock)
+    return clock
+
+
+def listings():
+    return [Listing.from_dict(dict(title="2015 Civic radiator", price="$40", shipping="", condition="New",
+                                   source="eBay", link="https://example.com/1", image=""))]
+
+
+FACETS = {"total": 1}
+STRUCTURED = {"year": "2015", "make": "Honda", "model": "Civic", "part": "radiator"}
+
+
+def cached(cache, structured_data=STRUCTURED):
+    return cache.get("2015 honda civic radiator", "civic radiator", structured_data)
+
+
+def store(cache, ttl=600, **meta):
+    cache.set("2015 honda civic radiator", "civic radiator", STRUCTURED, listings(), FACETS, ttl, **meta)
+
+
+def test_roundtrip_and_key_normalization():
+    cache = SearchResponseCache(MemoryBackend("responses"), version="1")
+    assert cached(cache) is None
+    store(cache, year="2015")
+
+    ranked, facets, meta = cached(cache, {"part": "Radiator ", "model": "CIVIC", "make": "honda",
+                                          "year": "2015", "engine": ""})
+
+    assert [item.to_dict() for item in ranked] == [item.to_dict() for item in listings()]
+    assert facets == FACETS and meta == {"year": "2015"}
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_ranking_version_is_part_of_the_key():
+    backend = MemoryBackend("responses")
+    store(SearchResponseCache(backend, version="1"))
+
+    assert cached(SearchResponseCache(backend, version="2")) is None
+
+
+def test_entries_expire_with_their_ttl(clock):
+    cache = SearchResponseCache(MemoryBackend("responses"), version="1")
+    store(cache, ttl=60)
+
+    clock.now += 59
+    assert cached(cache) is not None
+    clock.now += 2
+    assert cached(cache) is None
+
+
+def test_invalidate_one_search():
+    cache = SearchResponseCache(MemoryBackend("responses"), version="1")
+    store(cache)
+    cache.set("brake pads", "brake pads", None, listings(), FACETS, 600)
+
+    cache.invalidate("2015 honda civic radiator", "civic radiator", STRUCTURED)
+
+    assert cached(cache) is None
+    assert cache.get("brake pads", "brake pads", None) is not None
+
+
+def test_invalidate_all_replaces_the_generation_for_every_worker(tmp_path):
+    path = str(tmp_path / "cache.db")
+    worker_a = SearchResponseCache(SQLiteBackend(path, "responses"), version="1")
+    worker_b = SearchResponseCache(SQLiteBackend(path, "responses"), version="1")
+    store(worker_a)
+    assert cached(worker_b) is not None
+    result_id = worker_b.result_id("2015 honda civic radiator", "civic radiator", STRUCTURED)
+
+    worker_a.invalidate()
+
+    assert cached(worker_b) is None
+    assert worker_b.result_id("2015 honda civic radiator", "civic radiator", STRUCTURED) != result_id
+    assert worker_a.stats()["invalidations"] == 1
+
+
+def test_result_id_is_shared_by_repeats_of_a_search():
+    cache = SearchResponseCache(MemoryBackend("responses"), version="1")
+
+    first = cache.result_id("2015 Honda Civic radiator", "civic radiator", STRUCTURED)
+
+    assert first == cache.result_id(" 2015 honda civic  radiator", "Civic radiator", dict(STRUCTURED))
+    assert first != cache.result_id("brake pads", "brake pads", None)
+
+
+def test_freshness_tracking(clock):
+    response_cache.record_source(clock.now + 100)  # outside tracking() it's ignored
+
+    with response_cache.tracking() as freshness:
+        assert freshness.ttl() is None
+        response_cache.record_source(clock.now + 300)
+        response_cache.record_source(clock.now + 120)
+        assert freshness.ttl() == 120
+
+    with response_cache.tracking() as freshness:
+        response_cache.record_source(clock.now + 300)
+        response_cache.record_degraded_source()
+        assert freshness.ttl() is None
@@ -0,0 +1,125 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import result_sets
+import search_cache
+from cache_backends import MemoryBackend
+from listing import Listing
+from result_sets import ResultSetStore
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(search_cache.time, "time", clock)
+    return clock
+
+
+def listings(count):
+    return [Listing.from_dict(dict(title=f"part {i}", price=f"${i}.00", shipping="", condition="New",
+                                   source="eBay", link=f"https://example.com/{i}", image=""))
+            for i in range(count)]
+
+
+def test_save_and_load_keep_order_annotations_and_meta():
+    store = ResultSetStore(MemoryBackend("result_sets"))
+    ranked = listings(3)
+    ranked[0]["bestMatch"] = True
+
+    result_id = store.save(ranked, year="2015")
+    loaded, meta = store.load(result_id)
+
+    assert [item.to_dict() for item in loaded] == [item.to_dict() for item in ranked]
+    assert loaded[0]["bestMatch"] is True
+    assert meta == {"year": "2015"}
+
+
+def test_every_save_gets_a_new_result_id():
+    store = ResultSetStore(MemoryBackend("result_sets"))
+
+    assert store.save(listings(1)) != store.save(listings(1))
+
+
+def test_unknown_or_missing_result_id():
+    store = ResultSetStore(MemoryBackend("result_sets"))
+
+    assert store.load("nope") is None
+    assert store.load(None) is None
+
+
+def test_result_sets_expire_with_the_backend_ttl(clock):
+    store = ResultSetStore(MemoryBackend("result_sets", default_ttl=900))
+    result_id = store.save(listings(2))
+
+    clock.now += 899
+    assert store.load(result_id) is not None
+    clock.now += 2
+    assert store.load(result_id) is None
+
+
+def test_load_page_slices_the_stored_dicts():
+    store = ResultSetStore(MemoryBackend("result_sets"))
+    ranked = listings(5)
+    result_id = store.save(ranked)
+
+    page, total = store.load_page(result_id, 2, 2)
+
+    assert total == 5
+    assert page == [item.to_dict() for item in ranked[2:4]]
+    assert store.load_page(result_id, 4, 2) == ([ranked[4].to_dict()], 5)
+    assert store.load_page("nope", 0, 2) is None
+
+
+def test_cursor_roundtrip():
+    cursor = result_sets.encode_cursor("abc_-123", 48, 24)
+
+    assert "=" not in cursor
+    assert result_sets.decode_cursor(cursor) == ("abc_-123", 48, 24)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not a cursor",
+    result_sets.encode_cursor("abc", -1, 24),
+    result_sets.encode_cursor("abc", 0, 0),
+    result_sets.encode_cursor(123, 0, 24),
+])
+def test_decode_cursor_rejects_malformed_cursors(cursor):
+    with pytest.raises(ValueError):
+        result_sets.decode_cursor(cursor)
+
+
+def test_next_cursor_walks_every_page():
+    total, page_size = 50, 24
+    offsets = []
+    cursor = result_sets.encode_cursor("abc", 0, page_size)
+    while cursor:
+        _, offset, size = result_sets.decode_cursor(cursor)
+        offsets.append(offset)
+        cursor = result_sets.next_cursor("abc", offset, size, total)
+
+    assert offsets == [0, 24, 48]
+    assert result_sets.next_cursor("abc", 24, 26, 50) is None
+
+
+def test_saving_under_a_result_id_replaces_the_set():
+    store = ResultSetStore(MemoryBackend("result_sets"))
+
+    first = store.save(listings(3), result_id="search-key")
+    second = store.save(listings(2), result_id="search-key")
+
+    assert first == second == "search-key"
+    assert len(store.load("search-key")[0]) == 2
+    assert store.stats()["size"] == 1
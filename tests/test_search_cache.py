@@ -0,0 +1,162 @@
+import concurrent.futures
+import contextvars
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search_cache
+from search_cache import SingleFlight, TTLCache
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(search_cache.time, "time", clock)
+    return clock
+
+
+def test_evicts_least_recently_used_entry():
+    cache = TTLCache(max_size=2, shards=1)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_shards_never_hold_more_than_max_size():
+    cache = TTLCache(max_size=10, shards=4)
+    for i in range(200):
+        cache.set(f"key-{i}", i)
+
+    assert len(cache) <= 10
+    assert cache.stats()["evictions"] == 200 - len(cache)
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = TTLCache(max_size=10, default_ttl=60, shards=1)
+    cache.set("default", 1)
+    cache.set("short", 2, ttl=5)
+
+    clock.now += 10
+    assert cache.get("short") is None
+    assert cache.get("default") == 1
+
+    clock.now += 60
+    assert cache.get("default", "gone") == "gone"
+    assert cache.stats()["expirations"] == 2
+
+
+def test_default_ttl_none_keeps_entries_until_evicted(clock):
+    cache = TTLCache(max_size=10, default_ttl=None, shards=1)
+    cache.set("key", "value")
+
+    clock.now += 10 ** 9
+    assert cache.get("key") == "value"
+
+
+def test_purge_expired_removes_only_expired_entries(clock):
+    cache = TTLCache(max_size=10, default_ttl=60, shards=2)
+    cache.set("old", 1, ttl=5)
+    cache.set("new", 2)
+
+    clock.now += 10
+    assert cache.purge_expired() == 1
+    assert len(cache) == 1 and "new" in cache
+
+
+def test_stats_count_hits_and_misses():
+    cache = TTLCache(max_size=10, shards=1)
+    cache.set("key", "value")
+    cache.get("key")
+    cache.get("missing")
+    # Membership checks don't count as lookups
+    assert "key" in cache
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    group = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(group.do, "key", fetch)
+        started.wait(5)
+        followers = [executor.submit(group.do, "key", fetch) for _ in range(3)]
+        # Followers wait on the leader's call instead of starting their own
+        while group.stats()["coalesced"] < 3:
+            time.sleep(0.001)
+        release.set()
+        results = [leader.result(5)] + [follower.result(5) for follower in followers]
+
+    assert results == ["result"] * 4
+    assert len(calls) == 1
+    assert group.stats() == {"in_flight": 0, "executed": 1, "coalesced": 3}
+
+
+def test_single_flight_shares_the_leaders_exception():
+    group = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fetch():
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream failed")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(group.do, "key", fetch)
+        started.wait(5)
+        follower = executor.submit(group.do, "key", fetch)
+        while group.stats()["coalesced"] < 1:
+            time.sleep(0.001)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result(5)
+
+    # The key is free again, so the next call runs on its own
+    assert group.do("key", lambda: "retried") == "retried"
+
+
+def test_stale_reads_are_tracked_per_request():
+    assert not search_cache.served_stale()
+    search_cache.record_stale_read()  # outside a request it's ignored
+
+    token = search_cache.begin_stale_tracking()
+    try:
+        assert not search_cache.served_stale()
+        # Worker threads run in copies of the request's context
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(contextvars.copy_context().run, search_cache.record_stale_read).result()
+        assert search_cache.served_stale()
+    finally:
+        search_cache.end_stale_tracking(token)
+
+    assert not search_cache.served_stale()
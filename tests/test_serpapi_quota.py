@@ -0,0 +1,103 @@
+import contextvars
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serpapi_quota
+from serpapi_quota import FALLBACK, PRIMARY, SPECULATIVE, QuotaBudget
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(serpapi_quota.time, "time", clock)
+    return clock
+
+
+def drain(budget, level):
+    granted = 0
+    while budget.acquire(level):
+        granted += 1
+    return granted
+
+
+def test_lower_priorities_leave_a_reserve(clock):
+    budget = QuotaBudget(hourly_limit=100, monthly_limit=10000)
+
+    # Speculative calls stop while a quarter of the hour is left, fallbacks
+    # at a tenth, and primary searches may use the rest
+    assert drain(budget, SPECULATIVE) == 75
+    assert drain(budget, FALLBACK) == 15
+    assert drain(budget, PRIMARY) == 10
+    stats = budget.stats()
+    assert stats["granted"] == {PRIMARY: 10, FALLBACK: 15, SPECULATIVE: 75}
+    assert stats["denied"] == {PRIMARY: 1, FALLBACK: 1, SPECULATIVE: 1}
+
+
+def test_hourly_budget_refills_over_time(clock):
+    budget = QuotaBudget(hourly_limit=3600, monthly_limit=100000)
+    drain(budget, PRIMARY)
+    assert not budget.acquire(PRIMARY)
+
+    clock.now += 10  # one call per second
+    assert drain(budget, PRIMARY) == 10
+
+
+def test_monthly_limit_applies_across_hours(clock):
+    budget = QuotaBudget(hourly_limit=100, monthly_limit=5)
+    assert drain(budget, PRIMARY) == 5
+
+    clock.now += 3600
+    assert not budget.acquire(PRIMARY)
+    assert budget.stats()["monthly_remaining"] == 0
+
+
+def test_priority_context_sets_the_default_level(clock):
+    budget = QuotaBudget(hourly_limit=100, monthly_limit=10000)
+    with serpapi_quota.priority(SPECULATIVE):
+        assert serpapi_quota.current_priority() == SPECULATIVE
+        assert drain(budget, None) == 75
+    assert serpapi_quota.current_priority() == PRIMARY
+    assert budget.acquire()
+
+
+def test_request_cap_limits_calls_per_request(clock):
+    budget = QuotaBudget(hourly_limit=100, monthly_limit=10000)
+
+    def one_request():
+        token = serpapi_quota.begin_request(3)
+        try:
+            return drain(budget, PRIMARY), serpapi_quota.current_request_budget().denied
+        finally:
+            serpapi_quota.end_request(token)
+
+    assert one_request() == (3, 1)
+    # The cap is per request, and denied calls don't consume the shared budget
+    assert one_request() == (3, 1)
+    stats = budget.stats()
+    assert stats["denied_by_request_cap"] == 2
+    assert stats["monthly_used"] == 6
+
+
+def test_request_budget_is_shared_with_copied_contexts(clock):
+    budget = QuotaBudget(hourly_limit=100, monthly_limit=10000)
+    token = serpapi_quota.begin_request(2)
+    try:
+        # Calls fanned out on other threads run in copies of the request's context
+        granted = [contextvars.copy_context().run(budget.acquire) for _ in range(3)]
+    finally:
+        serpapi_quota.end_request(token)
+
+    assert granted == [True, True, False]
+    assert serpapi_quota.current_request_budget() is None
@@ -0,0 +1,146 @@
+import contextvars
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from upstream_engine import UpstreamEngine, UpstreamSaturated
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+class ConcurrencyProbe:
+    """Call that records how many copies of itself run at the same time"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def __call__(self):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        return threading.current_thread().name
+
+
+def test_gather_returns_results_in_call_order():
+    engine = UpstreamEngine(max_concurrency=4, max_workers=4)
+
+    def call(value, delay):
+        time.sleep(delay)
+        return value
+
+    calls = [lambda v=v: call(v, 0.01 * (5 - v)) for v in range(5)]
+    assert engine.gather(calls) == [0, 1, 2, 3, 4]
+    assert engine.gather([]) == []
+
+
+def test_gather_returns_exceptions_in_their_slots():
+    engine = UpstreamEngine(max_concurrency=2, max_workers=2)
+
+    def fail():
+        raise ValueError("upstream failed")
+
+    results = engine.gather([lambda: "ok", fail])
+    assert results[0] == "ok"
+    assert isinstance(results[1], ValueError)
+
+
+def test_gather_runs_calls_concurrently_up_to_the_limit():
+    engine = UpstreamEngine(max_concurrency=3, max_workers=8)
+    probe = ConcurrencyProbe()
+
+    threads = engine.gather([probe] * 9)
+    assert probe.max_running == 3
+    assert all(name.startswith("upstream") for name in threads)
+
+
+def test_calls_see_the_callers_contextvars():
+    engine = UpstreamEngine(max_concurrency=2, max_workers=2)
+    token = request_id.set("request-1")
+    try:
+        assert engine.gather([request_id.get, request_id.get]) == ["request-1", "request-1"]
+    finally:
+        request_id.reset(token)
+
+
+def test_nested_fan_out_runs_inline_instead_of_deadlocking():
+    # A single worker would deadlock if the nested calls waited on the pool
+    engine = UpstreamEngine(max_concurrency=1, max_workers=1)
+
+    def fan_out():
+        return engine.gather([lambda: threading.current_thread().name, lambda: "inner"])
+
+    [(nested_thread, inner)] = engine.gather([fan_out])
+    assert nested_thread.startswith("upstream")
+    assert inner == "inner"
+
+
+def test_batch_that_does_not_fit_the_queue_is_rejected_up_front():
+    engine = UpstreamEngine(max_concurrency=2, max_workers=2, max_queue=1)
+    probe = ConcurrencyProbe()
+
+    with pytest.raises(UpstreamSaturated):
+        engine.gather([probe] * 4)
+    assert probe.max_running == 0
+    assert engine.stats()["rejected"]["queue_full"] == 4
+    # A batch that fits still runs
+    assert len(engine.gather([probe] * 3)) == 3
+
+
+def test_upstream_limit_caps_calls_to_one_upstream():
+    engine = UpstreamEngine(max_concurrency=8, max_workers=8, upstream_limits={"serpapi": 2})
+    probe = ConcurrencyProbe()
+
+    engine.gather([probe] * 6, upstream="serpapi")
+    assert probe.max_running == 2
+
+
+def test_call_waiting_too_long_for_a_slot_fails():
+    engine = UpstreamEngine(max_concurrency=1, max_workers=2, max_queue=4, max_queue_wait=0.05)
+    release = threading.Event()
+    blocking = engine.submit(lambda: release.wait(5))
+    try:
+        [result] = engine.gather([lambda: "late"])
+    finally:
+        release.set()
+    blocking.result(5)
+
+    assert isinstance(result, UpstreamSaturated)
+    assert engine.stats()["rejected"]["queue_wait"] == 1
+
+
+def test_idle_slots_follow_admitted_calls():
+    engine = UpstreamEngine(max_concurrency=3, max_workers=3)
+    release = threading.Event()
+    assert engine.idle_slots() == 3
+
+    futures = [engine.submit(lambda: release.wait(5)) for _ in range(2)]
+    assert engine.idle_slots() == 1
+    release.set()
+    for future in futures:
+        future.result(5)
+    # Admission is released by a callback on the future, just after the result
+    give_up_at = time.monotonic() + 5
+    while engine.idle_slots() != 3 and time.monotonic() < give_up_at:
+        time.sleep(0.001)
+    assert engine.idle_slots() == 3
+    assert engine.stats()["completed"] == 2
+
+
+def test_nested_fan_out_is_not_counted_against_the_queue():
+    engine = UpstreamEngine(max_concurrency=1, max_workers=1, max_queue=0)
+
+    def fan_out():
+        return engine.gather([lambda: 1] * 5)
+
+    assert engine.gather([fan_out]) == [[1] * 5]
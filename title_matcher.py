@@ -0,0 +1,121 @@
+"""
+Title Matcher Module
+
+Evaluates many "does the title contain any of these terms" checks with a
+single regex scan per title, instead of one `term in title` test per term
+and per check.
+
+The terms of every check are compiled once into a trie-shaped regex inside
+a lookahead. Scanning a title visits each start position once and captures
+the longest term starting there; every shorter term starting at the same
+position is a prefix of it and is recovered from a precomputed table. The
+result is exactly the set of terms for which `term in title` is true,
+reported as a bitmask of the checks (groups) that those terms satisfy.
+
+Matchers are cached by their groups, so the eBay new and used calls of a
+search share one compiled pattern, and each matcher remembers the masks of
+recently scanned titles, so re-filtering a cached SerpAPI result for a
+repeated query skips the scan entirely.
+"""
+
+import re
+from functools import lru_cache
+
+
+def _trie_pattern(node):
+    """Build a regex from a character trie; greedy groups prefer longer terms"""
+    terminal = "" in node
+    branches = [re.escape(char) + _trie_pattern(child)
+                for char, child in sorted(node.items()) if char != ""]
+    if not branches:
+        return ""
+    if len(branches) == 1:
+        body = branches[0]
+    else:
+        body = "(?:" + "|".join(branches) + ")"
+    return "(?:" + body + ")?" if terminal else body
+
+
+class TitleMatcher:
+    """
+    Compiled matcher for several groups of lowercase substring terms.
+
+    Args:
+        groups: Sequence of term collections; scan() sets bit i when any
+            term of groups[i] occurs in the text
+        memo_size: Number of recently scanned texts whose masks are kept
+    """
+
+    def __init__(self, groups, memo_size=2048):
+        self.groups = tuple(frozenset(group) for group in groups)
+
+        # Bitmask of the groups each term belongs to
+        term_masks = {}
+        for index, group in enumerate(self.groups):
+            for term in group:
+                term_masks[term] = term_masks.get(term, 0) | (1 << index)
+
+        # An empty term is contained in every string
+        self._always = term_masks.pop("", 0)
+        words = sorted(term_masks)
+
+        # A hit on a term also means every term that is a prefix of it occurs
+        self._hit_masks = {}
+        for term in words:
+            mask = 0
+            for other in words:
+                if term.startswith(other):
+                    mask |= term_masks[other]
+            self._hit_masks[term] = mask
+
+        self._pattern = None
+        if words:
+            trie = {}
+            for term in words:
+                node = trie
+                for char in term:
+                    node = node.setdefault(char, {})
+                node[""] = True
+            # The leading character class lets the regex engine skip straight to
+            # positions where some term can start
+            first_chars = "".join(sorted(trie))
+            self._pattern = re.compile(
+                "(?=[" + re.escape(first_chars) + "])(?=(" + _trie_pattern(trie) + "))"
+            )
+
+        # Single dict operations are atomic, so the memo needs no lock; when it
+        # fills up it is simply cleared, which is cheaper than LRU bookkeeping
+        self._memo = {}
+        self._memo_size = memo_size
+
+    def scan(self, text):
+        """Return the bitmask of groups with at least one term in text"""
+        mask = self._memo.get(text)
+        if mask is not None:
+            return mask
+
+        mask = self._always
+        if self._pattern is not None:
+            hit_masks = self._hit_masks
+            for hit in set(self._pattern.findall(text)):
+                mask |= hit_masks[hit]
+
+        if len(self._memo) >= self._memo_size:
+            self._memo.clear()
+        self._memo[text] = mask
+        return mask
+
+    @staticmethod
+    def count(mask, start, stop):
+        """Number of groups in [start, stop) whose bit is set in mask"""
+        return bin((mask >> start) & ((1 << (stop - start)) - 1)).count("1")
+
+
+@lru_cache(maxsize=256)
+def _compile(groups):
+    return TitleMatcher(groups)
+
+
+def compile_matcher(groups):
+    """Return a cached TitleMatcher for the given groups of terms"""
+    return _compile(tuple(frozenset(group) for group in groups))
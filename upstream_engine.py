@@ -0,0 +1,396 @@
+"""
+Upstream Engine Module
+
+Fans out the upstream calls of a search (eBay new/used, Google Shopping and
+fallback queries) on a single process-wide asyncio event loop.
+
+The event loop runs on a dedicated background thread and schedules every
+call under one concurrency cap. The HTTP clients are blocking (requests), so
+each call is executed on a persistent worker pool owned by the engine; the
+pool's threads are reused across searches instead of being created and torn
+down by a ThreadPoolExecutor per request and per phase.
+
+Calls are plain callables (usually functools.partial objects). Each call runs
+in a copy of the submitting thread's contextvars context, so request-scoped
+state set with contextvars is visible inside upstream calls. Results are
+either gathered in call order, consumed as each call completes, or collected
+later from a future returned by submit().
+
+The engine applies backpressure instead of letting work pile up:
+    - calls tagged with an upstream (e.g. "serpapi") also wait for that
+      upstream's concurrency limit
+    - at most max_queue calls may wait for a slot; a batch that doesn't fit
+      is rejected up front with UpstreamSaturated
+    - a call that waits longer than max_queue_wait seconds for a slot fails
+      with UpstreamSaturated instead of running late
+Queue waits and rejections are counted in stats().
+
+gather() and as_completed() accept a timeout (the caller's remaining request
+deadline). Calls still unfinished when it runs out are cancelled and report a
+TimeoutError: calls that haven't started never run, and a call already
+running on a worker keeps its slot until it returns, since a blocking call
+can't be interrupted.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import threading
+import time
+
+
+class UpstreamSaturated(RuntimeError):
+    """Raised when the engine has no room for more upstream calls"""
+    pass
+
+
+class UpstreamEngine:
+    """
+    Shared scheduler for blocking upstream calls.
+
+    Args:
+        max_concurrency: Maximum number of upstream calls running at once
+        max_workers: Size of the worker pool that executes the blocking calls
+        max_queue: Maximum number of calls waiting for a slot
+        max_queue_wait: Seconds a call may wait for a slot before it fails
+        upstream_limits: Maximum concurrent calls per upstream name
+    """
+
+    def __init__(self, max_concurrency=16, max_workers=16, max_queue=64, max_queue_wait=10.0,
+                 upstream_limits=None):
+        self.max_concurrency = max_concurrency
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait
+        self.upstream_limits = dict(upstream_limits or {})
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+        self._upstream_semaphores = {}
+        self._executor = None
+        self._start_lock = threading.Lock()
+        self._worker_state = threading.local()
+
+        # Counters, guarded by _stats_lock
+        self._stats_lock = threading.Lock()
+        self._admitted = 0  # calls accepted and not yet finished (queued or running)
+        self._running = 0
+        self._upstream_running = {name: 0 for name in self.upstream_limits}
+        self.completed = 0
+        self.rejected_queue_full = 0
+        self.rejected_queue_wait = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_count = 0
+        self._queue_wait_max = 0.0
+
+    def _ensure_started(self):
+        if self._loop is not None:
+            return self._loop
+
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="upstream"
+                )
+                self._thread = threading.Thread(
+                    target=self._run_loop, args=(loop,), name="upstream-engine", daemon=True
+                )
+                self._thread.start()
+                self._semaphore = asyncio.run_coroutine_threadsafe(
+                    self._create_semaphore(), loop
+                ).result()
+                self._loop = loop
+        return self._loop
+
+    @staticmethod
+    def _run_loop(loop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    async def _create_semaphore(self):
+        self._upstream_semaphores = {
+            name: asyncio.Semaphore(limit) for name, limit in self.upstream_limits.items()
+        }
+        return asyncio.Semaphore(self.max_concurrency)
+
+    def _run_in_worker(self, context, call):
+        # Mark the thread so nested fan-outs run inline instead of deadlocking
+        self._worker_state.active = True
+        try:
+            return context.run(call)
+        finally:
+            self._worker_state.active = False
+
+    def _admit(self, count):
+        # Reject the whole batch up front rather than queueing part of it
+        with self._stats_lock:
+            if self._admitted + count > self.max_concurrency + self.max_queue:
+                self.rejected_queue_full += count
+                raise UpstreamSaturated(
+                    f"upstream queue full ({self._admitted} calls admitted, "
+                    f"limit {self.max_concurrency} running + {self.max_queue} queued)"
+                )
+            self._admitted += count
+
+    def _admitted_until_done(self, future, count=1):
+        # Released from the future rather than inside the coroutine, which never
+        # runs at all when the future is cancelled before the loop picks it up
+        def release(_):
+            with self._stats_lock:
+                self._admitted -= count
+        future.add_done_callback(release)
+        return future
+
+    async def _acquire_slots(self, upstream_semaphore):
+        # The upstream limit is taken first, so a call waiting on it doesn't
+        # hold one of the shared slots
+        if upstream_semaphore is not None:
+            await upstream_semaphore.acquire()
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            if upstream_semaphore is not None:
+                upstream_semaphore.release()
+            raise
+
+    def _finish_call(self, upstream, upstream_semaphore):
+        with self._stats_lock:
+            self._running -= 1
+            if upstream in self._upstream_running:
+                self._upstream_running[upstream] -= 1
+            self.completed += 1
+        self._semaphore.release()
+        if upstream_semaphore is not None:
+            upstream_semaphore.release()
+
+    async def _run_call(self, context, call, upstream=None, queued_at=None):
+        queued_at = queued_at or time.monotonic()
+        upstream_semaphore = self._upstream_semaphores.get(upstream)
+        try:
+            await asyncio.wait_for(self._acquire_slots(upstream_semaphore), self.max_queue_wait)
+        except asyncio.TimeoutError:
+            with self._stats_lock:
+                self.rejected_queue_wait += 1
+            raise UpstreamSaturated(
+                f"no upstream slot{f' for {upstream}' if upstream else ''} within {self.max_queue_wait}s"
+            )
+
+        waited = time.monotonic() - queued_at
+        with self._stats_lock:
+            self._running += 1
+            if upstream in self._upstream_running:
+                self._upstream_running[upstream] += 1
+            self._queue_wait_total += waited
+            self._queue_wait_count += 1
+            self._queue_wait_max = max(self._queue_wait_max, waited)
+        loop = asyncio.get_running_loop()
+        worker = loop.run_in_executor(self._executor, self._run_in_worker, context, call)
+        try:
+            return await asyncio.shield(worker)
+        except asyncio.CancelledError:
+            if not worker.done():
+                # The caller gave up, but the blocking call still occupies a
+                # worker; it stays admitted and keeps its slots until it returns
+                with self._stats_lock:
+                    self._admitted += 1
+                worker.add_done_callback(
+                    lambda done: self._finish_abandoned_call(done, upstream, upstream_semaphore)
+                )
+            raise
+        finally:
+            if worker.done():
+                self._finish_call(upstream, upstream_semaphore)
+
+    def _finish_abandoned_call(self, worker, upstream, upstream_semaphore):
+        if not worker.cancelled():
+            worker.exception()  # retrieve it, so asyncio doesn't log it as unhandled
+        with self._stats_lock:
+            self._admitted -= 1
+        self._finish_call(upstream, upstream_semaphore)
+
+    def _schedule(self, loop, context, call, upstream, queued_at):
+        return self._admitted_until_done(asyncio.run_coroutine_threadsafe(
+            self._run_call(context, call, upstream, queued_at), loop
+        ))
+
+    def _in_worker(self):
+        return getattr(self._worker_state, "active", False)
+
+    def _run_inline(self, calls):
+        for index, call in enumerate(calls):
+            try:
+                result = call()
+            except Exception as e:
+                result = e
+            yield index, result
+
+    def _timeout_error(self, timeout):
+        return TimeoutError(f"upstream call unfinished after {timeout:.1f}s")
+
+    def gather(self, calls, upstream=None, timeout=None):
+        """
+        Run all calls concurrently and wait for them, at most timeout seconds.
+        Returns results in call order; a failed call's slot holds its exception
+        and a call cut off by the timeout holds a TimeoutError. Raises
+        UpstreamSaturated, without running any call, when the queue has no
+        room for the batch.
+        """
+        calls = list(calls)
+        if not calls:
+            return []
+
+        # A call that fans out again from inside a worker runs its calls inline,
+        # since waiting on the shared pool from one of its own threads can deadlock
+        if self._in_worker() or threading.current_thread() is self._thread:
+            return [result for _, result in self._run_inline(calls)]
+
+        if timeout is not None and timeout <= 0:
+            return [self._timeout_error(0) for _ in calls]
+
+        loop = self._ensure_started()
+        self._admit(len(calls))
+        queued_at = time.monotonic()
+        futures = [self._schedule(loop, contextvars.copy_context(), call, upstream, queued_at) for call in calls]
+        concurrent.futures.wait(futures, timeout=timeout)
+
+        results = []
+        for future in futures:
+            if future.done() or not future.cancel():
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(e)
+            else:
+                results.append(self._timeout_error(timeout))
+        return results
+
+    def submit(self, call, upstream=None):
+        """
+        Schedule one call without waiting for it; returns a
+        concurrent.futures.Future. Cancelling the future before the call has
+        started means it never runs; a call already running finishes and its
+        result is dropped. Raises UpstreamSaturated when the queue is full.
+        """
+        if self._in_worker() or threading.current_thread() is self._thread:
+            future = concurrent.futures.Future()
+            try:
+                future.set_result(call())
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        loop = self._ensure_started()
+        self._admit(1)
+        return self._schedule(loop, contextvars.copy_context(), call, upstream, None)
+
+    def spawn(self, call, upstream=None):
+        """
+        Schedule a call nobody waits for (e.g. a background cache refresh).
+        Unlike submit(), this is safe from inside a worker, since nothing
+        blocks on the result. The call runs in an empty contextvars context,
+        so it isn't charged to the request that spawned it (nor bound by its
+        deadline). Raises UpstreamSaturated when the queue is full.
+        """
+        loop = self._ensure_started()
+        self._admit(1)
+        return self._schedule(loop, contextvars.Context(), call, upstream, None)
+
+    def as_completed(self, calls, upstream=None, timeout=None):
+        """
+        Run all calls concurrently and yield (index, result) pairs as each call
+        finishes; a failed call's result is its exception. Once timeout seconds
+        have passed, the unfinished calls are cancelled and yielded with a
+        TimeoutError. Raises UpstreamSaturated, without running any call, when
+        the queue has no room for the batch.
+        """
+        calls = list(calls)
+        if not calls:
+            return
+
+        if self._in_worker() or threading.current_thread() is self._thread:
+            yield from self._run_inline(calls)
+            return
+
+        if timeout is not None and timeout <= 0:
+            for index in range(len(calls)):
+                yield index, self._timeout_error(0)
+            return
+
+        loop = self._ensure_started()
+        self._admit(len(calls))
+        queued_at = time.monotonic()
+        futures = {
+            self._schedule(loop, contextvars.copy_context(), call, upstream, queued_at): index
+            for index, call in enumerate(calls)
+        }
+        pending = set(futures)
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout=timeout):
+                pending.discard(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = e
+                yield futures[future], result
+        except concurrent.futures.TimeoutError:
+            for future in sorted(pending, key=futures.get):
+                if future.cancel():
+                    result = self._timeout_error(timeout)
+                else:
+                    # Finished in the meantime
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = e
+                pending.discard(future)
+                yield futures[future], result
+        finally:
+            # A consumer that stops early doesn't leave calls waiting for a slot
+            for future in pending:
+                future.cancel()
+
+    def idle_slots(self):
+        """Number of calls that could start right now without queueing"""
+        with self._stats_lock:
+            return max(0, self.max_concurrency - self._admitted)
+
+    def stats(self):
+        """Return a snapshot of the engine's load and backpressure counters"""
+        with self._stats_lock:
+            waits = self._queue_wait_count
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "max_queue_wait": self.max_queue_wait,
+                "running": self._running,
+                "queued": max(0, self._admitted - self._running),
+                "completed": self.completed,
+                "rejected": {
+                    "queue_full": self.rejected_queue_full,
+                    "queue_wait": self.rejected_queue_wait
+                },
+                "queue_wait_ms": {
+                    "avg": round(self._queue_wait_total / waits * 1000, 1) if waits else 0.0,
+                    "max": round(self._queue_wait_max * 1000, 1)
+                },
+                "upstreams": {
+                    name: {"limit": limit, "running": self._upstream_running[name]}
+                    for name, limit in self.upstream_limits.items()
+                }
+            }
+
+
+# Process-wide engine shared by all search routes
+upstream_engine = UpstreamEngine(
+    max_concurrency=int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "16")),
+    max_workers=int(os.getenv("UPSTREAM_WORKERS", "16")),
+    max_queue=int(os.getenv("UPSTREAM_MAX_QUEUE", "64")),
+    max_queue_wait=float(os.getenv("UPSTREAM_MAX_QUEUE_WAIT", "10")),
+    upstream_limits={
+        "serpapi": int(os.getenv("SERPAPI_MAX_CONCURRENCY", "12"))
+    }
+)
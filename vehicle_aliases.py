@@ -0,0 +1,285 @@
+"""
+Vehicle Alias Module
+
+One immutable index of the make, model, position and part aliases used by
+the search pipeline, plus the simplified make/model forms used to build
+marketplace search terms.
+
+The tables are built once at import time and exposed read-only; the derived
+alias sets are computed once per distinct make/model/part and cached, so
+filtering a result set no longer rebuilds the same dict literals and
+if/elif chains for every call.
+"""
+
+import re
+from functools import lru_cache
+from types import MappingProxyType
+
+# Common make abbreviations and variations sellers use in listing titles
+MAKE_VARIANTS = MappingProxyType({
+    "mercedes-benz": ("mercedes", "benz", "mb"),
+    "mercedes benz": ("mercedes", "benz", "mb"),
+    "mercedes": ("mercedes-benz", "benz"),
+    "benz": ("mercedes-benz", "mercedes"),
+
+    "chevrolet": ("chevy",),
+    "chevy": ("chevrolet",),
+
+    "volkswagen": ("vw",),
+    "vw": ("volkswagen",),
+
+    "oldsmobile": ("olds", "cutlass"),
+    "olds": ("oldsmobile",),
+    "cutlass": ("oldsmobile",),
+
+    "pontiac": ("ponti", "firebird", "trans am"),
+    "firebird": ("pontiac",),
+    "trans am": ("pontiac",),
+
+    "mercury": ("merc",),
+    "merc": ("mercury",),
+
+    "chrysler": ("mopar",),
+    "mopar": ("chrysler",),
+
+    "plymouth": ("plym", "barracuda", "roadrunner"),
+    "plym": ("plymouth",),
+
+    "cadillac": ("caddy", "deville", "eldorado"),
+    "caddy": ("cadillac",),
+    "deville": ("cadillac",),
+    "eldorado": ("cadillac",),
+
+    "bmw": ("bavarian",),
+
+    "toyota": ("toy",),
+
+    "mitsubishi": ("mitsu",),
+
+    "ford": ("fd",),
+
+    "general motors": ("gm",),
+    "gm": ("general motors",),
+
+    "audi": ("aud",),
+})
+
+# Common trim levels for popular models
+COMMON_TRIMS = MappingProxyType({
+    "accord": ("lx", "ex", "exl", "touring"),
+    "civic": ("lx", "ex", "si", "type r"),
+    "camry": ("le", "se", "xle", "xse"),
+    "corolla": ("le", "se", "xle"),
+    "f-150": ("xl", "xlt", "lariat", "king ranch", "platinum"),
+    "silverado": ("lt", "ltz", "z71"),
+    "ram": ("1500", "2500", "3500"),
+})
+
+# Ways a position is written in a part description
+POSITION_MAPPING = MappingProxyType({
+    # Left/Right variations
+    "left": ("left", "driver", "driver side", "ds", "lh", "l/h", "l/side"),
+    "right": ("right", "passenger", "passenger side", "ps", "rh", "r/h", "r/side"),
+    # Front/Rear variations
+    "front": ("front", "forward", "fr", "f/"),
+    "rear": ("rear", "back", "rr", "r/"),
+    # Combined positions
+    "front left": ("fl", "front left", "front driver", "driver front", "lf", "left front"),
+    "front right": ("fr", "front right", "front passenger", "passenger front", "rf", "right front"),
+    "rear left": ("rl", "rear left", "rear driver", "driver rear", "lr", "left rear"),
+    "rear right": ("rr", "rear right", "rear passenger", "passenger rear", "rr", "right rear"),
+})
+
+# Part term variations for common parts
+PART_VARIATIONS = MappingProxyType({
+    "caliper": ("caliper", "brake caliper", "disc caliper"),
+    "strut": ("strut", "shock strut", "strut assembly", "shock absorber"),
+    "rotor": ("rotor", "brake rotor", "disc rotor", "brake disc"),
+    "bumper": ("bumper", "bumper cover", "bumper assembly", "front end"),
+    "headlight": ("headlight", "head light", "headlamp", "head lamp"),
+})
+
+# Title wording that also satisfies a must-match position or part term
+TITLE_VARIATIONS = MappingProxyType({
+    # Position term variations
+    "left": ("driver", "driver side", "driver's", "ds", "lh", "l/h", "l/s"),
+    "right": ("passenger", "passenger side", "passenger's", "ps", "rh", "r/h", "r/s"),
+    "front": ("forward", "fr", "f/", "front end"),
+    "rear": ("back", "rr", "r/", "rear end"),
+    # Combined position terms
+    "front left": ("fl", "lf", "front driver", "driver front"),
+    "front right": ("fr", "rf", "front passenger", "passenger front"),
+    "rear left": ("rl", "lr", "rear driver", "driver rear"),
+    "rear right": ("rr", "rear passenger", "passenger rear"),
+    # Common part term variations
+    "caliper": ("brake caliper", "disc caliper", "brake system"),
+    "rotor": ("brake rotor", "disc rotor", "brake disc", "disc brake"),
+    "strut": ("shock", "shock absorber", "strut assembly", "suspension"),
+    "bumper": ("fascia", "front end", "bumper cover", "bumper assembly"),
+    "headlight": ("head lamp", "headlamp", "head light", "light assembly"),
+})
+
+PART_STOP_WORDS = frozenset(["with", "for", "the", "and", "of", "a", "an"])
+
+_MODEL_NUMBER_PATTERN = re.compile(r"([a-z]+)[ -]?([0-9]+)")
+_BMW_SERIES_PATTERN = re.compile(r"^([0-9])([0-9]{2}[a-z]?)")
+
+
+@lru_cache(maxsize=1000)
+def title_aliases(term):
+    """Return the term plus every title wording that also satisfies it"""
+    return frozenset((term,) + TITLE_VARIATIONS.get(term, ()))
+
+
+@lru_cache(maxsize=1000)
+def make_alternatives(make):
+    """Return the lowercase make plus the variants sellers use for it"""
+    if not make:
+        return frozenset()
+    make_lower = make.lower()
+    alternatives = {make_lower}
+    for variant_key, variant_values in MAKE_VARIANTS.items():
+        if variant_key in make_lower or any(word in make_lower for word in variant_key.split()):
+            alternatives.update(variant_values)
+    return frozenset(alternatives)
+
+
+@lru_cache(maxsize=1000)
+def model_alternatives(make, model):
+    """Return the lowercase model plus spelling, series, class and trim variants"""
+    if not model:
+        return frozenset()
+    model_lower = model.lower()
+    alternatives = {model_lower}
+
+    # Handle model variations (with/without dash)
+    if "-" in model_lower:
+        alternatives.add(model_lower.replace("-", ""))
+        alternatives.add(model_lower.replace("-", " "))
+
+    # Model numbers with/without spaces, e.g. 'F 150' vs 'F-150' vs 'F150'
+    match = _MODEL_NUMBER_PATTERN.search(model_lower)
+    if match:
+        letter, number = match.groups()
+        alternatives.add(f"{letter}{number}")
+        alternatives.add(f"{letter}-{number}")
+        alternatives.add(f"{letter} {number}")
+
+    if "series" in model_lower and not model_lower.endswith("series"):
+        alternatives.add(model_lower.replace("series", "").strip())
+
+    # For Mercedes models like C240, also try C Class or C-Class
+    if model_lower[0] in "ces" and any(char.isdigit() for char in model_lower):
+        class_letter = model_lower[0]
+        alternatives.add(f"{class_letter} class")
+        alternatives.add(f"{class_letter}-class")
+
+    # For BMW models like 328i, 535i, add series variations
+    bmw_series_match = _BMW_SERIES_PATTERN.search(model_lower)
+    if bmw_series_match:
+        series_num = bmw_series_match.group(1)
+        alternatives.add(f"{series_num}-series")
+        alternatives.add(f"{series_num} series")
+
+    if make:
+        make_lower = make.lower()
+
+        # Ford trucks
+        if make_lower == "ford" and any(truck in model_lower for truck in ("f150", "f-150", "f 150")):
+            alternatives.update(("f150", "f-150", "f 150", "f series", "f-series"))
+
+        # Chevy/GMC trucks
+        if make_lower in ("chevrolet", "chevy", "gmc") and "silverado" in model_lower:
+            alternatives.update(("1500", "2500", "3500", "silverado"))
+
+        # Toyota Camry trims
+        if make_lower == "toyota" and model_lower == "camry":
+            alternatives.update(("camry se", "camry le", "camry xle"))
+
+        for base_model, trims in COMMON_TRIMS.items():
+            if base_model in model_lower:
+                for trim in trims:
+                    if trim not in model_lower:
+                        alternatives.add(base_model)
+                        alternatives.add(f"{base_model} {trim}")
+
+    return frozenset(alternatives)
+
+
+@lru_cache(maxsize=1000)
+def part_match_terms(part):
+    """
+    Split a part description into must-match terms: known part words are
+    replaced by their base part and position wording by its canonical
+    position. Returns (terms, positions).
+    """
+    if not part:
+        return frozenset(), ()
+    part_lower = part.lower()
+    terms = set()
+
+    # Pull out position wording first so it isn't matched as a part word
+    positions = []
+    for position, variations in POSITION_MAPPING.items():
+        for variation in variations:
+            if variation in part_lower:
+                positions.append(position)
+                part_lower = part_lower.replace(variation, "")
+                break
+
+    for part_word in part_lower.split():
+        if len(part_word) > 3 and part_word not in PART_STOP_WORDS:
+            for base_part, variations in PART_VARIATIONS.items():
+                if part_word in variations or any(variation in part_word for variation in variations):
+                    terms.add(base_part)
+                    break
+            else:
+                terms.add(part_word)
+
+    terms.update(positions)
+    return frozenset(terms), tuple(positions)
+
+
+@lru_cache(maxsize=1000)
+def simplify_make(make):
+    """Short make name that marketplaces match best (Mercedes-Benz -> Mercedes)"""
+    if not make:
+        return make
+    make_lower = make.lower()
+    if "mercedes" in make_lower:
+        return "Mercedes"
+    if "chevrolet" in make_lower:
+        return "Chevy"
+    if "volkswagen" in make_lower:
+        return "VW"
+    return make
+
+
+@lru_cache(maxsize=1000)
+def simplify_model(make, model):
+    """
+    Broader model name for search terms: Mercedes C240 -> C,
+    BMW 328i -> 3 series; other models are returned unchanged.
+    """
+    if not model or not any(char.isdigit() for char in model):
+        return model
+    make_lower = make.lower() if make else ""
+    if "mercedes" in make_lower and len(model) <= 4 and model[0].lower() in "cels":
+        return model[0]
+    if "bmw" in make_lower and model[0].isdigit():
+        return model[0] + " series"
+    return model
+
+
+@lru_cache(maxsize=1000)
+def model_letter_prefix(model):
+    """Letters of a model with digits and dashes removed (F-150 -> F, C240 -> C)"""
+    if not model or not any(char.isdigit() for char in model):
+        return model
+    prefix = "".join(char for char in model if not char.isdigit() and char != "-").strip()
+    return prefix or model
+
+
+def simplify_vehicle(make, model):
+    """Return (simplified make, simplified model) for building search terms"""
+    return simplify_make(make), simplify_model(make, model)